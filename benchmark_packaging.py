@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+
+"""
+Benchmark the packaging engine on synthetic build trees and compare with the
+committed baseline
+"""
+
+import argparse
+import sys
+import tempfile
+from pathlib import Path
+
+from extension_packager.bench import (
+    SCENARIOS,
+    compare,
+    load_baseline,
+    machine_info,
+    print_results,
+    run_benchmarks,
+    save_baseline,
+)
+
+BASELINE_PATH = Path(__file__).resolve().parent / "benchmarks" / "baseline.json"
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Packaging benchmarks")
+    parser.add_argument("--scenario", "-s", action="append", choices=list(SCENARIOS),
+                        help="run only this scenario (repeatable)")
+    parser.add_argument("--scale", type=float, default=1.0,
+                        help="multiply tree sizes by this factor (default: 1.0)")
+    parser.add_argument("--repeat", "-r", type=int, default=3,
+                        help="timed runs per case; the median is reported (default: 3)")
+    parser.add_argument("--baseline", type=Path, default=BASELINE_PATH,
+                        help="baseline file (default: benchmarks/baseline.json)")
+    parser.add_argument("--update-baseline", action="store_true",
+                        help="write these results as the new baseline")
+    parser.add_argument("--tolerance", type=float, default=0.25,
+                        help="allowed slowdown or memory growth before failing (default: 0.25)")
+    parser.add_argument("--workdir", help="where trees are generated (default: a temporary directory)")
+    args = parser.parse_args()
+
+    baseline = load_baseline(args.baseline)
+    if baseline is not None and not args.update_baseline:
+        if (baseline["scale"], baseline["repeat"]) != (args.scale, args.repeat):
+            print(f"⚠️  Baseline was recorded with --scale {baseline['scale']} --repeat {baseline['repeat']}")
+        if baseline["machine"] != machine_info():
+            print(f"⚠️  Baseline machine differs: {baseline['machine']}")
+
+    print("📊 Packaging benchmarks")
+    for name in args.scenario or SCENARIOS:
+        print(f"  • {name}: {SCENARIOS[name].description}")
+
+    def progress(case, result):
+        print(f"  ⏱️  {case}: {result.seconds * 1000:.1f}ms")
+
+    with tempfile.TemporaryDirectory(prefix="packaging-bench-", dir=args.workdir) as workdir:
+        results = run_benchmarks(workdir, args.scenario, args.scale, args.repeat, progress)
+
+    if args.update_baseline:
+        print_results(results)
+        save_baseline(args.baseline, results, args.scale, args.repeat)
+        print(f"\n💾 Baseline written to {args.baseline}")
+        sys.exit(0)
+
+    if baseline is None:
+        print_results(results)
+        print(f"\nℹ️  No baseline at {args.baseline}; run with --update-baseline to record one")
+        sys.exit(0)
+
+    comparisons = compare(results, baseline, args.tolerance)
+    print_results(results, comparisons)
+    regressed = [case for case, comparison in comparisons.items() if comparison.regressed]
+    if regressed:
+        print(f"\n❌ Regressed beyond {args.tolerance:.0%}: {', '.join(regressed)}")
+        sys.exit(1)
+    print(f"\n✅ No regressions beyond {args.tolerance:.0%}")
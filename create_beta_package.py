@@ -4,63 +4,17 @@ Create beta release package for Semantest Google Extension v1.0.0-beta
 """
 
 import os
-import zipfile
 import json
 from pathlib import Path
 
+from extension_packager import build_package, scan_tree
+from extension_packager.targets import BETA_DIRECTORIES, BETA_FILES, BETA_PACKAGE
+
 def create_beta_package():
     """Create the beta release package"""
     
     # Define package name
-    package_name = "chatgpt-extension-v1.0.0-beta.zip"
-    
-    # Files to include in the package
-    files_to_include = [
-        # Core extension files
-        "manifest.json",
-        "popup.html",
-        "background.js",
-        "content_script.js",
-        
-        # Source files
-        "src/index.ts",
-        "src/google-buddy-client.ts",
-        
-        # Domain layer
-        "src/domain/index.ts",
-        "src/domain/entities/google-search.ts",
-        "src/domain/entities/search-result.ts",
-        "src/domain/value-objects/search-query.ts",
-        "src/domain/events/index.ts",
-        "src/domain/events/search-requested.event.ts",
-        "src/domain/events/search-completed.event.ts",
-        "src/domain/events/search-failed.event.ts",
-        "src/domain/events/result-clicked.event.ts",
-        
-        # Application layer
-        "src/application/index.ts",
-        "src/application/google-application.ts",
-        
-        # Infrastructure layer
-        "src/infrastructure/index.ts",
-        "src/infrastructure/adapters/google-search-adapter.ts",
-        "src/infrastructure/adapters/google-communication-adapter.ts",
-        
-        # Configuration files
-        "package.json",
-        "tsconfig.json",
-        
-        # Documentation
-        "README.org",
-        "TEST_PLAN_GOOGLE_IMAGES.md",
-        "TEST_REPORT_GOOGLE_IMAGES.md",
-    ]
-    
-    # Directories to include
-    directories_to_include = [
-        "dist",  # Compiled JavaScript files
-        "icons", # Extension icons
-    ]
+    package_name = BETA_PACKAGE
     
     print(f"Creating beta package: {package_name}")
     
@@ -75,27 +29,29 @@ def create_beta_package():
     except Exception as e:
         print(f"⚠️  Could not verify manifest version: {e}")
     
-    # Create the zip file
-    with zipfile.ZipFile(package_name, 'w', zipfile.ZIP_DEFLATED) as zipf:
-        # Add individual files
-        for file_path in files_to_include:
-            if os.path.exists(file_path):
-                zipf.write(file_path, file_path)
-                print(f"  ✓ Added: {file_path}")
-            else:
-                print(f"  ⚠️  Skipped (not found): {file_path}")
-        
-        # Add directories
-        for dir_path in directories_to_include:
-            if os.path.exists(dir_path):
-                for root, dirs, files in os.walk(dir_path):
-                    for file in files:
-                        file_path = os.path.join(root, file)
-                        arcname = os.path.relpath(file_path)
-                        zipf.write(file_path, arcname)
-                print(f"  ✓ Added directory: {dir_path}")
-            else:
-                print(f"  ⚠️  Skipped directory (not found): {dir_path}")
+    # Collect the package members
+    files = []
+    
+    # Add individual files
+    for file_path in BETA_FILES:
+        if os.path.exists(file_path):
+            files.append(file_path)
+            print(f"  ✓ Added: {file_path}")
+        else:
+            print(f"  ⚠️  Skipped (not found): {file_path}")
+    
+    # Add directories
+    for dir_path in BETA_DIRECTORIES:
+        if os.path.exists(dir_path):
+            files += scan_tree(".", dir_path)
+            print(f"  ✓ Added directory: {dir_path}")
+        else:
+            print(f"  ⚠️  Skipped directory (not found): {dir_path}")
+    
+    # Create a reproducible zip file (unchanged files are copied from the
+    # previous build); identical trees always give byte-identical packages
+    result = build_package(".", package_name, files=files, deterministic=True)
+    print(f"  ♻️  Reused {result.reused} unchanged files, {result.cached} from cache, compressed {result.compressed}")
     
     # Verify package creation
     if os.path.exists(package_name):
@@ -106,10 +62,10 @@ def create_beta_package():
         
         # List package contents
         print(f"\n📦 Package contents:")
-        with zipfile.ZipFile(package_name, 'r') as zipf:
-            file_list = zipf.namelist()
-            for i, name in enumerate(sorted(file_list), 1):
-                print(f"   {i:3d}. {name}")
+        # Package contents come from the inventory written with the package
+        file_list = [entry["path"] for entry in result.inventory["members"]]
+        for i, name in enumerate(sorted(file_list), 1):
+            print(f"   {i:3d}. {name}")
         
         print(f"\n   Total files: {len(file_list)}")
         
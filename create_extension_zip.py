@@ -1,17 +1,40 @@
 #!/usr/bin/env python3
 
 # Direct execution of ZIP packaging
-import zipfile
-import os
+import argparse
+import sys
 from pathlib import Path
 
-def create_chrome_extension_package():
+from extension_packager import (
+    build_package, print_summary, prune_unreachable, scan_tree, watch_package, write_sha256sums,
+)
+from extension_packager.budget import (
+    check_package_size, load_budget, print_breakdown, print_budget_report,
+)
+from extension_packager.compression import POLICIES, compression_report, print_compression_report
+from extension_packager.optimize import (
+    debug_symbols_path, optimize_files, print_optimize_report, write_debug_symbols,
+)
+from extension_packager.reachability import print_prune_report
+from extension_packager.trace import Tracer, save_trace, tracing
+
+BUILD_DIR = Path("/home/chous/work/semantest/extension.chrome/build")
+PACKAGE_PATH = Path("/home/chous/work/semantest/extension.chrome") / "chatgpt-extension-v2.0.0.zip"
+BUDGET_PATH = Path(__file__).resolve().parent / "size_budget.json"
+
+def is_packaged(rel_path):
+    """Skip test files"""
+    return '.test.js' not in rel_path and '.spec.js' not in rel_path
+
+def create_chrome_extension_package(jobs=None, reachable_only=False, compression=None,
+                                    report=False, budget_path=BUDGET_PATH, release=False,
+                                    optimize=False):
     """Create Chrome extension ZIP package"""
     
     # Define paths
-    build_dir = Path("/home/chous/work/semantest/extension.chrome/build")
-    package_name = "chatgpt-extension-v2.0.0.zip"
-    package_path = Path("/home/chous/work/semantest/extension.chrome") / package_name
+    build_dir = BUILD_DIR
+    package_name = PACKAGE_PATH.name
+    package_path = PACKAGE_PATH
     
     print("🚀 Creating ChatGPT Extension v2.0.0 Package")
     print(f"📁 Source: {build_dir}")
@@ -21,69 +44,61 @@ def create_chrome_extension_package():
     if not build_dir.exists():
         raise FileNotFoundError(f"Build directory not found: {build_dir}")
     
-    # Remove existing package
-    if package_path.exists():
-        package_path.unlink()
-        print("🧹 Removed existing package")
-    
-    # Create ZIP package
-    file_count = 0
-    excluded_count = 0
-    
-    with zipfile.ZipFile(package_path, 'w', zipfile.ZIP_DEFLATED) as zipf:
-        for root, dirs, files in os.walk(build_dir):
-            for file in files:
-                file_path = Path(root) / file
-                rel_path = file_path.relative_to(build_dir)
-                
-                # Skip test files
-                if '.test.js' in file or '.spec.js' in file:
-                    excluded_count += 1
-                    continue
-                
-                # Add to ZIP
-                zipf.write(file_path, rel_path)
-                file_count += 1
-                print(f"  ✅ {rel_path}")
-    
-    print(f"📦 Added {file_count} files (excluded {excluded_count} test files)")
+    # Skip test files
+    all_files = scan_tree(build_dir)
+    files = [f for f in all_files if is_packaged(f.path)]
+    excluded_count = len(all_files) - len(files)
+    
+    # Ship only what manifest.json can reach
+    if reachable_only:
+        files, prune_report = prune_unreachable(build_dir, files)
+        print_prune_report(prune_report)
+    
+    # Minify JSON, strip source maps and recompress icons (cached by content)
+    if optimize:
+        files, optimize_report = optimize_files(build_dir, files)
+        print_optimize_report(optimize_report)
+    
+    # Create ZIP package (unchanged files are copied from the previous build)
+    result = build_package(build_dir, package_path, files=files, jobs=jobs,
+                           compression=compression)
+    for rel_path in result.names:
+        print(f"  ✅ {rel_path}")
+    
+    print(f"📦 Added {len(result.members)} files (excluded {excluded_count} test files)")
+    print(f"♻️  Reused {result.reused} unchanged files, {result.cached} from cache, compressed {result.compressed}, stored {result.stored}")
+    
+    # Source maps stay available for decoding crash reports, outside the package
+    if optimize:
+        symbols = write_debug_symbols(build_dir, optimize_report, debug_symbols_path(package_path),
+                                      compression=compression)
+        if symbols is not None:
+            print(f"🗺️  Debug symbols: {symbols.package_path} ({len(symbols.members)} source maps)")
+    
+    # What each compression policy would cost and save, per kind of file
+    if report:
+        print_compression_report(compression_report(files))
     
     # Verify package
     if package_path.exists():
-        size_bytes = package_path.stat().st_size
+        size_bytes = result.size
         size_mb = size_bytes / (1024 * 1024)
         
         print(f"\n✅ Package created successfully!")
         print(f"📦 Name: {package_name}")
         print(f"📏 Size: {size_mb:.2f}MB ({size_bytes:,} bytes)")
         print(f"📍 Location: {package_path}")
+        print(f"🔐 SHA-256: {result.sha256} ({write_sha256sums([package_path]).name})")
         
-        # Chrome Web Store size check
-        if size_mb <= 100:
-            print("✅ Size is within Chrome Web Store limits (100MB)")
-        else:
-            print("⚠️ WARNING: Size exceeds Chrome Web Store 100MB limit!")
+        # Package contents come from the inventory written with the package
+        print_summary(result.inventory)
         
-        # List contents
-        with zipfile.ZipFile(package_path, 'r') as zipf:
-            files = zipf.namelist()
-            print(f"\n📋 Package contains {len(files)} files:")
-            
-            # Show key files
-            key_files = ['manifest.json', 'background.js', 'content_script.js', 'popup.html', 'popup.js']
-            for key_file in key_files:
-                if key_file in files:
-                    print(f"  📄 {key_file}")
-            
-            # Show directories
-            dirs = set()
-            for f in files:
-                if '/' in f:
-                    dirs.add(f.split('/')[0])
-            
-            for d in sorted(dirs):
-                dir_files = [f for f in files if f.startswith(f"{d}/")]
-                print(f"  📂 {d}/ ({len(dir_files)} files)")
+        # Size by directory and file type against the budget and the last release
+        size_report = check_package_size(package_path, load_budget(budget_path), release=release)
+        print_breakdown(size_report.breakdown, size_report.baseline_sizes)
+        print_budget_report(size_report)
+        if not size_report.ok:
+            raise RuntimeError("Package is over its size budget")
         
         print(f"\n🎉 Chrome Extension Package Ready!")
         print(f"🏪 Ready for Chrome Web Store submission")
@@ -94,9 +109,59 @@ def create_chrome_extension_package():
     else:
         raise RuntimeError("Package creation failed - file not found")
 
+def watch_chrome_extension_package(debounce, compression="fast"):
+    """Rewrite changed members into the package on every save"""
+    
+    def on_update(result, changed, removed, elapsed):
+        if elapsed is None:
+            return
+        action = "Rebuilt" if result.compacted else "Updated"
+        names = ", ".join(changed + [f"-{name}" for name in removed])
+        print(f"♻️  {action} {len(changed) + len(removed)} files in {elapsed * 1000:.0f}ms: {names}")
+    
+    print(f"\n👀 Watching {BUILD_DIR} (Ctrl+C to stop)")
+    try:
+        watch_package(BUILD_DIR, PACKAGE_PATH, select=is_packaged,
+                      debounce=debounce, on_update=on_update, compression=compression)
+    except KeyboardInterrupt:
+        print("\n👋 Stopped watching")
+
 # Execute the function immediately
+parser = argparse.ArgumentParser(description="Create Chrome extension ZIP package")
+parser.add_argument("--jobs", "-j", type=int, default=None,
+                    help="deflate members in N worker processes (0 = all cores)")
+parser.add_argument("--reachable-only", action="store_true",
+                    help="package only files reachable from manifest.json")
+parser.add_argument("--watch", "-w", action="store_true",
+                    help="keep the package updated as files in the build directory change")
+parser.add_argument("--debounce", type=float, default=0.2,
+                    help="seconds without changes before the package is updated (default: 0.2)")
+parser.add_argument("--compression", choices=list(POLICIES),
+                    help="per-file compression policy: max for store submissions, fast for dev builds "
+                         "(default: deflate everything; fast in watch mode)")
+parser.add_argument("--compression-report", action="store_true",
+                    help="compare the size and time of every policy per kind of file")
+parser.add_argument("--optimize", action="store_true",
+                    help="minify JSON, strip source maps into a debug-symbols archive, recompress PNGs")
+parser.add_argument("--budget", type=Path, default=BUDGET_PATH,
+                    help="size budget to enforce (default: size_budget.json)")
+parser.add_argument("--release", action="store_true",
+                    help="record this build as a release, the baseline for later size growth checks")
+parser.add_argument("--trace", metavar="FILE",
+                    help="write a Chrome trace of the packaging stages to FILE")
+parser.add_argument("--profile", action="store_true",
+                    help="also run the build loop under cProfile and tracemalloc (implies --trace)")
+args, _ = parser.parse_known_args()
+
+tracer = Tracer(profile=args.profile) if args.trace or args.profile else None
 try:
-    package_location, package_size = create_chrome_extension_package()
+    with tracing(tracer):
+        package_location, package_size = create_chrome_extension_package(
+            jobs=args.jobs, reachable_only=args.reachable_only,
+            compression=args.compression, report=args.compression_report,
+            budget_path=args.budget, release=args.release, optimize=args.optimize)
+    if tracer is not None:
+        save_trace(tracer, args.trace or f"{PACKAGE_PATH}.trace.json")
     print(f"\n✅ PACKAGING COMPLETED SUCCESSFULLY!")
     print(f"📦 Final package location: {package_location}")
     print(f"📏 Final package size: {package_size:.2f}MB")
@@ -115,4 +180,10 @@ except Exception as e:
     FINAL_PACKAGE_SIZE_MB = 0
     PACKAGING_SUCCESS = False
 
-print("\n🔚 Script execution completed.")
\ No newline at end of file
+# Watch mode packages every non-test file; --reachable-only is not applied
+if args.watch and PACKAGING_SUCCESS:
+    watch_chrome_extension_package(args.debounce, args.compression or "fast")
+
+print("\n🔚 Script execution completed.")
+if not PACKAGING_SUCCESS:
+    sys.exit(1)
\ No newline at end of file
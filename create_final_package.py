@@ -4,11 +4,13 @@
 Final Package Creation for chatgpt-extension-v1.0.0.zip
 """
 
-import os
-import zipfile
+import argparse
 from pathlib import Path
 
-def create_final_package():
+from extension_packager import build_package
+from extension_packager.targets import source_files
+
+def create_final_package(jobs=None):
     """Create the final extension package"""
     
     # Define paths
@@ -20,106 +22,20 @@ def create_final_package():
     print(f"📁 Source: {source_dir}")
     print(f"📦 Target: {package_path}")
     
-    # Remove existing package
-    if package_path.exists():
-        package_path.unlink()
-        print("🧹 Removed existing package")
-    
-    # Files and directories to include
-    include_patterns = [
-        "manifest.json",
-        "package.json",
-        "tsconfig.json",
-        "src/**/*.ts",
-        "tests/**/*.ts",
-        "README.org",
-        "*.md"
-    ]
-    
-    # Files to exclude
-    exclude_patterns = [
-        "*.py",
-        "*.sh", 
-        "node_modules/",
-        ".git/",
-        "dist/",
-        "build/",
-        "__pycache__/",
-        "*.pyc"
-    ]
-    
-    file_count = 0
-    excluded_count = 0
+    # Configs, TypeScript sources, tests and docs
+    files = source_files(source_dir)
     
-    with zipfile.ZipFile(package_path, 'w', zipfile.ZIP_DEFLATED) as zipf:
-        
-        # Add manifest.json
-        manifest_path = source_dir / "manifest.json"
-        if manifest_path.exists():
-            zipf.write(manifest_path, "manifest.json")
-            file_count += 1
-            print(f"  ✅ manifest.json")
-        
-        # Add package.json
-        package_json_path = source_dir / "package.json"
-        if package_json_path.exists():
-            zipf.write(package_json_path, "package.json")
-            file_count += 1
-            print(f"  ✅ package.json")
-        
-        # Add tsconfig.json
-        tsconfig_path = source_dir / "tsconfig.json"
-        if tsconfig_path.exists():
-            zipf.write(tsconfig_path, "tsconfig.json")
-            file_count += 1
-            print(f"  ✅ tsconfig.json")
-        
-        # Add all TypeScript files from src/
-        src_dir = source_dir / "src"
-        if src_dir.exists():
-            for ts_file in src_dir.rglob("*.ts"):
-                rel_path = ts_file.relative_to(source_dir)
-                zipf.write(ts_file, rel_path)
-                file_count += 1
-                print(f"  ✅ {rel_path}")
-        
-        # Add test files
-        tests_dir = source_dir / "tests"
-        if tests_dir.exists():
-            for test_file in tests_dir.rglob("*.ts"):
-                rel_path = test_file.relative_to(source_dir)
-                zipf.write(test_file, rel_path)
-                file_count += 1
-                print(f"  ✅ {rel_path}")
-        
-        # Add README files
-        for readme_file in source_dir.glob("README*"):
-            if readme_file.is_file():
-                rel_path = readme_file.relative_to(source_dir)
-                zipf.write(readme_file, rel_path)
-                file_count += 1
-                print(f"  ✅ {rel_path}")
-        
-        # Add markdown files
-        for md_file in source_dir.glob("*.md"):
-            if md_file.is_file():
-                rel_path = md_file.relative_to(source_dir)
-                zipf.write(md_file, rel_path)
-                file_count += 1
-                print(f"  ✅ {rel_path}")
-        
-        # Add playwright config
-        playwright_config = source_dir / "playwright.config.ts"
-        if playwright_config.exists():
-            zipf.write(playwright_config, "playwright.config.ts")
-            file_count += 1
-            print(f"  ✅ playwright.config.ts")
+    # Unchanged files are copied from the previous build without recompressing
+    result = build_package(source_dir, package_path, files=files, jobs=jobs)
+    for rel_path in result.names:
+        print(f"  ✅ {rel_path}")
     
-    print(f"📦 Added {file_count} files to package")
+    print(f"📦 Added {len(result.members)} files to package")
+    print(f"♻️  Reused {result.reused} unchanged files, {result.cached} from cache, compressed {result.compressed}")
     
     # Verify package
     if package_path.exists():
-        size_bytes = package_path.stat().st_size
+        size_bytes = result.size
         size_mb = size_bytes / (1024 * 1024)
         
         print(f"\n✅ Package created successfully!")
@@ -127,44 +43,43 @@ def create_final_package():
         print(f"📏 Size: {size_mb:.2f}MB ({size_bytes:,} bytes)")
         print(f"📍 Location: {package_path}")
         
-        # List package contents
-        with zipfile.ZipFile(package_path, 'r') as zipf:
-            files = zipf.namelist()
-            print(f"\n📋 Package contains {len(files)} files:")
-            
-            # Group by type
-            manifests = [f for f in files if f == 'manifest.json']
-            configs = [f for f in files if f.endswith('.json') or f.endswith('.ts') and '/' not in f]
-            source_files = [f for f in files if f.startswith('src/')]
-            test_files = [f for f in files if f.startswith('tests/')]
-            docs = [f for f in files if f.endswith('.md') or f.endswith('.org')]
-            
-            if manifests:
-                print(f"  📄 Manifest: {len(manifests)} file(s)")
-                for f in manifests:
-                    print(f"    • {f}")
-            
-            if configs:
-                print(f"  ⚙️  Config files: {len(configs)} file(s)")
-                for f in configs:
-                    print(f"    • {f}")
-            
-            if source_files:
-                print(f"  💻 Source files: {len(source_files)} file(s)")
-                for f in source_files[:5]:  # Show first 5
-                    print(f"    • {f}")
-                if len(source_files) > 5:
-                    print(f"    • ... and {len(source_files) - 5} more")
-            
-            if test_files:
-                print(f"  🧪 Test files: {len(test_files)} file(s)")
-                for f in test_files:
-                    print(f"    • {f}")
-            
-            if docs:
-                print(f"  📚 Documentation: {len(docs)} file(s)")
-                for f in docs:
-                    print(f"    • {f}")
+        # List package contents (from the inventory written with the package)
+        files = [entry["path"] for entry in result.inventory["members"]]
+        print(f"\n📋 Package contains {len(files)} files:")
+        
+        # Group by type
+        manifests = [f for f in files if f == 'manifest.json']
+        configs = [f for f in files if f.endswith('.json') or f.endswith('.ts') and '/' not in f]
+        source_files = [f for f in files if f.startswith('src/')]
+        test_files = [f for f in files if f.startswith('tests/')]
+        docs = [f for f in files if f.endswith('.md') or f.endswith('.org')]
+        
+        if manifests:
+            print(f"  📄 Manifest: {len(manifests)} file(s)")
+            for f in manifests:
+                print(f"    • {f}")
+        
+        if configs:
+            print(f"  ⚙️  Config files: {len(configs)} file(s)")
+            for f in configs:
+                print(f"    • {f}")
+        
+        if source_files:
+            print(f"  💻 Source files: {len(source_files)} file(s)")
+            for f in source_files[:5]:  # Show first 5
+                print(f"    • {f}")
+            if len(source_files) > 5:
+                print(f"    • ... and {len(source_files) - 5} more")
+        
+        if test_files:
+            print(f"  🧪 Test files: {len(test_files)} file(s)")
+            for f in test_files:
+                print(f"    • {f}")
+        
+        if docs:
+            print(f"  📚 Documentation: {len(docs)} file(s)")
+            for f in docs:
+                print(f"    • {f}")
         
         return str(package_path), size_mb
     
@@ -172,8 +87,13 @@ def create_final_package():
         raise RuntimeError("Package creation failed")
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Create the final extension package")
+    parser.add_argument("--jobs", "-j", type=int, default=None,
+                        help="deflate members in N worker processes (0 = all cores)")
+    args = parser.parse_args()
+    
     try:
-        package_path, size_mb = create_final_package()
+        package_path, size_mb = create_final_package(jobs=args.jobs)
         
         print(f"\n" + "="*60)
         print("🎉 FINAL PACKAGE CREATION COMPLETED!")
@@ -1,10 +1,10 @@
 #!/usr/bin/env python3
 
-import zipfile
-import os
 import sys
 from pathlib import Path
 
+from extension_packager import STORE_EXCLUDES, PathMatcher, build_package, print_summary, scan_tree
+
 def main():
     print("🚀 Creating ChatGPT Extension package...")
     
@@ -20,54 +20,21 @@ def main():
         print("❌ Build directory not found!")
         return False
     
-    # Remove existing package
-    if package_path.exists():
-        try:
-            package_path.unlink()
-            print(f"🧹 Removed existing {package_name}")
-        except Exception as e:
-            print(f"⚠️ Could not remove existing package: {e}")
-    
-    # Files to exclude
-    exclude_patterns = {
-        '.map', '.ts', '.test.js', '.spec.js', 
-        'test/', 'tests/', 'spec/', '.md', 'README',
-        'LICENSE', '.log', '.git', 'node_modules/',
-        '.env', '.config.js', 'jest.config', 'tsconfig',
-        '.eslint', '.prettier', 'coverage/', 'docs/',
-        'documentation/', '.DS_Store', 'Thumbs.db',
-        '.tmp', '.temp'
-    }
-    
-    def should_exclude(file_path):
-        path_str = str(file_path).lower()
-        for pattern in exclude_patterns:
-            if pattern in path_str:
-                return True
-        return False
+    # Files to exclude (gitignore-style rules compiled once; excluded
+    # directories such as node_modules/ are never walked)
+    matcher = PathMatcher(STORE_EXCLUDES, ignore_case=True)
     
     # Create ZIP package
     try:
-        file_count = 0
-        with zipfile.ZipFile(package_path, 'w', zipfile.ZIP_DEFLATED) as zipf:
-            for root, dirs, files in os.walk(build_dir):
-                for file in files:
-                    file_path = Path(root) / file
-                    
-                    # Skip excluded files
-                    if should_exclude(file_path):
-                        print(f"  ⏭️  Skipped: {file_path.relative_to(build_dir)}")
-                        continue
-                    
-                    # Calculate relative path from build directory
-                    rel_path = file_path.relative_to(build_dir)
-                    
-                    # Add to ZIP
-                    zipf.write(file_path, rel_path)
-                    file_count += 1
-                    print(f"  ✅ Added: {rel_path}")
+        files = scan_tree(build_dir, select=matcher)
+        
+        # Unchanged files are copied from the previous build without recompressing
+        result = build_package(build_dir, package_path, files=files)
+        for rel_path in result.names:
+            print(f"  ✅ Added: {rel_path}")
         
-        print(f"📦 Added {file_count} files to package")
+        print(f"📦 Added {len(result.members)} files to package")
+        print(f"♻️  Reused {result.reused} unchanged files, {result.cached} from cache, compressed {result.compressed}")
         
     except Exception as e:
         print(f"❌ Error creating ZIP package: {e}")
@@ -76,7 +43,7 @@ def main():
     # Verify package
     if package_path.exists():
         try:
-            size_mb = package_path.stat().st_size / (1024 * 1024)
+            size_mb = result.size / (1024 * 1024)
             print(f"✅ Package created: {package_name}")
             print(f"📏 Size: {size_mb:.2f}MB")
             print(f"📍 Location: {package_path}")
@@ -87,17 +54,8 @@ def main():
             else:
                 print("✅ Package size is within Chrome Web Store limits")
             
-            # List some package contents
-            try:
-                with zipfile.ZipFile(package_path, 'r') as zipf:
-                    files = zipf.namelist()
-                    print(f"\n📋 Package contains {len(files)} files:")
-                    for file in sorted(files[:10]):
-                        print(f"  📄 {file}")
-                    if len(files) > 10:
-                        print(f"  ... and {len(files) - 10} more files")
-            except Exception as e:
-                print(f"⚠️ Could not list package contents: {e}")
+            # Package contents come from the inventory written with the package
+            print_summary(result.inventory, limit=10)
             
             print(f"\n🎉 Extension package ready!")
             print(f"📦 Package: {package_name}")
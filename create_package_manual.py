@@ -1,10 +1,10 @@
 #!/usr/bin/env python3
 
 # Manual package creation with immediate execution
-import zipfile
-import os
 from pathlib import Path
 
+from extension_packager import build_package, print_summary, scan_tree
+
 print("🚀 Starting manual Chrome extension packaging...")
 
 # Set up paths
@@ -22,36 +22,26 @@ if not build_path.exists():
 
 print("✅ Build directory confirmed")
 
-# Remove existing package if it exists
 package_path = Path(output_package)
-if package_path.exists():
-    package_path.unlink()
-    print("🧹 Removed existing package")
 
 # Count files and create file list
-files_to_include = []
-for root, dirs, files in os.walk(build_directory):
-    for file in files:
-        file_path = Path(root) / file
-        
-        # Skip test files
-        if '.test.js' in file or '.spec.js' in file:
-            continue
-            
-        rel_path = file_path.relative_to(build_path)
-        files_to_include.append((file_path, rel_path))
+files_to_include = [
+    entry for entry in scan_tree(build_path)
+    # Skip test files
+    if '.test.js' not in entry.path and '.spec.js' not in entry.path
+]
 
 print(f"📋 Found {len(files_to_include)} files to include")
 
-# Create the ZIP package
+# Create the ZIP package (unchanged files are copied from the previous build)
 print("📦 Creating ZIP package...")
 try:
-    with zipfile.ZipFile(output_package, 'w', zipfile.ZIP_DEFLATED) as zipf:
-        for file_path, rel_path in files_to_include:
-            zipf.write(file_path, rel_path)
-            print(f"  ✅ Added: {rel_path}")
+    result = build_package(build_path, package_path, files=files_to_include)
+    for rel_path in result.names:
+        print(f"  ✅ Added: {rel_path}")
     
     print(f"📦 Successfully created ZIP with {len(files_to_include)} files")
+    print(f"♻️  Reused {result.reused} unchanged files, {result.cached} from cache, compressed {result.compressed}")
     
 except Exception as e:
     print(f"❌ Error creating ZIP: {e}")
@@ -59,7 +49,7 @@ except Exception as e:
 
 # Verify the package was created and get its size
 if package_path.exists():
-    size_bytes = package_path.stat().st_size
+    size_bytes = result.size
     size_mb = size_bytes / (1024 * 1024)
     
     print(f"\n✅ Package created successfully!")
@@ -73,30 +63,8 @@ if package_path.exists():
     else:
         print("⚠️ WARNING: Package exceeds Chrome Web Store 100MB limit")
     
-    # Show package contents summary
-    try:
-        with zipfile.ZipFile(output_package, 'r') as zipf:
-            files = zipf.namelist()
-            print(f"\n📋 Package contains {len(files)} files:")
-            
-            # Show key files
-            key_files = ['manifest.json', 'background.js', 'content_script.js', 'popup.html', 'popup.js']
-            for key_file in key_files:
-                if key_file in files:
-                    print(f"  📄 {key_file}")
-            
-            # Show directories
-            directories = set()
-            for f in files:
-                if '/' in f:
-                    directories.add(f.split('/')[0])
-            
-            for d in sorted(directories):
-                dir_files = [f for f in files if f.startswith(f"{d}/")]
-                print(f"  📂 {d}/ ({len(dir_files)} files)")
-                
-    except Exception as e:
-        print(f"⚠️ Could not analyze package contents: {e}")
+    # Show package contents summary (from the inventory written with the package)
+    print_summary(result.inventory)
     
     print(f"\n🎉 Chrome Extension Package Ready!")
     print(f"🏪 Ready for Chrome Web Store submission")
@@ -1,9 +1,9 @@
 #!/usr/bin/env python3
 
-import zipfile
-import os
 from pathlib import Path
 
+from extension_packager import build_package, scan_tree
+
 # Define package details
 version = "1.0.0-beta"
 package_name = f"chatgpt-extension-v{version}.zip"
@@ -22,14 +22,11 @@ essential_files = {
     'storage.js'
 }
 
-# Create ZIP package
-with zipfile.ZipFile(package_path, 'w', zipfile.ZIP_DEFLATED) as zipf:
-    for root, dirs, files in os.walk(build_dir):
-        for file in files:
-            file_path = Path(root) / file
-            rel_path = file_path.relative_to(build_dir)
-            
-            if file in essential_files or 'assets' in str(rel_path):
-                zipf.write(file_path, rel_path)
+# Create ZIP package (unchanged files are copied from the previous build)
+files = [
+    entry for entry in scan_tree(build_dir)
+    if entry.path.rsplit('/', 1)[-1] in essential_files or 'assets' in entry.path
+]
+build_package(build_dir, package_path, files=files)
 
 print(f"Package created: {package_path}")
\ No newline at end of file
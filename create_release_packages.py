@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+
+"""
+Create the beta, stable and source-bundle packages in a single pass
+"""
+
+import argparse
+import time
+from pathlib import Path
+
+from extension_packager import build_packages, prune_unreachable, write_sha256sums
+from extension_packager.reachability import print_prune_report
+from extension_packager.compression import POLICIES
+from extension_packager.targets import SOURCE_PACKAGE, release_targets
+from extension_packager.trace import Tracer, save_trace, tracing
+
+def create_release_packages(jobs=None, reachable_only=False, compression=None):
+    """Build every release package, reading and compressing each file once"""
+
+    source_dir = Path("/home/chous/work/semantest/google.com")
+    targets = release_targets(source_dir)
+
+    print("🚀 Creating release packages v1.0.0")
+    print(f"📁 Source: {source_dir}")
+    for target in targets:
+        print(f"📦 Target: {target.package_path}")
+
+    # Ship only what manifest.json can reach; the source bundle keeps everything
+    if reachable_only:
+        for target in targets:
+            if target.package_path.name != SOURCE_PACKAGE:
+                target.files, report = prune_unreachable(source_dir, target.files)
+                print(f"\n📦 {target.package_path.name}")
+                print_prune_report(report)
+
+    start = time.perf_counter()
+    results = build_packages(source_dir, targets, jobs=jobs, compression=compression)
+    elapsed = time.perf_counter() - start
+
+    for result in results:
+        print(f"\n✅ {result.package_path.name}")
+        print(f"   📏 Size: {result.size:,} bytes ({len(result.members)} files)")
+        print(f"   ♻️  Reused {result.reused} unchanged files, {result.cached} from cache, compressed {result.compressed}, stored {result.stored}")
+        print(f"   🔐 SHA-256: {result.sha256}")
+
+    # Digests were taken while the archives were written; nothing is re-read
+    sums_path = write_sha256sums([result.package_path for result in results])
+    print(f"\n🔐 Checksums: {sums_path}")
+
+    distinct = len({name for result in results for name in result.names})
+    print(f"\n⏱️  Built {len(results)} packages from {distinct} distinct files in {elapsed:.2f}s")
+    return results
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Create all release packages in one pass")
+    parser.add_argument("--jobs", "-j", type=int, default=None,
+                        help="deflate members in N worker processes (0 = all cores)")
+    parser.add_argument("--reachable-only", action="store_true",
+                        help="package only files reachable from manifest.json")
+    parser.add_argument("--compression", choices=list(POLICIES),
+                        help="per-file compression policy; max for store submissions "
+                             "(default: deflate everything at the deterministic level)")
+    parser.add_argument("--trace", metavar="FILE",
+                        help="write a Chrome trace of the packaging stages to FILE")
+    parser.add_argument("--profile", action="store_true",
+                        help="also run the build loop under cProfile and tracemalloc (implies --trace)")
+    args = parser.parse_args()
+
+    tracer = Tracer(profile=args.profile) if args.trace or args.profile else None
+    try:
+        with tracing(tracer):
+            create_release_packages(jobs=args.jobs, reachable_only=args.reachable_only,
+                                    compression=args.compression)
+        if tracer is not None:
+            save_trace(tracer, args.trace or "release-packages.trace.json")
+
+        print(f"\n" + "="*60)
+        print("🎉 RELEASE PACKAGES CREATED!")
+        print("="*60)
+
+    except Exception as e:
+        print(f"\n❌ Package creation failed: {e}")
+        import traceback
+        traceback.print_exc()
@@ -1,9 +1,9 @@
 #!/usr/bin/env python3
 
-import zipfile
-import os
 from pathlib import Path
 
+from extension_packager import STORE_EXCLUDES, PathMatcher, build_package, print_summary, scan_tree
+
 def create_extension_package():
     """Create a Chrome Web Store ready ZIP package"""
     
@@ -18,54 +18,21 @@ def create_extension_package():
         print("❌ Build directory not found!")
         return False
     
-    # Remove existing package
-    if package_path.exists():
-        package_path.unlink()
-        print(f"🧹 Removed existing {package_name}")
-    
-    # Files to exclude
-    exclude_patterns = {
-        '.map', '.ts', '.test.js', '.spec.js', 
-        'test/', 'tests/', 'spec/', '.md', 'README',
-        'LICENSE', '.log', '.git', 'node_modules/',
-        '.env', '.config.js', 'jest.config', 'tsconfig',
-        '.eslint', '.prettier', 'coverage/', 'docs/',
-        'documentation/', '.DS_Store', 'Thumbs.db',
-        '.tmp', '.temp'
-    }
-    
-    def should_exclude(file_path):
-        """Check if file should be excluded"""
-        path_str = str(file_path).lower()
-        for pattern in exclude_patterns:
-            if pattern in path_str:
-                return True
-        return False
+    # Files to exclude (gitignore-style rules compiled once; excluded
+    # directories such as node_modules/ are never walked)
+    matcher = PathMatcher(STORE_EXCLUDES, ignore_case=True)
     
     # Create ZIP package
     try:
-        with zipfile.ZipFile(package_path, 'w', zipfile.ZIP_DEFLATED) as zipf:
-            file_count = 0
-            
-            # Walk through build directory
-            for root, dirs, files in os.walk(build_dir):
-                for file in files:
-                    file_path = Path(root) / file
-                    
-                    # Skip excluded files
-                    if should_exclude(file_path):
-                        print(f"  ⏭️  Skipped: {file_path.relative_to(build_dir)}")
-                        continue
-                    
-                    # Calculate relative path from build directory
-                    rel_path = file_path.relative_to(build_dir)
-                    
-                    # Add to ZIP
-                    zipf.write(file_path, rel_path)
-                    file_count += 1
-                    print(f"  ✅ Added: {rel_path}")
-            
-            print(f"📦 Added {file_count} files to package")
+        files = scan_tree(build_dir, select=matcher)
+        
+        # Unchanged files are copied from the previous build without recompressing
+        result = build_package(build_dir, package_path, files=files)
+        for rel_path in result.names:
+            print(f"  ✅ Added: {rel_path}")
+        
+        print(f"📦 Added {len(result.members)} files to package")
+        print(f"♻️  Reused {result.reused} unchanged files, {result.cached} from cache, compressed {result.compressed}")
     
     except Exception as e:
         print(f"❌ Error creating ZIP package: {e}")
@@ -73,7 +40,7 @@ def create_extension_package():
     
     # Verify package
     if package_path.exists():
-        size_mb = package_path.stat().st_size / (1024 * 1024)
+        size_mb = result.size / (1024 * 1024)
         print(f"✅ Package created: {package_name}")
         print(f"📏 Size: {size_mb:.2f}MB")
         print(f"📍 Location: {package_path}")
@@ -87,15 +54,8 @@ def create_extension_package():
         
         # List package contents
         print("\n📋 Package contents:")
-        try:
-            with zipfile.ZipFile(package_path, 'r') as zipf:
-                files = zipf.namelist()
-                for file in sorted(files[:20]):  # Show first 20 files
-                    print(f"  📄 {file}")
-                if len(files) > 20:
-                    print(f"  ... and {len(files) - 20} more files")
-        except Exception as e:
-            print(f"❌ Error listing package contents: {e}")
+        # Package contents come from the inventory written with the package
+        print_summary(result.inventory, limit=20)
         
         print(f"\n🎉 Extension package ready!")
         print(f"📦 Package: {package_name}")
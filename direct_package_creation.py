@@ -1,10 +1,10 @@
 #!/usr/bin/env python3
 
 # Direct inline execution of packaging
-import zipfile
-import os
 from pathlib import Path
 
+from extension_packager import PathMatcher, build_package, print_summary, scan_tree
+
 def create_package():
     """Create the Chrome extension package directly"""
     
@@ -23,50 +23,29 @@ def create_package():
     
     print("✅ Build directory confirmed")
     
-    # Remove existing package
-    if package_path.exists():
-        os.remove(package_path)
-        print("🧹 Removed existing package")
-    
     # Files to exclude
-    exclude_patterns = ['.test.js', '.spec.js', '.map']
+    matcher = PathMatcher(['*.test.js*', '*.spec.js*', '*.map*'], ignore_case=True)
     
     # Count files first
-    total_files = 0
-    included_files = []
-    
-    for root, dirs, files in os.walk(build_dir):
-        for file in files:
-            file_path = Path(root) / file
-            
-            # Check if file should be excluded
-            should_exclude = False
-            for pattern in exclude_patterns:
-                if pattern in file.lower():
-                    should_exclude = True
-                    break
-            
-            if not should_exclude:
-                rel_path = file_path.relative_to(build_dir)
-                included_files.append((file_path, rel_path))
-                total_files += 1
+    included_files = scan_tree(build_dir, select=matcher)
+    total_files = len(included_files)
     
     print(f"📋 Found {total_files} files to include")
     
-    # Create ZIP file
+    # Create ZIP file (unchanged files are copied from the previous build)
     print("📦 Creating ZIP archive...")
     
-    with zipfile.ZipFile(package_path, 'w', zipfile.ZIP_DEFLATED) as zipf:
-        for file_path, rel_path in included_files:
-            zipf.write(file_path, rel_path)
-            print(f"  ✅ Added: {rel_path}")
+    result = build_package(build_dir, package_path, files=included_files)
+    for rel_path in result.names:
+        print(f"  ✅ Added: {rel_path}")
+    print(f"♻️  Reused {result.reused} unchanged files, {result.cached} from cache, compressed {result.compressed}")
     
     # Verify package creation
     if not package_path.exists():
         raise RuntimeError("Package was not created successfully")
     
     # Get package statistics
-    package_size = package_path.stat().st_size
+    package_size = result.size
     size_mb = package_size / (1024 * 1024)
     
     print(f"\n✅ Package created successfully!")
@@ -82,36 +61,8 @@ def create_package():
     else:
         print("✅ Package size is within Chrome Web Store limits")
     
-    # List package contents
-    print("\n📋 Package contents:")
-    with zipfile.ZipFile(package_path, 'r') as zipf:
-        files = zipf.namelist()
-        
-        # Show manifest.json first if it exists
-        if 'manifest.json' in files:
-            print("  📄 manifest.json")
-        
-        # Show other key files
-        key_files = ['background.js', 'content_script.js', 'popup.html', 'popup.js']
-        for key_file in key_files:
-            if key_file in files:
-                print(f"  📄 {key_file}")
-        
-        # Show assets
-        asset_files = [f for f in files if f.startswith('assets/')]
-        if asset_files:
-            print(f"  📂 assets/ ({len(asset_files)} files)")
-        
-        # Show other directories
-        dirs = set()
-        for f in files:
-            if '/' in f:
-                dirs.add(f.split('/')[0])
-        
-        for d in sorted(dirs):
-            if d != 'assets':
-                dir_files = [f for f in files if f.startswith(f"{d}/")]
-                print(f"  📂 {d}/ ({len(dir_files)} files)")
+    # List package contents (from the inventory written with the package)
+    print_summary(result.inventory)
     
     print(f"\n🎉 Chrome Extension Package Ready!")
     print(f"🏪 Ready for Chrome Web Store submission")
@@ -1,17 +1,14 @@
-import zipfile
 import os
 from pathlib import Path
 
+from extension_packager import build_package, scan_tree
+
 # Execute package creation immediately
 version = "1.0.0-beta"
 package_name = f"chatgpt-extension-v{version}.zip"
 build_dir = Path("/home/chous/work/semantest/extension.chrome/build")
 package_path = Path("/home/chous/work/semantest/google.com") / package_name
 
-# Remove existing file
-if package_path.exists():
-    os.remove(package_path)
-
 # Essential files
 essential_files = {
     'manifest.json',
@@ -24,17 +21,12 @@ essential_files = {
     'storage.js'
 }
 
-# Create ZIP package
-with zipfile.ZipFile(package_path, 'w', zipfile.ZIP_DEFLATED) as zipf:
-    file_count = 0
-    for root, dirs, files in os.walk(build_dir):
-        for file in files:
-            file_path = Path(root) / file
-            rel_path = file_path.relative_to(build_dir)
-            
-            if file in essential_files or 'assets' in str(rel_path):
-                zipf.write(file_path, rel_path)
-                file_count += 1
+# Create ZIP package (unchanged files are copied from the previous build)
+files = [
+    entry for entry in scan_tree(build_dir)
+    if entry.path.rsplit('/', 1)[-1] in essential_files or 'assets' in entry.path
+]
+file_count = len(build_package(build_dir, package_path, files=files).members)
 
 # Output results
 print(f"✅ BETA Package created: {package_name}")
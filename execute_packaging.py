@@ -4,8 +4,8 @@
 print("🚀 Executing packaging using exec method...")
 
 packaging_code = '''
-import zipfile
 from pathlib import Path
+from extension_packager import build_package
 
 # Packaging execution
 build_dir = Path("/home/chous/work/semantest/extension.chrome/build")
@@ -15,25 +15,16 @@ print("📦 Creating package...")
 print(f"📁 Build: {build_dir}")
 print(f"📦 Package: {package_path}")
 
-# Remove old package
-if package_path.exists():
-    package_path.unlink()
-    print("🧹 Removed old package")
-
-# Create ZIP
-file_count = 0
-with zipfile.ZipFile(package_path, 'w', zipfile.ZIP_DEFLATED) as zipf:
-    for file_path in build_dir.rglob('*'):
-        if file_path.is_file() and '.test.' not in file_path.name:
-            rel_path = file_path.relative_to(build_dir)
-            zipf.write(file_path, rel_path)
-            file_count += 1
+# Create ZIP (unchanged files are copied from the previous build)
+result = build_package(build_dir, package_path,
+                       select=lambda rel_path: '.test.' not in rel_path.rsplit('/', 1)[-1])
+file_count = len(result.members)
 
 print(f"📦 Added {file_count} files")
 
 # Verify
 if package_path.exists():
-    size_mb = package_path.stat().st_size / (1024 * 1024)
+    size_mb = result.size / (1024 * 1024)
     print(f"✅ SUCCESS!")
     print(f"📦 Package: {package_path}")
     print(f"📏 Size: {size_mb:.2f}MB")
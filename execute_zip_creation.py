@@ -1,7 +1,7 @@
-import zipfile
-import os
 from pathlib import Path
 
+from extension_packager import PathMatcher, build_package
+
 # Execute the packaging process
 build_dir = Path("/home/chous/work/semantest/extension.chrome/build")
 package_name = "chatgpt-extension-v2.0.0.zip"
@@ -10,22 +10,9 @@ package_path = Path("/home/chous/work/semantest/extension.chrome") / package_nam
 # Ensure build directory exists
 assert build_dir.exists(), "Build directory not found"
 
-# Remove existing package if it exists
-if package_path.exists():
-    package_path.unlink()
-
-# Create the ZIP file
-with zipfile.ZipFile(package_path, 'w', zipfile.ZIP_DEFLATED) as zipf:
-    for root, dirs, files in os.walk(build_dir):
-        for file in files:
-            file_path = Path(root) / file
-            rel_path = file_path.relative_to(build_dir)
-            
-            # Skip test files and other unwanted files
-            if any(pattern in str(file_path).lower() for pattern in ['.test.js', '.spec.js', '.md']):
-                continue
-                
-            zipf.write(file_path, rel_path)
+# Create the ZIP file, skipping test files and other unwanted files
+matcher = PathMatcher(['*.test.js', '*.spec.js', '*.md'], ignore_case=True)
+build_package(build_dir, package_path, select=matcher)
 
 # Verify package was created
 assert package_path.exists(), "Package was not created"
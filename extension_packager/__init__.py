@@ -0,0 +1,56 @@
+"""
+Shared packaging engine behind the chatgpt-extension packaging scripts
+
+Names are imported from their modules on first use, so `python -m
+extension_packager` and scripts that only need one corner of the package
+do not pay for loading all of it.
+"""
+
+import importlib
+
+# Public name -> module that defines it
+_EXPORTS = {
+    "ArtifactStore": "artifacts",
+    "BlobCache": "blobcache",
+    "BuildResult": "engine",
+    "FileEntry": "walker",
+    "GitTarget": "gitsource",
+    "PackageTarget": "engine",
+    "PathMatcher": "matcher",
+    "Pipeline": "pipeline",
+    "STORE_EXCLUDES": "matcher",
+    "apply_delta": "delta",
+    "build_from_git": "gitsource",
+    "build_package": "engine",
+    "build_packages": "engine",
+    "check_package_size": "budget",
+    "create_delta": "delta",
+    "diff_packages": "verify",
+    "load_inventory": "inventory",
+    "optimize_files": "optimize",
+    "print_summary": "inventory",
+    "prune_unreachable": "reachability",
+    "reachable_files": "reachability",
+    "scan_tree": "walker",
+    "update_package": "engine",
+    "variant_targets": "variants",
+    "verify_package": "verify",
+    "walk_files": "walker",
+    "watch_package": "watch",
+    "write_sha256sums": "inventory",
+}
+
+__all__ = list(_EXPORTS)
+
+
+def __getattr__(name):
+    module = _EXPORTS.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(f".{module}", __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_EXPORTS))
@@ -0,0 +1,391 @@
+"""
+Content-addressed store of released packages, deduplicated by chunk
+
+Every package added to the store is split into chunks, each kept once
+under its sha256, plus a recipe listing the chunks in order. Any stored
+package can be rebuilt byte-for-byte from its recipe.
+
+ZIPs are cut where their content says records begin: at every local header
+and at the central directory. Between builds, an unchanged member has the
+same header and payload bytes, so it becomes the same chunk. Beta, stable
+and every hotfix build then share their unchanged members, and a new build
+only adds its changed members and its central directory. Records over
+MAX_CHUNK bytes, and files that are not ZIPs, are cut with a gear rolling
+hash (content-defined chunking), so an insertion only changes the chunks
+around it.
+
+The index (index.json) is small: one line per stored artifact, naming its
+recipe. Recipes are binary lists of (sha256, length) pairs. The chunk
+list of each oversized record is remembered by the record's sha256, so
+the rolling hash only ever runs over content the store has not seen. The
+store assumes one writer at a time.
+"""
+
+import hashlib
+import json
+import os
+import struct
+import time
+from dataclasses import dataclass
+from pathlib import Path
+
+from . import trace
+from .zipformat import read_central_directory, read_end_record
+
+STORE_VERSION = 1
+STORE_DIR_ENV = "EXTENSION_PACKAGER_ARTIFACTS"
+
+MIN_CHUNK = 16 * 1024
+MAX_CHUNK = 256 * 1024
+# A cut where the top 16 bits of the gear hash are zero: every 64 KiB on average
+_CUT_MASK = 0xFFFF << 48
+_GEAR = [int.from_bytes(hashlib.sha256(bytes([value])).digest()[:8], "little") for value in range(256)]
+_MASK64 = (1 << 64) - 1
+
+RECIPE_ENTRY = struct.Struct("<32sL")
+# Records are read in blocks of this size, never whole
+READ_SIZE = 1024 * 1024
+
+
+def default_store_dir():
+    """$EXTENSION_PACKAGER_ARTIFACTS, else ~/.cache/extension-packager/artifacts"""
+    if os.environ.get(STORE_DIR_ENV):
+        return Path(os.environ[STORE_DIR_ENV])
+    base = os.environ.get("XDG_CACHE_HOME") or Path.home() / ".cache"
+    return Path(base) / "extension-packager" / "artifacts"
+
+
+def _cut(data, offset):
+    """End of the content-defined chunk starting at offset
+
+    Only data[offset:offset + MAX_CHUNK] is looked at.
+    """
+    size = len(data)
+    if size - offset <= MIN_CHUNK:
+        return size
+    start = offset + MIN_CHUNK
+    limit = min(size, offset + MAX_CHUNK)
+    h = 0
+    gear = _GEAR
+    for position, byte in enumerate(data[start:limit], start):
+        h = ((h << 1) + gear[byte]) & _MASK64
+        if not h & _CUT_MASK:
+            return position + 1
+    return limit
+
+
+def content_chunks(data):
+    """(offset, length) of content-defined chunks covering data
+
+    Chunks are MIN_CHUNK to MAX_CHUNK bytes, except a shorter last one.
+    """
+    offset = 0
+    while offset < len(data):
+        cut = _cut(data, offset)
+        yield offset, cut - offset
+        offset = cut
+
+
+def _blocks(fp, start, end, block_size=READ_SIZE):
+    """Yield fp[start:end] in blocks of at most block_size bytes"""
+    fp.seek(start)
+    while start < end:
+        block = fp.read(min(block_size, end - start))
+        if not block:
+            raise ValueError(f"Truncated data in {fp.name}")
+        start += len(block)
+        yield block
+
+
+def _read(fp, start, end):
+    return b"".join(_blocks(fp, start, end))
+
+
+def region_chunks(fp, start, end):
+    """Yield the content_chunks() of fp[start:end] as bytes, reading it in blocks
+
+    A chunk is cut once MAX_CHUNK bytes past its start are buffered, which
+    is all content_chunks() looks at, so the chunks are the same as for
+    the whole region in memory.
+    """
+    buffer = b""
+    offset = 0
+    for block in _blocks(fp, start, end):
+        buffer = buffer[offset:] + block
+        offset = 0
+        while len(buffer) - offset >= MAX_CHUNK:
+            cut = _cut(buffer, offset)
+            yield buffer[offset:cut]
+            offset = cut
+    while offset < len(buffer):
+        cut = _cut(buffer, offset)
+        yield buffer[offset:cut]
+        offset = cut
+
+
+def _zip_records(fp, size):
+    """Offsets where a ZIP's local headers and central directory begin, or None"""
+    try:
+        members = read_central_directory(fp)
+        cd_offset = read_end_record(fp)[2]
+    except (ValueError, OSError):
+        return None
+    starts = {0, cd_offset, size}
+    starts.update(member.header_offset for member in members if member.header_offset < size)
+    return sorted(start for start in starts if start <= size)
+
+
+def package_records(fp):
+    """Yield (start, end) of the records of an open package, in order
+
+    A ZIP yields each member's local header and data, then its central
+    directory; anything else is one record.
+    """
+    size = os.fstat(fp.fileno()).st_size
+    starts = _zip_records(fp, size) or [0, size]
+    for start, end in zip(starts, starts[1:]):
+        if end > start:
+            yield start, end
+
+
+@dataclass
+class StoredArtifact:
+    """One entry of the store's index"""
+
+    name: str
+    sha256: str
+    size: int
+    chunks: int
+    added: float
+
+
+@dataclass
+class AddResult:
+    """Outcome of ArtifactStore.add()"""
+
+    artifact: StoredArtifact
+    new_chunks: int = 0
+    new_bytes: int = 0
+
+
+@dataclass
+class StoreStats:
+    """Logical size of every stored artifact against the bytes on disk"""
+
+    artifacts: int
+    logical_bytes: int
+    chunks: int
+    stored_bytes: int
+
+
+class ArtifactStore:
+    """Chunked, deduplicated store of package files
+
+    <root>/chunks/<sha[:2]>/<sha> holds each chunk, <root>/recipes/<sha>
+    the chunk list of each artifact (by the artifact's sha256) and
+    <root>/index.json the names and sizes of everything stored.
+    """
+
+    def __init__(self, root=None):
+        self.root = Path(root) if root is not None else default_store_dir()
+
+    @property
+    def index_path(self):
+        return self.root / "index.json"
+
+    def _chunk_path(self, sha256):
+        return self.root / "chunks" / sha256[:2] / sha256
+
+    def _recipe_path(self, sha256):
+        return self.root / "recipes" / sha256
+
+    def _record_path(self, sha256):
+        return self.root / "records" / sha256
+
+    def _record_entries(self, fp, start, end):
+        """Recipe entries for the record fp[start:end], chunking it only when it is new"""
+        if end - start <= MAX_CHUNK:
+            return RECIPE_ENTRY.pack(hashlib.sha256(_read(fp, start, end)).digest(), end - start)
+        sha256 = hashlib.sha256()
+        for block in _blocks(fp, start, end):
+            sha256.update(block)
+        record_path = self._record_path(sha256.hexdigest())
+        try:
+            return record_path.read_bytes()
+        except FileNotFoundError:
+            pass
+        entries = b"".join(
+            RECIPE_ENTRY.pack(hashlib.sha256(chunk).digest(), len(chunk))
+            for chunk in region_chunks(fp, start, end)
+        )
+        self._write_file(record_path, entries)
+        return entries
+
+    def load_index(self):
+        """Every StoredArtifact, oldest first"""
+        try:
+            with open(self.index_path, "r") as f:
+                index = json.load(f)
+        except FileNotFoundError:
+            return []
+        if index.get("version") != STORE_VERSION:
+            raise ValueError(f"{self.index_path}: unsupported store version {index.get('version')}")
+        return [StoredArtifact(**entry) for entry in index["artifacts"]]
+
+    def _save_index(self, artifacts):
+        self.root.mkdir(parents=True, exist_ok=True)
+        temp_path = self.index_path.with_name(f"index.json.{os.getpid()}.tmp")
+        with open(temp_path, "w") as f:
+            json.dump({
+                "version": STORE_VERSION,
+                "artifacts": [artifact.__dict__ for artifact in artifacts],
+            }, f, indent=1)
+            f.write("\n")
+        os.replace(temp_path, self.index_path)
+
+    def _write_file(self, path, data):
+        """Write data to path atomically"""
+        path.parent.mkdir(parents=True, exist_ok=True)
+        temp_path = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+        with open(temp_path, "wb") as f:
+            f.write(data)
+        os.replace(temp_path, path)
+
+    def add(self, package_path, name=None):
+        """Store a package under `name` (default: its file name)
+
+        Only chunks the store does not have yet are written. The package is
+        read in blocks, so memory does not grow with its largest member.
+        """
+        package_path = Path(package_path)
+        name = name or package_path.name
+        sha256 = hashlib.sha256()
+        recipe = bytearray()
+        size = new_chunks = new_bytes = 0
+        with trace.span("store", package=name) as span, open(package_path, "rb") as fp:
+            for start, end in package_records(fp):
+                for block in _blocks(fp, start, end):
+                    sha256.update(block)
+                entries = self._record_entries(fp, start, end)
+                recipe += entries
+                offset = start
+                for digest, length in RECIPE_ENTRY.iter_unpack(entries):
+                    chunk_path = self._chunk_path(digest.hex())
+                    if not chunk_path.exists():
+                        self._write_file(chunk_path, _read(fp, offset, offset + length))
+                        new_chunks += 1
+                        new_bytes += length
+                    offset += length
+                size += end - start
+            span.bytes_in = size
+            span.bytes_out = new_bytes
+
+        artifact = StoredArtifact(name, sha256.hexdigest(), size,
+                                  len(recipe) // RECIPE_ENTRY.size, time.time())
+        recipe_path = self._recipe_path(artifact.sha256)
+        if not recipe_path.exists():
+            self._write_file(recipe_path, bytes(recipe))
+        artifacts = [entry for entry in self.load_index()
+                     if (entry.name, entry.sha256) != (name, artifact.sha256)]
+        self._save_index(artifacts + [artifact])
+        return AddResult(artifact, new_chunks, new_bytes)
+
+    def find(self, ref):
+        """The newest artifact named `ref`, or whose sha256 starts with it"""
+        artifacts = self.load_index()
+        for artifact in reversed(artifacts):
+            if artifact.name == ref:
+                return artifact
+        if len(ref) >= 8:
+            matches = {artifact.sha256 for artifact in artifacts if artifact.sha256.startswith(ref.lower())}
+            if len(matches) > 1:
+                raise ValueError(f"{ref} matches {len(matches)} artifacts")
+            for artifact in reversed(artifacts):
+                if artifact.sha256 in matches:
+                    return artifact
+        raise ValueError(f"No stored artifact matches {ref}")
+
+    def restore(self, ref, output_path=None):
+        """Rebuild a stored artifact at output_path (default: its name)
+
+        The result is checked against the artifact's sha256 as it is
+        written; a damaged store never leaves a file behind.
+        """
+        artifact = self.find(ref)
+        output_path = Path(output_path or artifact.name)
+        with open(self._recipe_path(artifact.sha256), "rb") as f:
+            recipe = f.read()
+        temp_path = output_path.with_name(f"{output_path.name}.{os.getpid()}.tmp")
+        sha256 = hashlib.sha256()
+        try:
+            with trace.span("restore", package=artifact.name) as span, open(temp_path, "wb") as out:
+                for digest, length in RECIPE_ENTRY.iter_unpack(recipe):
+                    with open(self._chunk_path(digest.hex()), "rb") as f:
+                        chunk = f.read()
+                    if len(chunk) != length:
+                        raise ValueError(f"Chunk {digest.hex()} is damaged")
+                    out.write(chunk)
+                    sha256.update(chunk)
+                span.bytes_out = artifact.size
+            if sha256.hexdigest() != artifact.sha256:
+                raise ValueError(f"{artifact.name} does not match its sha256; the store is damaged")
+            os.replace(temp_path, output_path)
+        except BaseException:
+            temp_path.unlink(missing_ok=True)
+            raise
+        return output_path
+
+    def remove(self, ref):
+        """Drop an artifact from the index; gc() frees its chunks"""
+        artifact = self.find(ref)
+        artifacts = [entry for entry in self.load_index() if entry != artifact]
+        self._save_index(artifacts)
+        if all(entry.sha256 != artifact.sha256 for entry in artifacts):
+            self._recipe_path(artifact.sha256).unlink(missing_ok=True)
+        return artifact
+
+    def gc(self):
+        """Delete chunks and recipes no indexed artifact uses; returns bytes freed"""
+        live_recipes = {artifact.sha256 for artifact in self.load_index()}
+        live_chunks = set()
+        freed = 0
+        # Remembered chunk lists may name chunks about to go; they are only a shortcut
+        for record_path in (self.root / "records").glob("*"):
+            freed += record_path.stat().st_size
+            record_path.unlink()
+        recipes_dir = self.root / "recipes"
+        for recipe_path in recipes_dir.glob("*") if recipes_dir.exists() else ():
+            if recipe_path.name not in live_recipes:
+                freed += recipe_path.stat().st_size
+                recipe_path.unlink()
+                continue
+            live_chunks.update(digest.hex() for digest, _ in
+                               RECIPE_ENTRY.iter_unpack(recipe_path.read_bytes()))
+        for chunk_path in (self.root / "chunks").glob("*/*"):
+            if chunk_path.name not in live_chunks:
+                freed += chunk_path.stat().st_size
+                chunk_path.unlink()
+        return freed
+
+    def stats(self):
+        """StoreStats for the whole store"""
+        artifacts = self.load_index()
+        chunks = 0
+        stored_bytes = 0
+        for chunk_path in (self.root / "chunks").glob("*/*"):
+            chunks += 1
+            stored_bytes += chunk_path.stat().st_size
+        return StoreStats(len(artifacts), sum(artifact.size for artifact in artifacts),
+                          chunks, stored_bytes)
+
+
+def print_store(store, stats=None):
+    """Print the stored artifacts and how much space deduplication saves"""
+    stats = stats or store.stats()
+    print(f"🗄️  {store.root}: {stats.artifacts} artifacts")
+    for artifact in store.load_index():
+        added = time.strftime("%Y-%m-%d %H:%M", time.localtime(artifact.added))
+        print(f"  • {artifact.name}  {artifact.sha256[:12]}  {artifact.size:>12,} bytes  {added}")
+    ratio = stats.logical_bytes / stats.stored_bytes if stats.stored_bytes else 1
+    print(f"📏 {stats.logical_bytes:,} bytes stored in {stats.stored_bytes:,} bytes "
+          f"of {stats.chunks} chunks ({ratio:.1f}x)")
@@ -0,0 +1,425 @@
+"""
+Benchmarks for the packaging engine over synthetic build trees
+
+Each scenario generates a tree shaped like one of our real builds: lots of
+tiny modules, a few multi-megabyte bundles, already-compressed PNGs, or a
+deep node_modules that the matcher has to prune. Trees come from a seeded
+generator, so every machine benchmarks the same bytes, and nothing is
+downloaded. Every case runs in a fresh interpreter so its peak RSS is its
+own. The cli-startup scenario times `python -m extension_packager` itself,
+interpreter start-up included, on a tree small enough that start-up is
+most of the cost. The browser-variants scenario builds the Chrome, Edge and
+Firefox packages in one pass and as three separate runs. big-bundles and
+split-bundles are also packaged with one and with four worker processes.
+"""
+
+import json
+import os
+import platform
+import random
+import shutil
+import statistics
+import subprocess
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import asdict, dataclass, field
+from multiprocessing import get_context
+from pathlib import Path
+
+from .engine import build_package, build_packages
+from .matcher import PathMatcher
+from .trace import peak_rss
+from .walker import scan_tree
+
+BASELINE_VERSION = 1
+MODES = ("cold", "warm")
+
+_WORDS = (
+    "const let var function return if else for while import export from "
+    "default class extends new this await async null undefined true false "
+    "document window chrome runtime sendMessage addEventListener query "
+    "result search value index length push map filter reduce then catch "
+    "Promise JSON stringify parse console log error 0 1 2 10 100 => ( ) "
+    "{ } [ ] ; , . = === !== + - * && || ? :"
+).split()
+
+
+def _text(rng, size):
+    """Minified-JavaScript-like text that deflates about as well as ours does"""
+    block = " ".join(rng.choice(_WORDS) + (str(rng.randrange(1000)) if rng.random() < 0.2 else "")
+                     for _ in range(min(size, 256 * 1024) // 4)).encode()
+    parts = []
+    remaining = size
+    counter = 0
+    while remaining > 0:
+        # Repeats of one block sit further apart than deflate's window
+        piece = b"/*%d*/" % counter + block
+        parts.append(piece[:remaining])
+        remaining -= len(parts[-1])
+        counter += 1
+    return b"".join(parts)
+
+
+def _write(root, rel_path, data):
+    path = root / rel_path
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_bytes(data)
+    return len(data)
+
+
+def _tiny_files(root, rng, scale):
+    count = int(4000 * scale)
+    for index in range(count):
+        folder = f"dist/modules/m{index % 50:02d}"
+        _write(root, f"{folder}/chunk{index}.js", _text(rng, rng.randrange(200, 2048)))
+
+
+def _big_bundles(root, rng, scale):
+    for index in range(3):
+        size = int((6 + 2 * index) * 1024 * 1024 * scale)
+        _write(root, f"dist/bundle{index}.js", _text(rng, size))
+    _write(root, "manifest.json", b'{"manifest_version": 3, "name": "bench", "version": "1.0.0"}')
+
+
+def _split_bundles(root, rng, scale):
+    # Code-split chunks, each deflated whole by one worker
+    for index in range(int(16 * scale)):
+        size = rng.randrange(1024 * 1024, 3 * 1024 * 1024)
+        _write(root, f"dist/chunk{index:02d}.js", _text(rng, size))
+    _write(root, "manifest.json", b'{"manifest_version": 3, "name": "bench", "version": "1.0.0"}')
+
+
+def _png_assets(root, rng, scale):
+    for index in range(int(200 * scale)):
+        data = b"\x89PNG\r\n\x1a\n" + rng.randbytes(rng.randrange(20_000, 200_000))
+        _write(root, f"icons/img{index:03d}.png", data)
+
+
+def _node_modules(root, rng, scale):
+    for index in range(int(300 * scale)):
+        _write(root, f"dist/app{index}.js", _text(rng, rng.randrange(500, 5000)))
+    packages = int(150 * scale)
+    for index in range(packages):
+        # Nested dependencies, eight levels deep
+        parts = ["node_modules"]
+        for depth in range(8):
+            parts += [f"pkg{(index + depth) % 37}", "node_modules"]
+        folder = "/".join(parts[:-1])
+        for name in ("index.js", "package.json", "README.md", "lib/util.js"):
+            _write(root, f"{folder}/{name}", _text(rng, rng.randrange(100, 3000)))
+
+
+def _extension(root, rng, scale):
+    _write(root, "manifest.json", b'{"manifest_version": 3, "name": "bench", "version": "1.0.0", '
+                                  b'"background": {"service_worker": "background.js"}}')
+    _write(root, "background.js", _text(rng, 4000))
+    for index in range(max(1, int(20 * scale))):
+        _write(root, f"dist/chunk{index}.js", _text(rng, rng.randrange(500, 5000)))
+
+
+def _variant_extension(root, rng, scale):
+    _extension(root, rng, scale * 10)
+    _write(root, "dist/bundle.js", _text(rng, int(2 * 1024 * 1024 * scale)))
+    for index in range(int(20 * scale)):
+        data = b"\x89PNG\r\n\x1a\n" + rng.randbytes(rng.randrange(2_000, 20_000))
+        _write(root, f"icons/icon{index:02d}.png", data)
+
+
+# Runs the CLI as `python -m` would and reports the child's own peak RSS;
+# ru_maxrss of a child includes whatever its parent had mapped before exec()
+_CLI_SHIM = """
+import runpy, sys
+sys.argv[0] = "extension_packager"
+try:
+    runpy.run_module("extension_packager", run_name="__main__", alter_sys=True)
+finally:
+    try:
+        with open("/proc/self/status") as f:
+            hwm = next((line.split()[1] for line in f if line.startswith("VmHWM:")), "0")
+    except OSError:
+        hwm = "0"
+    sys.stderr.write(f"\\nVmHWM {hwm}\\n")
+"""
+
+
+def _run_cli(args):
+    """Run the CLI in a new interpreter; returns (seconds, peak RSS in bytes)"""
+    package_root = str(Path(__file__).resolve().parent.parent)
+    python_path = os.pathsep.join(filter(None, [package_root, os.environ.get("PYTHONPATH")]))
+    start = time.perf_counter()
+    process = subprocess.run([sys.executable, "-c", _CLI_SHIM, *args],
+                             env=dict(os.environ, PYTHONPATH=python_path),
+                             stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True)
+    seconds = time.perf_counter() - start
+    if process.returncode != 0:
+        raise RuntimeError(f"extension_packager {' '.join(args)} failed:\n{process.stderr}")
+    hwm = [line for line in process.stderr.splitlines() if line.startswith("VmHWM ")]
+    return seconds, int(hwm[-1].split()[1]) * 1024 if hwm else 0
+
+
+def _run_cli_case(root, scenario, mode, repeat):
+    """Time `python -m extension_packager build` or `verify` from a cold interpreter"""
+    root = Path(root)
+    package_path = root.parent / f"{root.name}.zip"
+    build = ["build", str(root), "-o", str(package_path), "--no-cache"]
+    if mode == "verify":
+        _run_cli(build)
+    args = {"build": build + ["--no-incremental"], "verify": ["verify", str(package_path)]}[mode]
+
+    runs = []
+    peak = 0
+    for _ in range(repeat):
+        seconds, rss = _run_cli(args)
+        runs.append(seconds)
+        peak = max(peak, rss)
+
+    files = scan_tree(root)
+    seconds = statistics.median(runs)
+    input_bytes = sum(entry.size for entry in files)
+    return CaseResult(
+        files=len(files),
+        input_bytes=input_bytes,
+        package_bytes=package_path.stat().st_size,
+        seconds=seconds,
+        mb_per_s=input_bytes / seconds / 1e6,
+        peak_rss_mb=peak / 1e6,
+        runs=runs,
+    )
+
+
+def _run_variants_case(root, scenario, mode, repeat):
+    """Build the three browser packages in one pass or as separate runs"""
+    from .variants import variant_targets
+
+    root = Path(root)
+    package_path = root.parent / f"{root.name}.zip"
+    runs = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        files = scan_tree(root)
+        targets = variant_targets(package_path, files=files, gecko_id="bench@semantest")
+        if mode == "one-pass":
+            results = build_packages(root, targets, incremental=False, cache=False)
+        else:
+            results = [build_packages(root, [target], incremental=False, cache=False)[0]
+                       for target in targets]
+        runs.append(time.perf_counter() - start)
+
+    seconds = statistics.median(runs)
+    input_bytes = sum(entry.size for entry in files)
+    return CaseResult(
+        files=len(files),
+        input_bytes=input_bytes,
+        package_bytes=sum(result.size for result in results),
+        seconds=seconds,
+        mb_per_s=input_bytes / seconds / 1e6,
+        peak_rss_mb=_peak_rss() / 1e6,
+        runs=runs,
+    )
+
+
+@dataclass
+class Scenario:
+    """A synthetic tree and the rules used to package it
+
+    `run` replaces the usual engine case for scenarios that measure
+    something else; it is called like _run_case() for each of `modes`.
+    """
+
+    name: str
+    description: str
+    generate: object
+    excludes: list = field(default_factory=list)
+    modes: tuple = MODES
+    run: object = None
+
+
+SCENARIOS = {
+    scenario.name: scenario for scenario in [
+        Scenario("tiny-files", "4,000 small JavaScript modules", _tiny_files),
+        Scenario("big-bundles", "three 6-10 MB bundles (streamed)", _big_bundles,
+                 modes=(*MODES, "jobs-1", "jobs-4")),
+        Scenario("split-bundles", "sixteen 1-3 MB bundles", _split_bundles,
+                 modes=("jobs-1", "jobs-4")),
+        Scenario("png-assets", "200 already-compressed PNGs", _png_assets),
+        Scenario("node-modules", "300 files beside a deep node_modules that is pruned",
+                 _node_modules, ["node_modules/"]),
+        Scenario("cli-startup", "python -m extension_packager build and verify of a 22-file extension",
+                 _extension, modes=("build", "verify"), run=_run_cli_case),
+        Scenario("browser-variants", "Chrome, Edge and Firefox packages of a 2 MB extension",
+                 _variant_extension, modes=("one-pass", "separate"), run=_run_variants_case),
+    ]
+}
+
+
+def _peak_rss():
+    """This process's peak RSS in bytes
+
+    VmHWM belongs to the address space, unlike ru_maxrss, which Linux
+    carries across exec() from the parent that generated the trees.
+    """
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    return peak_rss()
+
+
+def generate_tree(root, scenario, scale=1.0, seed=1):
+    """Create a scenario's tree under root, replacing anything already there"""
+    root = Path(root)
+    shutil.rmtree(root, ignore_errors=True)
+    root.mkdir(parents=True)
+    SCENARIOS[scenario].generate(root, random.Random(f"{scenario}-{seed}"), scale)
+    return root
+
+
+@dataclass
+class CaseResult:
+    """Measurements for one scenario and mode"""
+
+    files: int
+    input_bytes: int
+    package_bytes: int
+    seconds: float
+    mb_per_s: float
+    peak_rss_mb: float
+    runs: list
+
+
+def _run_case(root, scenario, mode, repeat):
+    """Package a generated tree `repeat` times; runs in a fresh interpreter"""
+    root = Path(root)
+    package_path = root.parent / f"{root.name}.zip"
+    select = PathMatcher(SCENARIOS[scenario].excludes)
+    incremental = mode == "warm"
+    # jobs-N packages cold with N worker processes
+    jobs = int(mode[len("jobs-"):]) if mode.startswith("jobs-") else None
+    if incremental:
+        # Prime the hash manifest so every timed run reuses all members
+        build_package(root, package_path, select=select, cache=False)
+
+    runs = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        files = scan_tree(root, select=select)
+        result = build_package(root, package_path, files=files,
+                               incremental=incremental, jobs=jobs, cache=False)
+        runs.append(time.perf_counter() - start)
+
+    seconds = statistics.median(runs)
+    input_bytes = sum(entry.size for entry in files)
+    return CaseResult(
+        files=len(files),
+        input_bytes=input_bytes,
+        package_bytes=result.size,
+        seconds=seconds,
+        mb_per_s=input_bytes / seconds / 1e6,
+        peak_rss_mb=_peak_rss() / 1e6,
+        runs=runs,
+    )
+
+
+def run_benchmarks(workdir, scenarios=None, scale=1.0, repeat=3, progress=None):
+    """Generate each scenario's tree and time every mode over it
+
+    Returns {"scenario/mode": CaseResult}. `progress(case, result)` is
+    called as each case finishes.
+    """
+    workdir = Path(workdir)
+    results = {}
+    context = get_context("spawn")
+    for scenario in scenarios or SCENARIOS:
+        root = generate_tree(workdir / scenario, scenario, scale)
+        run = SCENARIOS[scenario].run or _run_case
+        for mode in SCENARIOS[scenario].modes:
+            with ProcessPoolExecutor(max_workers=1, mp_context=context) as pool:
+                result = pool.submit(run, str(root), scenario, mode, repeat).result()
+            case = f"{scenario}/{mode}"
+            results[case] = result
+            if progress is not None:
+                progress(case, result)
+        shutil.rmtree(root, ignore_errors=True)
+    return results
+
+
+def machine_info():
+    return {
+        "python": platform.python_version(),
+        "implementation": platform.python_implementation(),
+        "system": f"{platform.system()} {platform.machine()}",
+        "cpus": os.cpu_count(),
+    }
+
+
+def load_baseline(path):
+    """The committed baseline, or None when there is none yet"""
+    try:
+        with open(path) as f:
+            baseline = json.load(f)
+    except FileNotFoundError:
+        return None
+    if baseline.get("version") != BASELINE_VERSION:
+        raise ValueError(f"{path}: unsupported baseline version {baseline.get('version')}")
+    return baseline
+
+
+def save_baseline(path, results, scale, repeat):
+    baseline = {
+        "version": BASELINE_VERSION,
+        "scale": scale,
+        "repeat": repeat,
+        "machine": machine_info(),
+        "results": {case: asdict(result) for case, result in results.items()},
+    }
+    Path(path).parent.mkdir(parents=True, exist_ok=True)
+    with open(path, "w") as f:
+        json.dump(baseline, f, indent=2, sort_keys=True)
+        f.write("\n")
+
+
+@dataclass
+class Comparison:
+    """One case against its baseline; ratios above 1 mean worse"""
+
+    case: str
+    time_ratio: float
+    rss_ratio: float
+    regressed: bool
+
+
+def compare(results, baseline, tolerance=0.25):
+    """Compare results with a baseline; a case regresses when its time or
+    peak RSS grows by more than `tolerance`"""
+    comparisons = {}
+    for case, result in results.items():
+        old = baseline["results"].get(case)
+        if old is None:
+            continue
+        time_ratio = result.seconds / old["seconds"]
+        rss_ratio = result.peak_rss_mb / old["peak_rss_mb"]
+        comparisons[case] = Comparison(
+            case, time_ratio, rss_ratio,
+            time_ratio > 1 + tolerance or rss_ratio > 1 + tolerance,
+        )
+    return comparisons
+
+
+def print_results(results, comparisons=None):
+    """Print a table of results, with the change from the baseline when known"""
+    comparisons = comparisons or {}
+    width = max((len(case) for case in results), default=4)
+    print(f"\n  {'case':<{width}}  {'files':>6}  {'time':>9}  {'MB/s':>7}  {'peak RSS':>9}  vs baseline")
+    for case, result in results.items():
+        line = (f"  {case:<{width}}  {result.files:>6}  {result.seconds * 1000:>7.1f}ms  "
+                f"{result.mb_per_s:>7.1f}  {result.peak_rss_mb:>7.1f}MB")
+        comparison = comparisons.get(case)
+        if comparison is not None:
+            icon = "❌" if comparison.regressed else "✅"
+            line += (f"  {icon} time {comparison.time_ratio - 1:+.0%}, "
+                     f"RSS {comparison.rss_ratio - 1:+.0%}")
+        print(line)
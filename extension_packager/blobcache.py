@@ -0,0 +1,124 @@
+"""
+Content-addressed cache of deflated blobs shared by every build
+
+Blobs are keyed by the sha256 of the uncompressed content and the
+compression level, so beta, stable and v2 builds (and any branch) reuse the
+same compressed icons, bundles and manifests. The cache is bounded in size;
+the least recently used blobs are evicted first.
+"""
+
+import os
+from pathlib import Path
+
+from .zipformat import FileRegion, iter_region
+
+DEFAULT_MAX_BYTES = 512 * 1024 * 1024
+CACHE_DIR_ENV = "EXTENSION_PACKAGER_CACHE"
+
+
+def default_cache_dir():
+    """$EXTENSION_PACKAGER_CACHE, else ~/.cache/extension-packager/blobs"""
+    if os.environ.get(CACHE_DIR_ENV):
+        return Path(os.environ[CACHE_DIR_ENV])
+    base = os.environ.get("XDG_CACHE_HOME") or Path.home() / ".cache"
+    return Path(base) / "extension-packager" / "blobs"
+
+
+class BlobCache:
+    """On-disk LRU store of compressed payloads
+
+    Each blob lives in <root>/<sha[:2]>/<sha>-<level>. Its mtime is bumped
+    on every hit and doubles as the last-use time for eviction. Writes go
+    through a temporary file and os.replace(), so concurrent builds and
+    worker processes can share one cache.
+    """
+
+    def __init__(self, root=None, max_bytes=DEFAULT_MAX_BYTES):
+        self.root = Path(root) if root is not None else default_cache_dir()
+        self.max_bytes = max_bytes
+
+    def _path(self, sha256, compresslevel):
+        level = "default" if compresslevel is None else compresslevel
+        return self.root / sha256[:2] / f"{sha256}-{level}"
+
+    def get(self, sha256, compresslevel):
+        """Return the cached payload, or None on a miss"""
+        path = self._path(sha256, compresslevel)
+        try:
+            with open(path, "rb") as f:
+                payload = f.read()
+            os.utime(path)
+        except OSError:
+            return None
+        return payload
+
+    def locate(self, sha256, compresslevel):
+        """Return the cached payload as a FileRegion, or None on a miss
+
+        Lets large blobs be copied in chunks instead of read into memory.
+        """
+        path = self._path(sha256, compresslevel)
+        try:
+            os.utime(path)
+            size = os.path.getsize(path)
+        except OSError:
+            return None
+        return FileRegion(str(path), 0, size)
+
+    def put(self, sha256, compresslevel, payload):
+        """Store a payload; failures only cost a future cache miss
+
+        `payload` is bytes or a FileRegion, which is copied in chunks.
+        """
+        path = self._path(sha256, compresslevel)
+        temp_path = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            with open(temp_path, "wb") as f:
+                if isinstance(payload, FileRegion):
+                    for chunk in iter_region(payload):
+                        f.write(chunk)
+                else:
+                    f.write(payload)
+            os.replace(temp_path, path)
+        except (OSError, ValueError):
+            try:
+                temp_path.unlink()
+            except OSError:
+                pass
+
+    def evict(self):
+        """Delete least recently used blobs until the cache fits max_bytes
+
+        Returns the number of bytes freed.
+        """
+        blobs = []
+        total = 0
+        try:
+            shards = list(os.scandir(self.root))
+        except OSError:
+            return 0
+        for shard in shards:
+            if not shard.is_dir(follow_symlinks=False):
+                continue
+            with os.scandir(shard.path) as entries:
+                for entry in entries:
+                    if entry.name.endswith(".tmp"):
+                        continue
+                    st = entry.stat(follow_symlinks=False)
+                    blobs.append((st.st_mtime, st.st_size, entry.path))
+                    total += st.st_size
+
+        freed = 0
+        if total <= self.max_bytes:
+            return freed
+        blobs.sort()
+        for _, size, path in blobs:
+            if total - freed <= self.max_bytes:
+                break
+            try:
+                os.unlink(path)
+            except OSError:
+                continue
+            freed += size
+        return freed
@@ -0,0 +1,328 @@
+"""
+Package size budgets with a local SQLite history
+
+Every checked build's size, split by top-level directory and file type, is
+recorded in a SQLite database. A build fails its budget when the archive
+is over `max_bytes` or a directory or file type is over its own limit. It
+also fails when the archive grew by more than `max_growth` since the last
+release of the same package. Package size is what users download on
+install and on every update.
+
+Figures come from the package inventory (or the central directory), so
+checking a budget never reads member data.
+"""
+
+import json
+import os
+import posixpath
+import re
+import sqlite3
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+
+HISTORY_ENV = "EXTENSION_PACKAGER_SIZE_HISTORY"
+# Chrome Web Store upload limit the release scripts have always checked
+STORE_LIMIT = 100 * 1024 * 1024
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS builds (
+    id INTEGER PRIMARY KEY,
+    series TEXT NOT NULL,
+    package TEXT NOT NULL,
+    sha256 TEXT,
+    archive_size INTEGER NOT NULL,
+    raw_size INTEGER NOT NULL,
+    files INTEGER NOT NULL,
+    release INTEGER NOT NULL DEFAULT 0,
+    built_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS builds_series ON builds (series, release, id);
+CREATE TABLE IF NOT EXISTS sizes (
+    build_id INTEGER NOT NULL REFERENCES builds (id),
+    kind TEXT NOT NULL,
+    name TEXT NOT NULL,
+    files INTEGER NOT NULL,
+    size INTEGER NOT NULL,
+    compressed_size INTEGER NOT NULL,
+    PRIMARY KEY (build_id, kind, name)
+);
+"""
+
+
+def default_history_path():
+    """$EXTENSION_PACKAGER_SIZE_HISTORY, else ~/.cache/extension-packager/size-history.sqlite"""
+    if os.environ.get(HISTORY_ENV):
+        return Path(os.environ[HISTORY_ENV])
+    base = os.environ.get("XDG_CACHE_HOME") or Path.home() / ".cache"
+    return Path(base) / "extension-packager" / "size-history.sqlite"
+
+
+def series_name(package_name):
+    """The package name without its version, so v1.0.0 and v1.0.1 share a history"""
+    return re.sub(r"-v\d+(?:\.\d+)*", "", package_name)
+
+
+@dataclass
+class SizeTotals:
+    """Files and bytes of one directory or file type"""
+
+    files: int = 0
+    size: int = 0
+    compressed_size: int = 0
+
+
+@dataclass
+class SizeBreakdown:
+    """Raw and compressed size of a package by top-level directory and file type"""
+
+    package: str
+    archive_size: int
+    sha256: str = None
+    files: int = 0
+    size: int = 0
+    directories: dict = field(default_factory=dict)
+    types: dict = field(default_factory=dict)
+
+
+def _file_type(path):
+    suffix = posixpath.splitext(path)[1].lower()
+    return suffix or "(none)"
+
+
+def size_breakdown(inventory):
+    """SizeBreakdown from a package inventory
+
+    Files at the archive root are grouped under "/".
+    """
+    breakdown = SizeBreakdown(inventory["package"], inventory["archive_size"],
+                              inventory.get("sha256"))
+    for entry in inventory["members"]:
+        path = entry["path"]
+        directory = path.split("/", 1)[0] if "/" in path else "/"
+        for totals in (breakdown.directories.setdefault(directory, SizeTotals()),
+                       breakdown.types.setdefault(_file_type(path), SizeTotals())):
+            totals.files += 1
+            totals.size += entry["size"]
+            totals.compressed_size += entry["compressed_size"]
+        breakdown.files += 1
+        breakdown.size += entry["size"]
+    return breakdown
+
+
+def package_breakdown(package_path):
+    """SizeBreakdown of a package from its inventory, else its central directory"""
+    from .inventory import load_inventory
+
+    package_path = Path(package_path)
+    try:
+        inventory = load_inventory(package_path)
+        if inventory["archive_size"] == package_path.stat().st_size:
+            return size_breakdown(inventory)
+    except (OSError, ValueError, KeyError):
+        pass
+    from .verify import read_members
+
+    members, archive_size = read_members(package_path)
+    return size_breakdown({
+        "package": package_path.name,
+        "archive_size": archive_size,
+        "members": [{"path": member.name, "size": member.file_size,
+                     "compressed_size": member.compressed_size} for member in members],
+    })
+
+
+@dataclass
+class SizeBudget:
+    """Limits a build must stay within
+
+    `directories` and `types` map a top-level directory or a suffix
+    (".png") to the most compressed bytes it may take.
+    """
+
+    max_bytes: int = STORE_LIMIT
+    max_growth: float = None
+    directories: dict = field(default_factory=dict)
+    types: dict = field(default_factory=dict)
+
+
+def load_budget(path):
+    """SizeBudget from a JSON file with the same keys"""
+    with open(path, "r") as f:
+        budget = json.load(f)
+    unknown = set(budget) - {"max_bytes", "max_growth", "directories", "types"}
+    if unknown:
+        raise ValueError(f"{path}: unknown budget keys: {', '.join(sorted(unknown))}")
+    return SizeBudget(**budget)
+
+
+@dataclass
+class BuildRecord:
+    """One build in the size history"""
+
+    id: int
+    package: str
+    sha256: str
+    archive_size: int
+    raw_size: int
+    files: int
+    release: bool
+    built_at: float
+
+
+class SizeHistory:
+    """SQLite history of package sizes"""
+
+    def __init__(self, path=None):
+        self.path = Path(path) if path is not None else default_history_path()
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.db = sqlite3.connect(self.path)
+        self.db.executescript(_SCHEMA)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        self.db.close()
+
+    def record(self, breakdown, release=False):
+        """Add a build; returns its BuildRecord"""
+        built_at = time.time()
+        with self.db:
+            cursor = self.db.execute(
+                "INSERT INTO builds (series, package, sha256, archive_size, raw_size, files, release, built_at)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (series_name(breakdown.package), breakdown.package, breakdown.sha256,
+                 breakdown.archive_size, breakdown.size, breakdown.files, int(release), built_at),
+            )
+            build_id = cursor.lastrowid
+            self.db.executemany(
+                "INSERT INTO sizes (build_id, kind, name, files, size, compressed_size) VALUES (?, ?, ?, ?, ?, ?)",
+                [(build_id, kind, name, totals.files, totals.size, totals.compressed_size)
+                 for kind, group in (("directory", breakdown.directories), ("type", breakdown.types))
+                 for name, totals in group.items()],
+            )
+        return BuildRecord(build_id, breakdown.package, breakdown.sha256, breakdown.archive_size,
+                           breakdown.size, breakdown.files, release, built_at)
+
+    def _records(self, where, params, limit):
+        rows = self.db.execute(
+            "SELECT id, package, sha256, archive_size, raw_size, files, release, built_at FROM builds"
+            f" WHERE {where} ORDER BY id DESC LIMIT ?", (*params, limit),
+        )
+        return [BuildRecord(*row[:6], bool(row[6]), row[7]) for row in rows]
+
+    def last_release(self, package_name):
+        """Newest release build of the package's series, or None"""
+        records = self._records("series = ? AND release = 1", (series_name(package_name),), 1)
+        return records[0] if records else None
+
+    def builds(self, package_name, limit=10):
+        """Newest builds of the package's series first"""
+        return self._records("series = ?", (series_name(package_name),), limit)
+
+    def sizes(self, build_id, kind):
+        """{name: SizeTotals} for a recorded build"""
+        rows = self.db.execute(
+            "SELECT name, files, size, compressed_size FROM sizes WHERE build_id = ? AND kind = ?",
+            (build_id, kind),
+        )
+        return {name: SizeTotals(files, size, compressed_size) for name, files, size, compressed_size in rows}
+
+
+@dataclass
+class BudgetReport:
+    """Outcome of check_budget(); the build passes when `violations` is empty"""
+
+    breakdown: SizeBreakdown
+    baseline: BuildRecord = None
+    # {"directory" or "type": {name: SizeTotals}} of the baseline release
+    baseline_sizes: dict = field(default_factory=dict)
+    growth: float = None
+    violations: list = field(default_factory=list)
+
+    @property
+    def ok(self):
+        return not self.violations
+
+
+def check_budget(breakdown, budget, baseline=None):
+    """Check a build against a SizeBudget and, for growth, a previous release"""
+    report = BudgetReport(breakdown, baseline)
+    if budget.max_bytes is not None and breakdown.archive_size > budget.max_bytes:
+        report.violations.append(
+            f"archive is {breakdown.archive_size:,} bytes, over the {budget.max_bytes:,} byte budget")
+    for kind, limits, group in (("directory", budget.directories, breakdown.directories),
+                                ("file type", budget.types, breakdown.types)):
+        for name, limit in limits.items():
+            used = group.get(name, SizeTotals()).compressed_size
+            if used > limit:
+                report.violations.append(f"{kind} {name} is {used:,} bytes, over its {limit:,} byte budget")
+    if baseline is not None and baseline.archive_size:
+        report.growth = breakdown.archive_size / baseline.archive_size - 1
+        if budget.max_growth is not None and report.growth > budget.max_growth:
+            report.violations.append(
+                f"archive grew {report.growth:+.1%} since release {baseline.package} "
+                f"({baseline.archive_size:,} → {breakdown.archive_size:,} bytes), "
+                f"over the {budget.max_growth:.0%} limit")
+    return report
+
+
+def check_package_size(package_path, budget=None, history_path=None, release=False):
+    """Break down a package, check it against its budget and record it
+
+    The previous release of the same series is the growth baseline. A
+    release that fails its budget is recorded as an ordinary build, so it
+    never becomes the next baseline.
+    """
+    breakdown = package_breakdown(package_path)
+    with SizeHistory(history_path) as history:
+        baseline = history.last_release(breakdown.package)
+        report = check_budget(breakdown, budget or SizeBudget(), baseline)
+        if baseline is not None:
+            report.baseline_sizes = {kind: history.sizes(baseline.id, kind)
+                                     for kind in ("directory", "type")}
+        history.record(breakdown, release=release and report.ok)
+    return report
+
+
+def _kb(n):
+    return f"{n / 1024:,.1f} KB"
+
+
+def print_breakdown(breakdown, baseline_sizes=None, limit=10):
+    """Print the largest directories and file types, with changes when known"""
+    baseline_sizes = baseline_sizes or {}
+    raw = breakdown.size or 1
+    print(f"\n📊 {breakdown.package}: {_kb(breakdown.archive_size)} "
+          f"({breakdown.files} files, {_kb(breakdown.size)} raw, "
+          f"{breakdown.archive_size / raw:.0%} of raw)")
+    for title, kind, group in (("Directory", "directory", breakdown.directories),
+                               ("Type", "type", breakdown.types)):
+        before = baseline_sizes.get(kind, {})
+        print(f"  {title:<14} {'files':>6} {'raw':>12} {'compressed':>12}")
+        ordered = sorted(group.items(), key=lambda item: -item[1].compressed_size)
+        for name, totals in ordered[:limit]:
+            line = (f"  {name:<14} {totals.files:>6} {_kb(totals.size):>12} "
+                    f"{_kb(totals.compressed_size):>12}")
+            if name in before:
+                line += f"  {totals.compressed_size - before[name].compressed_size:+,} B"
+            elif before:
+                line += "  new"
+            print(line)
+        if len(ordered) > limit:
+            print(f"  ... and {len(ordered) - limit} more")
+
+
+def print_budget_report(report):
+    """Print whether a build is within its budget"""
+    if report.baseline is not None and report.growth is not None:
+        print(f"📈 {report.growth:+.1%} since release {report.baseline.package} "
+              f"({_kb(report.baseline.archive_size)})")
+    for violation in report.violations:
+        print(f"❌ Size budget: {violation}")
+    if report.ok:
+        print("✅ Within size budget")
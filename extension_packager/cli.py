@@ -0,0 +1,463 @@
+"""
+Command line for the packaging engine: python -m extension_packager
+
+One interpreter runs the prebuild, build, verify, diff, release, size and
+store subcommands in place of scripts that exec or spawn other packaging
+scripts. Only argparse is loaded up front; each subcommand imports what it
+needs when it runs, so `verify` and `diff` never load the engine and
+`--help` loads nothing at all. benchmark_packaging.py measures the cold
+start as the cli-startup scenario.
+"""
+
+import argparse
+from pathlib import Path
+
+# compression.POLICIES and variants.BROWSERS, spelled out so --help does
+# not import the engine
+COMPRESSION_CHOICES = ["fast", "balanced", "max"]
+BROWSER_CHOICES = ["chrome", "edge", "firefox"]
+
+
+def _traced(args, default_trace, command):
+    """Run command() under a Tracer when --trace or --profile was given"""
+    if not (args.trace or args.profile):
+        return command()
+    from .trace import Tracer, save_trace, tracing
+
+    tracer = Tracer(profile=args.profile)
+    with tracing(tracer):
+        status = command()
+    save_trace(tracer, args.trace or default_trace)
+    return status
+
+
+def _print_result(result):
+    print(f"\n✅ {result.package_path.name}")
+    print(f"   📏 Size: {result.size:,} bytes ({len(result.members)} files)")
+    print(f"   ♻️  Reused {result.reused} unchanged files, {result.cached} from cache, "
+          f"compressed {result.compressed}, stored {result.stored}")
+    print(f"   🔐 SHA-256: {result.sha256}")
+
+
+def _check_sizes(args, package_paths, release=False):
+    """Check packages against --budget and record them in the size history"""
+    from .budget import check_package_size, load_budget, print_breakdown, print_budget_report
+
+    budget = load_budget(args.budget)
+    ok = True
+    for package_path in package_paths:
+        report = check_package_size(package_path, budget, args.size_history, release=release)
+        print_breakdown(report.breakdown, report.baseline_sizes)
+        print_budget_report(report)
+        ok = ok and report.ok
+    return ok
+
+
+def _optimize(source_dir, files):
+    """Run the asset optimization stage over a member list"""
+    from .optimize import optimize_files, print_optimize_report
+
+    files, report = optimize_files(source_dir, files)
+    print_optimize_report(report)
+    return files, report
+
+
+def _write_debug_symbols(source_dir, report, package_path, **build_args):
+    from .optimize import debug_symbols_path, write_debug_symbols
+
+    result = write_debug_symbols(source_dir, report, debug_symbols_path(package_path), **build_args)
+    if result is not None:
+        print(f"🗺️  Debug symbols: {result.package_path} ({len(result.members)} source maps, "
+              f"{result.size:,} bytes)")
+
+
+def _prebuild(project_dir, mode, command=None, clean=None, tsconfig=None, outputs=None, inputs=()):
+    """Check dist/ against src/ and compile it when `mode` is "compile"; returns ok"""
+    from .prebuild import CLEAN_COMMAND, TSC_COMMAND, TSCONFIG, load_project, prebuild, print_prebuild_report
+
+    project = load_project(project_dir, tsconfig or TSCONFIG, outputs, inputs)
+    report = prebuild(project_dir, compile=mode == "compile",
+                      command=command.split() if command else TSC_COMMAND,
+                      clean=clean.split() if clean is not None else CLEAN_COMMAND,
+                      project=project)
+    print_prebuild_report(report)
+    return report.ok
+
+
+def prebuild(args):
+    """Compile the TypeScript sources only when dist/ is stale"""
+    ok = _prebuild(args.project, "check" if args.check else "compile", args.command, args.clean,
+                   args.tsconfig, args.outputs, args.inputs)
+    return 0 if ok else 1
+
+
+def build(args):
+    """Package one directory, or one archive per browser with --browser"""
+    from .engine import PackageTarget, build_packages
+    from .inventory import print_summary, write_sha256sums
+    from .matcher import STORE_EXCLUDES, PathMatcher
+    from .walker import scan_tree
+
+    source_dir = Path(args.source)
+    package_path = Path(args.output or f"{source_dir.resolve().name}.zip")
+    exclude = (STORE_EXCLUDES if args.store_excludes else []) + args.exclude
+    select = PathMatcher(exclude, include=args.include or None, ignore_case=args.ignore_case)
+
+    def command():
+        if not source_dir.is_dir():
+            raise FileNotFoundError(f"Source directory not found: {source_dir}")
+        files = scan_tree(source_dir, select=select)
+        if args.reachable_only:
+            from .reachability import print_prune_report, prune_unreachable
+
+            files, report = prune_unreachable(source_dir, files)
+            print_prune_report(report)
+        if args.optimize:
+            files, optimized = _optimize(source_dir, files)
+        if args.browser:
+            from .variants import variant_targets
+
+            targets = variant_targets(package_path, list(dict.fromkeys(args.browser)), files=files,
+                                      deterministic=args.deterministic, gecko_id=args.gecko_id)
+        else:
+            targets = [PackageTarget(package_path, files, deterministic=args.deterministic)]
+        results = build_packages(
+            source_dir, targets, jobs=args.jobs, incremental=not args.no_incremental,
+            cache=not args.no_cache, compression=args.compression,
+        )
+        for result in results:
+            _print_result(result)
+            if args.summary:
+                print_summary(result.inventory)
+        # Every variant has the same source maps
+        if args.optimize and args.debug_symbols:
+            _write_debug_symbols(source_dir, optimized, package_path,
+                                 deterministic=args.deterministic, compression=args.compression)
+        package_paths = [result.package_path for result in results]
+        if args.checksums:
+            print(f"🔐 Checksums: {write_sha256sums(package_paths)}")
+        if args.budget and not _check_sizes(args, package_paths, release=args.release):
+            return 1
+        return 0
+
+    return _traced(args, f"{package_path}.trace.json", command)
+
+
+def verify(args):
+    """Check packages from their central directory"""
+    from .verify import print_verify_report, verify_package
+
+    ok = True
+    for package in args.packages:
+        report = verify_package(package, check_crc=args.crc, jobs=args.jobs,
+                                references=not args.no_references)
+        print_verify_report(report)
+        ok = ok and report.ok
+    return 0 if ok else 1
+
+
+def diff(args):
+    """Members added, removed and changed between two packages"""
+    from .verify import diff_packages, print_diff
+
+    print(f"🔍 Comparing {args.old} → {args.new}")
+    print_diff(diff_packages(args.old, args.new), limit=args.limit)
+    return 0
+
+
+def release(args):
+    """Build the release packages, write SHA256SUMS and verify them"""
+    from .inventory import write_sha256sums
+    from .targets import SOURCE_PACKAGE, STABLE_PACKAGE, release_targets, stable_matcher
+    from .verify import print_verify_report, verify_package
+
+    source_dir = Path(args.source)
+    output_dir = Path(args.output or source_dir)
+
+    def command():
+        if args.prebuild and not args.from_ref and not _prebuild(source_dir, args.prebuild):
+            return 1
+        output_dir.mkdir(parents=True, exist_ok=True)
+        optimized = {}
+        if args.from_ref:
+            if args.optimize or args.prebuild:
+                raise ValueError("--optimize and --prebuild work on a checkout, not with --from-ref")
+            # Only the stable package has member rules that work without a checkout
+            from .gitsource import GitTarget, build_from_git
+
+            target = GitTarget(args.from_ref, output_dir / STABLE_PACKAGE,
+                               select=stable_matcher(), deterministic=True)
+            results = build_from_git(source_dir, [target], compression=args.compression)
+        else:
+            from .engine import build_packages
+
+            targets = release_targets(source_dir, output_dir)
+            if args.reachable_only:
+                from .reachability import print_prune_report, prune_unreachable
+
+                for target in targets:
+                    if target.package_path.name != SOURCE_PACKAGE:
+                        target.files, report = prune_unreachable(source_dir, target.files)
+                        print(f"\n📦 {target.package_path.name}")
+                        print_prune_report(report)
+            if args.optimize:
+                for target in targets:
+                    if target.package_path.name != SOURCE_PACKAGE:
+                        print(f"\n📦 {target.package_path.name}")
+                        target.files, optimized[target.package_path] = _optimize(source_dir, target.files)
+            results = build_packages(source_dir, targets, jobs=args.jobs,
+                                     compression=args.compression)
+        for result in results:
+            _print_result(result)
+        if args.debug_symbols:
+            for package_path, report in optimized.items():
+                _write_debug_symbols(source_dir, report, package_path,
+                                     deterministic=True, compression=args.compression)
+
+        package_paths = [result.package_path for result in results]
+        print(f"\n🔐 Checksums: {write_sha256sums(package_paths)}")
+        ok = True
+        for package_path in package_paths:
+            report = verify_package(package_path, references=package_path.name != SOURCE_PACKAGE)
+            print_verify_report(report)
+            ok = ok and report.ok
+        if ok and args.budget:
+            ok = _check_sizes(args, package_paths, release=True)
+        if ok and args.store:
+            _store_packages(args.store_dir, package_paths)
+        return 0 if ok else 1
+
+    return _traced(args, str(output_dir / "release.trace.json"), command)
+
+
+def size(args):
+    """Size breakdown of packages and their recent builds"""
+    import time
+
+    from .budget import SizeHistory, package_breakdown, print_breakdown
+
+    with SizeHistory(args.size_history) as history:
+        for package in args.packages:
+            breakdown = package_breakdown(package)
+            baseline = history.last_release(breakdown.package)
+            baseline_sizes = baseline and {kind: history.sizes(baseline.id, kind)
+                                           for kind in ("directory", "type")}
+            print_breakdown(breakdown, baseline_sizes, limit=args.limit)
+            builds = history.builds(breakdown.package, args.history) if args.history else []
+            if builds:
+                print("  Recent builds:")
+            for record in builds:
+                built = time.strftime("%Y-%m-%d %H:%M", time.localtime(record.built_at))
+                marker = " (release)" if record.release else ""
+                print(f"  • {built}  {record.package}  {record.archive_size:>12,} bytes{marker}")
+    return 0
+
+
+def _store_packages(store_dir, package_paths, name=None):
+    from .artifacts import ArtifactStore
+
+    store = ArtifactStore(store_dir)
+    for package_path in package_paths:
+        added = store.add(package_path, name)
+        artifact = added.artifact
+        print(f"🗄️  Stored {artifact.name} ({artifact.sha256[:12]}): {added.new_chunks} of "
+              f"{artifact.chunks} chunks new, {added.new_bytes:,} of {artifact.size:,} bytes")
+    return store
+
+
+def store(args):
+    """Add, list, restore and prune artifacts in the content-addressed store"""
+    from .artifacts import ArtifactStore, print_store
+
+    if args.action == "add":
+        _store_packages(args.store_dir, args.packages, args.name)
+    elif args.action == "list":
+        print_store(ArtifactStore(args.store_dir))
+    elif args.action == "restore":
+        path = ArtifactStore(args.store_dir).restore(args.ref, args.output)
+        print(f"✅ Restored {path} (sha256 verified)")
+    elif args.action == "remove":
+        artifact = ArtifactStore(args.store_dir).remove(args.ref)
+        print(f"➖ Removed {artifact.name} ({artifact.sha256[:12]}); run gc to free its chunks")
+    elif args.action == "gc":
+        print(f"🧹 Freed {ArtifactStore(args.store_dir).gc():,} bytes")
+    return 0
+
+
+def _add_store_argument(parser):
+    parser.add_argument("--store-dir", metavar="DIR",
+                        help="artifact store (default: $EXTENSION_PACKAGER_ARTIFACTS or "
+                             "~/.cache/extension-packager/artifacts)")
+
+
+def _add_budget_arguments(parser):
+    parser.add_argument("--budget", metavar="FILE",
+                        help="fail when the package is over the size budget in FILE (size_budget.json)")
+    _add_history_argument(parser)
+
+
+def _add_history_argument(parser):
+    parser.add_argument("--size-history", metavar="FILE",
+                        help="size history database (default: $EXTENSION_PACKAGER_SIZE_HISTORY or "
+                             "~/.cache/extension-packager/size-history.sqlite)")
+
+
+def _add_optimize_arguments(parser):
+    parser.add_argument("--optimize", action="store_true",
+                        help="minify JSON, strip source-map comments and maps, recompress PNGs")
+    parser.add_argument("--debug-symbols", action="store_true",
+                        help="with --optimize, keep the source maps in <package>.debug-symbols.zip")
+
+
+def _add_trace_arguments(parser):
+    parser.add_argument("--trace", metavar="FILE",
+                        help="write a Chrome trace of the packaging stages to FILE")
+    parser.add_argument("--profile", action="store_true",
+                        help="also run the build loop under cProfile and tracemalloc (implies --trace)")
+
+
+def make_parser():
+    parser = argparse.ArgumentParser(
+        prog="python -m extension_packager",
+        description="Build, verify and compare Chrome extension packages",
+    )
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    prebuild_parser = subparsers.add_parser(
+        "prebuild", help="clean and compile only when the sources or configs changed since dist/ was built",
+    )
+    prebuild_parser.add_argument("project", nargs="?", default=".",
+                                 help="TypeScript project directory (default: .)")
+    prebuild_parser.add_argument("--check", action="store_true",
+                                 help="fail when dist/ is stale instead of compiling")
+    prebuild_parser.add_argument("--command", metavar="CMD",
+                                 help="compiler command (default: npm run build)")
+    prebuild_parser.add_argument("--clean", metavar="CMD",
+                                 help="run before compiling to empty dist/ (default: npm run clean; "
+                                      "'' to compile over dist/)")
+    prebuild_parser.add_argument("--tsconfig", metavar="FILE",
+                                 help="config giving rootDir, outDir and whether tsc is incremental "
+                                      "(default: tsconfig.json)")
+    prebuild_parser.add_argument("--output", dest="outputs", action="append", metavar="FILE",
+                                 help="expect this output instead of one per source, "
+                                      "e.g. a bundler entry point (repeatable)")
+    prebuild_parser.add_argument("--input", dest="inputs", action="append", default=[], metavar="PATH",
+                                 help="also recompile when this file or directory changes (repeatable)")
+    prebuild_parser.set_defaults(func=prebuild)
+
+    build_parser = subparsers.add_parser("build", help="package a directory")
+    build_parser.add_argument("source", help="directory to package")
+    build_parser.add_argument("--output", "-o", help="package to write (default: <source>.zip)")
+    build_parser.add_argument("--browser", action="append", choices=BROWSER_CHOICES,
+                              help="write <package>-<browser>.zip with that browser's manifest.json "
+                                   "(repeatable; other files are compressed once for all)")
+    build_parser.add_argument("--gecko-id", metavar="ID",
+                              help="Firefox add-on id for the firefox variant's manifest")
+    build_parser.add_argument("--exclude", "-x", action="append", default=[], metavar="PATTERN",
+                              help="gitignore-style rule for files to leave out (repeatable)")
+    build_parser.add_argument("--include", action="append", metavar="PATTERN",
+                              help="package only files matching these rules (repeatable)")
+    build_parser.add_argument("--store-excludes", action="store_true",
+                              help="also leave out tests, sources, docs and configs, as store builds do")
+    build_parser.add_argument("--ignore-case", action="store_true",
+                              help="match rules case-insensitively")
+    build_parser.add_argument("--reachable-only", action="store_true",
+                              help="package only files reachable from manifest.json")
+    _add_optimize_arguments(build_parser)
+    build_parser.add_argument("--deterministic", action="store_true",
+                              help="fixed timestamps and permissions for reproducible packages")
+    build_parser.add_argument("--compression", choices=COMPRESSION_CHOICES,
+                              help="per-file compression policy (default: deflate everything)")
+    build_parser.add_argument("--jobs", "-j", type=int, default=None,
+                              help="deflate members in N worker processes (0 = all cores)")
+    build_parser.add_argument("--no-incremental", action="store_true",
+                              help="do not reuse members of the previous package")
+    build_parser.add_argument("--no-cache", action="store_true",
+                              help="do not use the shared blob cache")
+    build_parser.add_argument("--summary", action="store_true",
+                              help="print the package contents")
+    build_parser.add_argument("--checksums", action="store_true",
+                              help="record the package in SHA256SUMS next to it")
+    _add_budget_arguments(build_parser)
+    build_parser.add_argument("--release", action="store_true",
+                              help="with --budget, record the build as the release later growth is measured from")
+    _add_trace_arguments(build_parser)
+    build_parser.set_defaults(func=build)
+
+    verify_parser = subparsers.add_parser("verify", help="check that packages are complete and intact")
+    verify_parser.add_argument("packages", nargs="+", help="packages to check")
+    verify_parser.add_argument("--crc", action="store_true",
+                               help="also inflate every member and check its CRC")
+    verify_parser.add_argument("--jobs", "-j", type=int, default=None,
+                               help="threads for --crc (default: one per core)")
+    verify_parser.add_argument("--no-references", action="store_true",
+                               help="skip checking the files manifest.json references")
+    verify_parser.set_defaults(func=verify)
+
+    diff_parser = subparsers.add_parser("diff", help="members added, removed and changed from OLD to NEW")
+    diff_parser.add_argument("old", help="previous package")
+    diff_parser.add_argument("new", help="new package")
+    diff_parser.add_argument("--limit", type=int, default=20,
+                             help="members listed per section (default: 20)")
+    diff_parser.set_defaults(func=diff)
+
+    release_parser = subparsers.add_parser(
+        "release", help="build the beta, stable and source packages, then checksum and verify them",
+    )
+    release_parser.add_argument("source", nargs="?", default=".",
+                                help="extension checkout, or git repository with --from-ref (default: .)")
+    release_parser.add_argument("--output", "-o", help="directory for the packages (default: SOURCE)")
+    release_parser.add_argument("--prebuild", choices=["check", "compile"],
+                                help="first make sure dist/ was compiled from the current src/: "
+                                     "fail when it is stale, or run tsc")
+    release_parser.add_argument("--from-ref", metavar="REF",
+                                help="build the stable package from a tag or commit instead of the checkout")
+    release_parser.add_argument("--reachable-only", action="store_true",
+                                help="package only files reachable from manifest.json (not the source bundle)")
+    _add_optimize_arguments(release_parser)
+    release_parser.add_argument("--compression", choices=COMPRESSION_CHOICES,
+                                help="per-file compression policy (default: deflate everything)")
+    release_parser.add_argument("--jobs", "-j", type=int, default=None,
+                                help="deflate members in N worker processes (0 = all cores)")
+    release_parser.add_argument("--store", action="store_true",
+                                help="add the verified packages to the artifact store")
+    _add_budget_arguments(release_parser)
+    _add_store_argument(release_parser)
+    _add_trace_arguments(release_parser)
+    release_parser.set_defaults(func=release)
+
+    size_parser = subparsers.add_parser("size", help="package size by directory and file type")
+    size_parser.add_argument("packages", nargs="+", help="packages to break down")
+    size_parser.add_argument("--limit", type=int, default=10,
+                             help="directories and file types listed (default: 10)")
+    size_parser.add_argument("--history", type=int, default=5, metavar="N",
+                             help="recent builds of the same package to list (default: 5)")
+    _add_history_argument(size_parser)
+    size_parser.set_defaults(func=size)
+
+    store_parser = subparsers.add_parser("store", help="keep every built package, deduplicated by chunk")
+    actions = store_parser.add_subparsers(dest="action", required=True)
+    add_parser = actions.add_parser("add", help="add packages to the store")
+    add_parser.add_argument("packages", nargs="+", help="packages to add")
+    add_parser.add_argument("--name", help="name to store them under (default: file name)")
+    actions.add_parser("list", help="list stored artifacts and the space saved")
+    restore_parser = actions.add_parser("restore", help="rebuild a stored artifact")
+    restore_parser.add_argument("ref", help="artifact name (newest wins) or sha256 prefix")
+    restore_parser.add_argument("--output", "-o", help="file to write (default: the artifact's name)")
+    remove_parser = actions.add_parser("remove", help="drop an artifact from the index")
+    remove_parser.add_argument("ref", help="artifact name (newest wins) or sha256 prefix")
+    actions.add_parser("gc", help="delete chunks no stored artifact uses")
+    for action_parser in actions.choices.values():
+        _add_store_argument(action_parser)
+    store_parser.set_defaults(func=store)
+    return parser
+
+
+def main(argv=None):
+    """Run one subcommand; returns the exit status"""
+    args = make_parser().parse_args(argv)
+    try:
+        return args.func(args)
+    except (OSError, ValueError) as e:
+        print(f"❌ {e}")
+        return 1
@@ -0,0 +1,191 @@
+"""
+Per-file compression policies
+
+A policy picks each member's compression from its file type, its size and,
+for types it does not know, a trial deflate of the first 64 KiB. Formats
+that are already compressed (PNG, WOFF2, ...) are stored as-is, text is
+deflated at the policy's level, and anything deflate would make larger is
+stored as well. Levels are plain zlib levels, with STORE (0) meaning the
+member is stored, so they key the blob cache like any other level.
+"""
+
+import time
+from dataclasses import dataclass, field
+from pathlib import PurePosixPath
+
+from .zipformat import compress_bytes
+
+STORE = 0
+
+TEXT = "text"
+COMPRESSED = "compressed"
+OTHER = "other"
+
+TEXT_SUFFIXES = frozenset({
+    ".js", ".mjs", ".cjs", ".ts", ".tsx", ".jsx", ".css", ".html", ".htm",
+    ".json", ".map", ".svg", ".txt", ".md", ".org", ".xml", ".csv", ".yml",
+    ".yaml", ".wasm",
+})
+COMPRESSED_SUFFIXES = frozenset({
+    ".png", ".jpg", ".jpeg", ".gif", ".webp", ".avif", ".woff", ".woff2",
+    ".zip", ".crx", ".gz", ".br", ".xz", ".bz2", ".zst", ".mp3", ".mp4",
+    ".webm", ".ogg", ".m4a",
+})
+
+SAMPLE_SIZE = 64 * 1024
+SMALL_FILE = 16 * 1024
+# Files this large are deflated as a stream, too late to fall back to storing
+LARGE_FILE = 4 * 1024 * 1024
+# A trial deflate that keeps more than this share of the sample means store
+INCOMPRESSIBLE_RATIO = 0.95
+
+
+def file_class(path):
+    """TEXT, COMPRESSED or OTHER, from the file's suffix"""
+    suffix = PurePosixPath(path).suffix.lower()
+    if suffix in TEXT_SUFFIXES:
+        return TEXT
+    if suffix in COMPRESSED_SUFFIXES:
+        return COMPRESSED
+    return OTHER
+
+
+def looks_incompressible(sample):
+    """Whether a quick level-1 deflate of the sample barely shrinks it"""
+    sample = sample[:SAMPLE_SIZE]
+    return bool(sample) and len(compress_bytes(sample, 1)) > len(sample) * INCOMPRESSIBLE_RATIO
+
+
+@dataclass(frozen=True)
+class CompressionPolicy:
+    """How members are compressed
+
+    `level` applies to every compressible file, `small_level` (when set)
+    to files under SMALL_FILE bytes. Files of unknown type and at least
+    `sample_from` bytes are stored when a trial deflate of their start
+    barely shrinks it. A policy that is not `adaptive` deflates everything
+    at `level`, exactly as builds always have.
+    """
+
+    name: str
+    level: int = None
+    small_level: int = None
+    adaptive: bool = True
+    sample_from: int = 0
+
+    @property
+    def manifest_key(self):
+        """Stored in hash manifests; members are only reused under the same key"""
+        return f"{self.name}/1" if self.adaptive else self.level
+
+    def level_for(self, path, size, head=None):
+        """zlib level for one file, or STORE
+
+        `head` is the start of the file, or a callable returning it; it
+        is only read for files of unknown type.
+        """
+        if not self.adaptive:
+            return self.level
+        kind = file_class(path)
+        if kind == COMPRESSED:
+            return STORE
+        if kind == OTHER and size >= self.sample_from and head is not None:
+            if looks_incompressible(head() if callable(head) else head):
+                return STORE
+        if self.small_level is not None and size < SMALL_FILE:
+            return self.small_level
+        return self.level
+
+    def keep(self, size, compressed_size):
+        """Whether a deflated payload is worth keeping over storing the file"""
+        return not self.adaptive or compressed_size < size
+
+
+POLICIES = {
+    # Dev builds: cheapest deflate, nothing wasted on media
+    "fast": CompressionPolicy("fast", level=1),
+    # Small files cost little to squeeze harder
+    "balanced": CompressionPolicy("balanced", level=6, small_level=9),
+    # Store submissions: best zlib ratio, every small file of unknown type tried
+    "max": CompressionPolicy("max", level=9, sample_from=LARGE_FILE),
+}
+
+
+def uniform_policy(compresslevel=None):
+    """The pre-policy behaviour: deflate everything at one level"""
+    name = "default" if compresslevel is None else f"level-{compresslevel}"
+    return CompressionPolicy(name, level=compresslevel, adaptive=False)
+
+
+def resolve_policy(compression=None, compresslevel=None):
+    """A CompressionPolicy from a policy, a policy name or a uniform level"""
+    if compression is None:
+        return uniform_policy(compresslevel)
+    if isinstance(compression, CompressionPolicy):
+        return compression
+    try:
+        return POLICIES[compression]
+    except KeyError:
+        raise ValueError(f"unknown compression policy: {compression}") from None
+
+
+@dataclass
+class ClassTradeoff:
+    """Size and time of one file class under one policy"""
+
+    files: int = 0
+    size: int = 0
+    compressed_size: int = 0
+    seconds: float = 0.0
+    stored: int = 0
+
+
+@dataclass
+class CompressionReport:
+    """ClassTradeoff per file class and policy name"""
+
+    classes: dict = field(default_factory=dict)
+
+
+def compression_report(files, policies=("fast", "balanced", "max")):
+    """Compress every file under each policy and total the results by class
+
+    `files` holds FileEntry objects or filesystem paths. Nothing is
+    written; this only measures what each policy would cost and save.
+    """
+    report = CompressionReport()
+    policies = [resolve_policy(name) for name in policies]
+    for item in files:
+        fs_path = str(getattr(item, "fs_path", item))
+        with open(fs_path, "rb") as f:
+            data = f.read()
+        by_policy = report.classes.setdefault(file_class(fs_path), {})
+        for policy in policies:
+            stats = by_policy.setdefault(policy.name, ClassTradeoff())
+            start = time.perf_counter()
+            level = policy.level_for(fs_path, len(data), data)
+            compressed_size = len(data)
+            if level != STORE:
+                compressed_size = len(compress_bytes(data, level))
+                # Streamed members are kept deflated, like the engine does
+                if len(data) < LARGE_FILE and not policy.keep(len(data), compressed_size):
+                    level, compressed_size = STORE, len(data)
+            stats.seconds += time.perf_counter() - start
+            stats.files += 1
+            stats.size += len(data)
+            stats.compressed_size += compressed_size
+            stats.stored += level == STORE
+    return report
+
+
+def print_compression_report(report):
+    """Print the size and time of every file class under each policy"""
+    print("\n🗜️  Compression by file class")
+    for kind, by_policy in report.classes.items():
+        first = next(iter(by_policy.values()))
+        print(f"  {kind}: {first.files} files, {first.size:,} bytes")
+        for name, stats in by_policy.items():
+            ratio = stats.compressed_size / stats.size * 100 if stats.size else 100
+            stored = f", {stats.stored} stored" if stats.stored else ""
+            print(f"    {name:<9} {stats.compressed_size:>12,} bytes ({ratio:5.1f}%)  "
+                  f"{stats.seconds * 1000:8.1f}ms{stored}")
@@ -0,0 +1,391 @@
+"""
+Binary delta packages between two released archives
+
+A delta rebuilds the new archive byte-for-byte from the old one. Headers
+and the central directory are stored literally; each member payload is
+copied from the old archive when unchanged, patched from the old member's
+content when it changed, or stored in full when it is new. Patched and new
+contents are deflated again on apply, so they are only used when the
+creator has checked that recompressing reproduces the original payload.
+The whole delta is LZMA-compressed. Creating and applying a delta holds
+one member in memory at a time, never a whole archive.
+"""
+
+import hashlib
+import json
+import lzma
+import os
+import re
+import struct
+import tempfile
+import zlib
+from dataclasses import dataclass
+from pathlib import Path
+
+from .zipformat import (
+    CHUNK_SIZE,
+    DEFLATED,
+    STORED,
+    compress_bytes,
+    raw_member_region,
+    read_central_directory,
+)
+
+DELTA_MAGIC = b"EXTDELTA"
+DELTA_VERSION = 1
+DELTA_SUFFIX = ".delta"
+
+# Levels tried when working out how a payload was deflated, most likely first
+_LEVELS = [6, 9, 1, 2, 3, 4, 5, 7, 8, 0]
+# Contents larger than this only try the first two levels; a payload from
+# another deflater matches none and would cost ten full deflates
+MAX_LEVEL_SEARCH_SIZE = 4 * 1024 * 1024
+
+# Diff tokens end at newlines and at the statement and block boundaries of
+# minified scripts and stylesheets
+_TOKEN = re.compile(rb"[^\n;{}]*[\n;{}]|[^\n;{}]+$")
+# Runs of this many tokens anchor a copy from the old content
+ANCHOR_TOKENS = 8
+# Members larger than this are added whole instead of diffed
+MAX_DIFF_SIZE = 32 * 1024 * 1024
+
+
+@dataclass
+class DeltaResult:
+    """Outcome of create_delta()"""
+
+    delta_path: Path
+    delta_size: int = 0
+    new_size: int = 0
+    unchanged: int = 0
+    changed: int = 0
+    added: int = 0
+    removed: int = 0
+
+
+def delta_path(old_path, new_path):
+    """Default location of the delta between two packages"""
+    old_path, new_path = Path(old_path), Path(new_path)
+    return new_path.with_name(f"{old_path.stem}--{new_path.stem}{DELTA_SUFFIX}")
+
+
+def _members(fp):
+    """(member, payload region) for every member of an open archive, in archive order"""
+    members = sorted(read_central_directory(fp), key=lambda m: m.header_offset)
+    return [(member, raw_member_region(fp, member)) for member in members]
+
+
+def _read(fp, region):
+    fp.seek(region.offset)
+    data = fp.read(region.length)
+    if len(data) != region.length:
+        raise ValueError(f"Truncated data in {fp.name}")
+    return data
+
+
+def _chunks(fp, offset, length):
+    """Yield fp[offset:offset + length] in chunks"""
+    fp.seek(offset)
+    while length:
+        chunk = fp.read(min(CHUNK_SIZE, length))
+        if not chunk:
+            raise ValueError(f"Truncated data in {fp.name}")
+        length -= len(chunk)
+        yield chunk
+
+
+def _file_sha256(fp):
+    fp.seek(0)
+    sha256 = hashlib.sha256()
+    for chunk in iter(lambda: fp.read(CHUNK_SIZE), b""):
+        sha256.update(chunk)
+    return sha256.hexdigest()
+
+
+def _content(member, payload):
+    """Uncompressed content of a payload, or None for unsupported methods"""
+    if member.method == STORED:
+        return payload
+    if member.method == DEFLATED:
+        return zlib.decompressobj(-15).decompress(payload)
+    return None
+
+
+def _compress(content, method, level):
+    return content if method == STORED else compress_bytes(content, level)
+
+
+def _find_level(content, payload):
+    """The zlib level that deflates content into payload, or None"""
+    levels = _LEVELS if len(content) <= MAX_LEVEL_SEARCH_SIZE else _LEVELS[:2]
+    for level in levels:
+        if compress_bytes(content, level) == payload:
+            return level
+    return None
+
+
+def _diff(old, new):
+    """Copy/insert instructions turning old into new
+
+    Returns (ops, literal) where ops holds [offset, length] copies from old
+    and [length] inserts taken in turn from `literal`.
+
+    Every run of ANCHOR_TOKENS tokens in old is indexed by its bytes. new is
+    walked once: a copy carries on while new keeps matching old where the
+    last copy ended, and otherwise restarts wherever the next ANCHOR_TOKENS
+    tokens of new were indexed, reaching back over tokens just inserted.
+    Each token of new is looked at a bounded number of times, so the diff
+    is linear however repetitive the tokens of a minified bundle are.
+    """
+    old_tokens = _TOKEN.findall(old)
+    new_tokens = _TOKEN.findall(new)
+    old_starts = [0]
+    for token in old_tokens:
+        old_starts.append(old_starts[-1] + len(token))
+    new_starts = [0]
+    for token in new_tokens:
+        new_starts.append(new_starts[-1] + len(token))
+
+    anchors = {}
+    for i in range(len(old_tokens) - ANCHOR_TOKENS + 1):
+        anchors.setdefault(old[old_starts[i]:old_starts[i + ANCHOR_TOKENS]], i)
+
+    ops = []
+    literal = bytearray()
+
+    def copy(i, j):
+        """Copy matching tokens from old[i:] for new[j:]; returns the new j"""
+        start = j
+        while i < len(old_tokens) and j < len(new_tokens) and old_tokens[i] == new_tokens[j]:
+            i += 1
+            j += 1
+        offset, length = old_starts[i - (j - start)], new_starts[j] - new_starts[start]
+        if ops and len(ops[-1]) == 2 and ops[-1][0] + ops[-1][1] == offset:
+            ops[-1][1] += length
+        else:
+            ops.append([offset, length])
+        return j
+
+    j = 0
+    follow = None
+    while j < len(new_tokens):
+        if follow is not None and follow < len(old_tokens) and old_tokens[follow] == new_tokens[j]:
+            start = j
+            j = copy(follow, j)
+            follow += j - start
+            continue
+        i = None
+        if j + ANCHOR_TOKENS <= len(new_tokens):
+            i = anchors.get(new[new_starts[j]:new_starts[j + ANCHOR_TOKENS]])
+        if i is not None:
+            # Take back inserted tokens that the copy can cover as well
+            while (i and ops and len(ops[-1]) == 1
+                   and old_tokens[i - 1] == new_tokens[j - 1]):
+                i -= 1
+                j -= 1
+                del literal[len(literal) - len(new_tokens[j]):]
+                ops[-1][0] -= len(new_tokens[j])
+                if not ops[-1][0]:
+                    ops.pop()
+            start = j
+            j = copy(i, j)
+            follow = i + j - start
+            continue
+        token = new_tokens[j]
+        literal += token
+        if ops and len(ops[-1]) == 1:
+            ops[-1][0] += len(token)
+        else:
+            ops.append([len(token)])
+        j += 1
+    return ops, bytes(literal)
+
+
+def _patch(old, ops, literal):
+    out = bytearray()
+    position = 0
+    for op in ops:
+        if len(op) == 2:
+            out += old[op[0]:op[0] + op[1]]
+        else:
+            out += literal[position:position + op[0]]
+            position += op[0]
+    return bytes(out)
+
+
+def create_delta(old_path, new_path, output_path=None):
+    """Write the delta that turns old_path into new_path
+
+    Both archives are read a member at a time. Members of more than
+    MAX_DIFF_SIZE bytes are added whole rather than diffed.
+    """
+    old_path, new_path = Path(old_path), Path(new_path)
+    output_path = Path(output_path) if output_path else delta_path(old_path, new_path)
+    with open(old_path, "rb") as old_fp, open(new_path, "rb") as new_fp, \
+            tempfile.TemporaryFile() as blob:
+        old_size = os.fstat(old_fp.fileno()).st_size
+        new_size = os.fstat(new_fp.fileno()).st_size
+        old_by_name = {}
+        old_by_payload = {}
+        for member, region in _members(old_fp):
+            old_by_name[member.name] = (member, region)
+            sha256 = hashlib.sha256()
+            for chunk in _chunks(old_fp, region.offset, region.length):
+                sha256.update(chunk)
+            old_by_payload.setdefault(sha256.digest(), member.name)
+
+        result = DeltaResult(output_path, new_size=new_size)
+        layout = []
+
+        def literal(start, end):
+            if end > start:
+                layout.append({"op": "bytes", "length": end - start})
+                blob.writelines(_chunks(new_fp, start, end - start))
+
+        position = 0
+        new_names = set()
+        for member, region in _members(new_fp):
+            new_names.add(member.name)
+            literal(position, region.offset)
+            position = region.offset + region.length
+
+            payload = _read(new_fp, region)
+            source = old_by_payload.get(hashlib.sha256(payload).digest())
+            if source is not None:
+                layout.append({"op": "copy", "from": source})
+                result.unchanged += 1
+                continue
+
+            if member.name in old_by_name:
+                result.changed += 1
+            else:
+                result.added += 1
+            content = _content(member, payload)
+            level = None
+            if member.method == STORED:
+                level = 0
+            elif content is not None:
+                level = _find_level(content, payload)
+            if level is None:
+                # Not reproducible by recompressing; ship the payload itself
+                layout.append({"op": "raw", "length": len(payload)})
+                blob.write(payload)
+                continue
+
+            base = old_by_name.get(member.name)
+            if (base is not None and len(content) <= MAX_DIFF_SIZE
+                    and base[0].file_size <= MAX_DIFF_SIZE):
+                base_content = _content(base[0], _read(old_fp, base[1]))
+                if base_content is not None:
+                    ops, inserted = _diff(base_content, content)
+                    if len(inserted) < len(content) * 0.9:
+                        layout.append({"op": "patch", "from": member.name, "method": member.method,
+                                       "level": level, "ops": ops, "length": len(inserted)})
+                        blob.write(inserted)
+                        continue
+            layout.append({"op": "add", "method": member.method, "level": level,
+                           "length": len(content)})
+            blob.write(content)
+        literal(position, new_size)
+        result.removed = len(set(old_by_name) - new_names)
+
+        header = json.dumps({
+            "version": DELTA_VERSION,
+            "old": {"name": old_path.name, "size": old_size, "sha256": _file_sha256(old_fp)},
+            "new": {"name": new_path.name, "size": new_size, "sha256": _file_sha256(new_fp)},
+            "layout": layout,
+        }, separators=(",", ":")).encode()
+        temp_path = output_path.with_name(output_path.name + ".tmp")
+        with open(temp_path, "wb") as f:
+            f.write(DELTA_MAGIC)
+            compressor = lzma.LZMACompressor()
+            f.write(compressor.compress(struct.pack("<I", len(header)) + header))
+            blob.seek(0)
+            for chunk in iter(lambda: blob.read(CHUNK_SIZE), b""):
+                f.write(compressor.compress(chunk))
+            f.write(compressor.flush())
+            result.delta_size = f.tell()
+    os.replace(temp_path, output_path)
+    return result
+
+
+def _read_exact(stream, length):
+    data = stream.read(length)
+    if len(data) != length:
+        raise ValueError("Truncated package delta")
+    return data
+
+
+def _read_header(f, delta_file):
+    """(header, stream of the literal blob) of an open delta file"""
+    if f.read(len(DELTA_MAGIC)) != DELTA_MAGIC:
+        raise ValueError(f"{delta_file} is not a package delta")
+    stream = lzma.LZMAFile(f)
+    (header_length,) = struct.unpack("<I", _read_exact(stream, 4))
+    header = json.loads(_read_exact(stream, header_length))
+    if header.get("version") != DELTA_VERSION:
+        raise ValueError(f"Unsupported delta version {header.get('version')}")
+    return header, stream
+
+
+def read_delta(delta_file):
+    """Return (header, literal blob) of a delta file"""
+    with open(delta_file, "rb") as f:
+        header, stream = _read_header(f, delta_file)
+        return header, memoryview(stream.read())
+
+
+def apply_delta(old_path, delta_file, output_path=None):
+    """Rebuild the new archive from old_path and a delta; returns its path
+
+    The rebuilt archive is written a member at a time. Raises ValueError
+    when old_path is not the archive the delta was made from or the rebuilt
+    archive does not match the recorded sha256.
+    """
+    old_path = Path(old_path)
+    with open(delta_file, "rb") as f, open(old_path, "rb") as old_fp:
+        header, stream = _read_header(f, delta_file)
+        output_path = Path(output_path) if output_path else old_path.with_name(header["new"]["name"])
+        temp_path = output_path.with_name(output_path.name + ".tmp")
+        try:
+            with open(temp_path, "wb") as out:
+                if _file_sha256(old_fp) != header["old"]["sha256"]:
+                    raise ValueError(f"{old_path} is not {header['old']['name']} this delta was made from")
+                old_members = {member.name: (member, region) for member, region in _members(old_fp)}
+                sha256 = hashlib.sha256()
+
+                def write(data):
+                    sha256.update(data)
+                    out.write(data)
+
+                for op in header["layout"]:
+                    kind = op["op"]
+                    if kind == "copy":
+                        region = old_members[op["from"]][1]
+                        for chunk in _chunks(old_fp, region.offset, region.length):
+                            write(chunk)
+                        continue
+                    if kind in ("bytes", "raw"):
+                        remaining = op["length"]
+                        while remaining:
+                            chunk = _read_exact(stream, min(CHUNK_SIZE, remaining))
+                            write(chunk)
+                            remaining -= len(chunk)
+                        continue
+                    data = _read_exact(stream, op["length"])
+                    if kind == "add":
+                        write(_compress(data, op["method"], op["level"]))
+                    elif kind == "patch":
+                        member, region = old_members[op["from"]]
+                        content = _patch(_content(member, _read(old_fp, region)), op["ops"], data)
+                        write(_compress(content, op["method"], op["level"]))
+                    else:
+                        raise ValueError(f"Unknown delta operation {kind!r}")
+
+            if sha256.hexdigest() != header["new"]["sha256"]:
+                raise ValueError("Rebuilt archive does not match the delta's sha256")
+            os.replace(temp_path, output_path)
+        except BaseException:
+            temp_path.unlink(missing_ok=True)
+            raise
+    return output_path
@@ -0,0 +1,809 @@
+"""
+Shared packaging engine for the Chrome extension packagers
+
+A JSON hash manifest is kept next to every package. On the next build,
+members whose content hash is unchanged have their compressed bytes copied
+verbatim from the previous archive instead of being deflated again.
+build_packages() writes several targets (beta, stable, source bundle) from
+one pass over the shared source files.
+"""
+
+import hashlib
+import json
+import os
+import tempfile
+import zlib
+from collections import deque
+from dataclasses import dataclass, field
+from pathlib import Path
+
+from .zipformat import (
+    CHUNK_SIZE,
+    DEFLATED,
+    DETERMINISTIC_COMPRESSLEVEL,
+    DETERMINISTIC_DATE_TIME,
+    STORED,
+    FileRegion,
+    ZipMember,
+    ZipWriter,
+    compress_bytes,
+    dos_date_time,
+    normalized_attr,
+    raw_member_region,
+    read_central_directory,
+    read_raw_member,
+)
+from . import trace
+from .blobcache import BlobCache
+from .compression import SAMPLE_SIZE, STORE, resolve_policy
+from .inventory import build_inventory, file_sha256, write_inventory
+from .walker import FileEntry, scan_tree
+
+HASH_MANIFEST_VERSION = 1
+HASH_MANIFEST_SUFFIX = ".hashes.json"
+
+# Files (and reused payloads) this large are streamed in chunks, never
+# held in memory whole
+STREAM_THRESHOLD = 4 * 1024 * 1024
+
+
+@dataclass
+class BuildResult:
+    """Outcome of a build_package() run"""
+
+    package_path: Path
+    members: list = field(default_factory=list)
+    reused: int = 0
+    cached: int = 0
+    compressed: int = 0
+    stored: int = 0
+    inventory: dict = field(default_factory=dict)
+    compacted: bool = False
+
+    @property
+    def size(self):
+        return self.inventory["archive_size"]
+
+    @property
+    def sha256(self):
+        return self.inventory["sha256"]
+
+    @property
+    def names(self):
+        return [member.name for member in self.members]
+
+
+def hash_manifest_path(package_path):
+    """Location of the hash manifest kept for a package"""
+    package_path = Path(package_path)
+    return package_path.with_name(package_path.name + HASH_MANIFEST_SUFFIX)
+
+
+def load_hash_manifest(package_path, compresslevel=None):
+    """Load the previous build's hashes, or {} when they cannot be trusted"""
+    path = hash_manifest_path(package_path)
+    try:
+        with open(path, "r") as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    if manifest.get("version") != HASH_MANIFEST_VERSION:
+        return {}
+    if manifest.get("compresslevel") != compresslevel:
+        return {}
+    return manifest.get("members", {})
+
+
+def save_hash_manifest(package_path, entries, compresslevel=None):
+    """Write the hash manifest for the package that was just built"""
+    manifest = {
+        "version": HASH_MANIFEST_VERSION,
+        "compresslevel": compresslevel,
+        "members": entries,
+    }
+    with open(hash_manifest_path(package_path), "w") as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+
+
+def _open_previous(package_path, previous):
+    """Open the old archive for raw copying, or return (None, {})"""
+    if not previous or not package_path.exists():
+        return None, {}
+    fp = open(package_path, "rb")
+    try:
+        members = {member.name: member for member in read_central_directory(fp)}
+    except (OSError, ValueError):
+        fp.close()
+        return None, {}
+    return fp, members
+
+
+def _reusable(entry, old_member):
+    """True when the old archive still holds the bytes the manifest describes"""
+    return (
+        entry is not None
+        and old_member is not None
+        and entry.get("crc") == old_member.crc
+        and entry.get("compressed_size") == old_member.compressed_size
+        and old_member.method in (DEFLATED, STORED)
+    )
+
+
+def _read_chunks(file_path):
+    """Yield a file's contents in CHUNK_SIZE pieces"""
+    with open(file_path, "rb") as f:
+        while True:
+            chunk = f.read(CHUNK_SIZE)
+            if not chunk:
+                return
+            yield chunk
+
+
+def _read_head(file_path):
+    with open(file_path, "rb") as f:
+        return f.read(SAMPLE_SIZE)
+
+
+def _hashed(chunks, sha256):
+    """Pass chunks through while feeding them to a hash object"""
+    for chunk in chunks:
+        sha256.update(chunk)
+        yield chunk
+
+
+def compress_data(data, reusable_sha256, policy, cache, path=""):
+    """Hash in-memory content and find or make its payload
+
+    `policy` chooses the level from `path` and the content. Returns
+    (sha256, crc, payload, origin, level) as described for _process_file().
+    """
+    with trace.span("compress") as span:
+        digest = hashlib.sha256(data).hexdigest()
+        payload = None
+        level = None
+        if digest == reusable_sha256:
+            origin = "reused"
+        else:
+            level = policy.level_for(path, len(data), data)
+            if level != STORE and cache is not None:
+                payload = cache.get(digest, level)
+            if level == STORE:
+                origin = "stored"
+            elif payload is not None:
+                origin = "cached"
+            else:
+                origin = "compressed"
+                payload = compress_bytes(data, level)
+                if cache is not None:
+                    cache.put(digest, level, payload)
+            if level == STORE or not policy.keep(len(data), len(payload)):
+                payload, level, origin = data, STORE, "stored"
+        crc = zlib.crc32(data)
+        span.bytes_in = len(data)
+        span.bytes_out = 0 if payload is None else len(payload)
+        span.args["origin"] = origin
+    return digest, crc, payload, origin, level
+
+
+def _deflate_file(file_path, level, spool_dir):
+    """Hash and deflate a large file in chunks into a file in spool_dir
+
+    The payload is what ZipWriter.add_stream() would have written. Returns
+    (sha256, crc, size, FileRegion of the payload).
+    """
+    with trace.span("compress", path=file_path, streamed=True) as span:
+        sha256 = hashlib.sha256()
+        crc = 0
+        size = 0
+        compressor = zlib.compressobj(-1 if level is None else level, zlib.DEFLATED, -15)
+        with tempfile.NamedTemporaryFile(dir=spool_dir, delete=False) as out:
+            for chunk in _read_chunks(file_path):
+                sha256.update(chunk)
+                crc = zlib.crc32(chunk, crc)
+                size += len(chunk)
+                out.write(compressor.compress(chunk))
+            out.write(compressor.flush())
+            compressed_size = out.tell()
+        span.bytes_in = size
+        span.bytes_out = compressed_size
+    return sha256.hexdigest(), crc, size, FileRegion(out.name, 0, compressed_size)
+
+
+def _process_file(file_path, stat, reusable_sha256, policy, cache, spool_dir=None):
+    """Read, hash and deflate one file; runs inline or in a worker process
+
+    `stat` is the (mtime, mode, size) triple already known from the walk,
+    or None. Compression is skipped when the content matches
+    `reusable_sha256`, in which case the payload is None and the caller
+    copies the old bytes, or when the blob cache already holds it. Returns
+    the payload's origin ("reused", "cached", "compressed", "stored" or
+    "stream") and the level `policy` chose alongside it; level STORE means
+    the payload is the file itself.
+
+    Files of STREAM_THRESHOLD bytes or more are never held in memory: they
+    are hashed in chunks and cached and stored payloads come back as a
+    FileRegion. Anything left to deflate is deflated in chunks into
+    `spool_dir` when there is one, as in a worker, and comes back as a
+    FileRegion too; otherwise it is marked "stream" for the writer to
+    compress straight into the archive.
+    """
+    if stat is None:
+        st = os.stat(file_path)
+        stat = (st.st_mtime, st.st_mode, st.st_size)
+    mtime, mode, size = stat
+
+    if size >= STREAM_THRESHOLD:
+        level = policy.level_for(file_path, size, lambda: _read_head(file_path))
+        if reusable_sha256 is None and cache is None and level != STORE:
+            # Nothing to compare against; hash while deflating instead
+            if spool_dir is None:
+                return mtime, mode, size, None, None, None, "stream", level
+            digest, crc, size, payload = _deflate_file(file_path, level, spool_dir)
+            return mtime, mode, size, digest, crc, payload, "compressed", level
+        with trace.span("read", path=file_path) as span:
+            sha256 = hashlib.sha256()
+            crc = 0
+            size = 0
+            for chunk in _read_chunks(file_path):
+                sha256.update(chunk)
+                crc = zlib.crc32(chunk, crc)
+                size += len(chunk)
+            digest = sha256.hexdigest()
+            span.bytes_in = size
+        payload = None
+        if digest == reusable_sha256:
+            origin = "reused"
+        elif level == STORE:
+            payload = FileRegion(file_path, 0, size)
+            origin = "stored"
+        elif cache is not None and (payload := cache.locate(digest, level)):
+            origin = "cached"
+        elif spool_dir is not None:
+            origin = "compressed"
+            _, _, _, payload = _deflate_file(file_path, level, spool_dir)
+            if cache is not None:
+                cache.put(digest, level, payload)
+        else:
+            origin = "stream"
+        return mtime, mode, size, digest, crc, payload, origin, level
+
+    with trace.span("read", path=file_path) as span, open(file_path, "rb") as f:
+        data = f.read()
+        span.bytes_in = len(data)
+    return (mtime, mode, len(data)) + compress_data(data, reusable_sha256, policy, cache, file_path)
+
+
+def _process_batch(paths, stats, expected, policy, cache, spool_dir, traced=False):
+    """_process_file() over a batch in a worker; returns (results, trace events or None)"""
+    if not traced:
+        return [_process_file(path, stat, sha256, policy, cache, spool_dir)
+                for path, stat, sha256 in zip(paths, stats, expected)], None
+    with trace.tracing(trace.Tracer()) as tracer:
+        results = [_process_file(path, stat, sha256, policy, cache, spool_dir)
+                   for path, stat, sha256 in zip(paths, stats, expected)]
+    return results, tracer.events
+
+
+def resolve_jobs(jobs):
+    """Normalise a --jobs value: None or 1 is serial, 0 means every core"""
+    if jobs is None:
+        return 1
+    if jobs <= 0:
+        return os.cpu_count() or 1
+    return jobs
+
+
+def _batches(stats, jobs):
+    """Split indices into batches of about STREAM_THRESHOLD input bytes"""
+    start = 0
+    pending = 0
+    limit = max(1, len(stats) // (jobs * 4))
+    for index, stat in enumerate(stats):
+        pending += STREAM_THRESHOLD if stat is None else min(stat[2], STREAM_THRESHOLD)
+        if pending >= STREAM_THRESHOLD or index + 1 - start >= limit:
+            yield start, index + 1
+            start = index + 1
+            pending = 0
+    if start < len(stats):
+        yield start, len(stats)
+
+
+def _process_files(paths, stats, expected, policy, cache, jobs, spool_dir=None):
+    """Yield _process_file() results in input order, in parallel if asked
+
+    Workers get batches of bounded size and at most two batches per worker
+    are in flight, so memory stays flat however large the build is. They
+    deflate large files into `spool_dir`, which must outlive the results.
+    """
+    if jobs == 1 or len(paths) < 2:
+        for path, stat, sha256 in zip(paths, stats, expected):
+            yield _process_file(path, stat, sha256, policy, cache)
+        return
+    tracer = trace.active()
+
+    def results(future):
+        batch, events = future.result()
+        if events:
+            tracer.merge(events)
+        return batch
+
+    # Imported here: multiprocessing costs every other build its start-up time
+    from concurrent.futures import ProcessPoolExecutor
+
+    in_flight = deque()
+    with ProcessPoolExecutor(max_workers=jobs) as pool:
+        for start, end in _batches(stats, jobs):
+            in_flight.append(pool.submit(
+                _process_batch, paths[start:end], stats[start:end],
+                expected[start:end], policy, cache, spool_dir, tracer is not None,
+            ))
+            if len(in_flight) >= jobs * 2:
+                yield from results(in_flight.popleft())
+        while in_flight:
+            yield from results(in_flight.popleft())
+
+
+def _resolve_files(source_dir, files):
+    """Map member names to (absolute path, (mtime, mode, size) or None), dropping duplicates
+
+    Items may be relative paths or FileEntry objects from scan_tree().
+    """
+    resolved = {}
+    for item in files:
+        if isinstance(item, FileEntry):
+            if item.path not in resolved:
+                resolved[item.path] = (item.fs_path, (item.mtime, item.mode, item.size))
+        else:
+            rel_path = Path(item).as_posix()
+            if rel_path not in resolved:
+                resolved[rel_path] = (str(source_dir / rel_path), None)
+    return resolved
+
+
+@dataclass
+class PackageTarget:
+    """One archive written by build_packages()
+
+    `files` and `select` have the same meaning as in build_package().
+    `transforms` maps member names to functions from the file's bytes to
+    the bytes this target packages instead, e.g. a browser's manifest.json.
+    """
+
+    package_path: Path
+    files: list = None
+    select: object = None
+    deterministic: bool = False
+    transforms: dict = None
+
+
+class _TargetBuild:
+    """Write state for one target while build_packages() runs"""
+
+    def __init__(self, source_dir, target, policy, incremental):
+        self.package_path = Path(target.package_path)
+        self.deterministic = target.deterministic
+        self.policy = policy
+        files = target.files
+        if files is None:
+            files = scan_tree(source_dir, select=target.select)
+        self.resolved = _resolve_files(source_dir, files)
+        self.names = list(self.resolved)
+        if self.deterministic:
+            self.names.sort()
+        # Members are shared between targets by key: the name, or for a
+        # transformed member the name and the sha256 of what it became
+        self.keys = {rel_path: rel_path for rel_path in self.names}
+        self.variants = {}
+        for rel_path, transform in (target.transforms or {}).items():
+            if rel_path in self.resolved:
+                with open(self.resolved[rel_path][0], "rb") as f:
+                    data = transform(f.read())
+                key = (rel_path, hashlib.sha256(data).hexdigest())
+                self.keys[rel_path] = key
+                self.variants[key] = data
+
+        self.previous = load_hash_manifest(self.package_path, policy.manifest_key) if incremental else {}
+        self.old_fp, self.old_members = _open_previous(self.package_path, self.previous)
+        self.result = BuildResult(self.package_path)
+        self.entries = {}
+        self.position = 0
+        self.temp_path = self.package_path.with_name(self.package_path.name + ".tmp")
+        self.out = None
+        self.writer = None
+
+    def reusable(self, rel_path):
+        """(sha256, old member) when the old archive still holds rel_path"""
+        entry = self.previous.get(rel_path)
+        old_member = self.old_members.get(rel_path)
+        if _reusable(entry, old_member):
+            return entry.get("sha256"), old_member
+        return None
+
+    def open(self):
+        self.out = open(self.temp_path, "wb")
+        self.writer = ZipWriter(self.out)
+
+    def flush(self, ready, cache):
+        """Write every member, in this target's order, whose payload is ready
+
+        `ready` is keyed like self.keys. Entries are updated so later
+        targets copy what this one wrote: streamed and large payloads
+        become regions of this archive. Returns the keys written.
+        """
+        written = []
+        while self.position < len(self.names):
+            rel_path = self.names[self.position]
+            key = self.keys[rel_path]
+            if key not in ready:
+                break
+            ready[key] = self._write(rel_path, ready[key], cache)
+            written.append(key)
+            self.position += 1
+        return written
+
+    def _write(self, rel_path, item, cache):
+        mtime, mode, size, digest, crc, payload, origin, level = item
+        if origin == "reused":
+            self.result.reused += 1
+        elif origin == "cached":
+            self.result.cached += 1
+        elif origin == "stored":
+            self.result.stored += 1
+        else:
+            self.result.compressed += 1
+
+        if self.deterministic:
+            date_time = DETERMINISTIC_DATE_TIME
+            external_attr = normalized_attr(mode)
+        else:
+            date_time = dos_date_time(mtime)
+            external_attr = (mode & 0xFFFF) << 16
+
+        member = ZipMember(
+            name=rel_path,
+            method=STORED if level == STORE else DEFLATED,
+            crc=crc,
+            compressed_size=0,
+            file_size=size,
+            date_time=date_time,
+            external_attr=external_attr,
+        )
+        if origin == "stream":
+            # Read, deflated and written in one pass
+            with trace.span("compress", path=rel_path, streamed=True) as span:
+                sha256 = hashlib.sha256()
+                data_offset = self.writer.add_stream(
+                    member, _hashed(_read_chunks(self.resolved[rel_path][0]), sha256), level,
+                )
+                size, digest, crc = member.file_size, sha256.hexdigest(), member.crc
+                origin = "compressed"
+                span.bytes_in = size
+                span.bytes_out = member.compressed_size
+        else:
+            with trace.span("write", path=rel_path, origin=origin) as span:
+                member.compressed_size = (
+                    payload.length if isinstance(payload, FileRegion) else len(payload)
+                )
+                # Large deflated members always carry a data descriptor, so
+                # copied and streamed builds of the same content are
+                # byte-identical
+                data_offset = self.writer.add_raw(member, payload, descriptor=(
+                    size >= STREAM_THRESHOLD and member.method == DEFLATED
+                ))
+                span.bytes_out = member.compressed_size
+
+        if payload is None:
+            # Streamed: later targets and the cache copy it from this archive
+            self.out.flush()
+            payload = FileRegion(str(self.temp_path), data_offset, member.compressed_size)
+            if cache is not None:
+                cache.put(digest, level, payload)
+
+        self.entries[rel_path] = {
+            "sha256": digest,
+            "crc": crc,
+            "size": size,
+            "compressed_size": member.compressed_size,
+        }
+        return mtime, mode, size, digest, crc, payload, origin, level
+
+    def close_files(self):
+        if self.out is not None:
+            self.out.close()
+        if self.old_fp is not None:
+            self.old_fp.close()
+
+    def abort(self):
+        self.close_files()
+        self.temp_path.unlink(missing_ok=True)
+
+    def finish(self):
+        """Publish the archive and write its hash manifest and inventory"""
+        with trace.span("finish", package=self.package_path.name) as span:
+            os.replace(self.temp_path, self.package_path)
+            save_hash_manifest(self.package_path, self.entries, self.policy.manifest_key)
+            result = self.result
+            result.members = self.writer.members
+            result.inventory = build_inventory(
+                self.package_path, self.writer.members,
+                {name: entry["sha256"] for name, entry in self.entries.items()},
+                self.writer.size, self.writer.sha256,
+            )
+            write_inventory(self.package_path, result.inventory)
+            span.bytes_out = self.writer.size
+        return result
+
+
+def _target_policy(target, compresslevel, compression):
+    """The policy a separate build_package() run of target would use"""
+    if target.deterministic and compression is None and compresslevel is None:
+        compresslevel = DETERMINISTIC_COMPRESSLEVEL
+    return resolve_policy(compression, compresslevel)
+
+
+def build_packages(source_dir, targets, compresslevel=None, incremental=True,
+                   jobs=None, cache=True, compression=None):
+    """Build several packages of source_dir in one pass
+
+    Every distinct file is read, hashed and deflated once, however many
+    targets include it, and all archives are written side by side. Members
+    a target transforms (see PackageTarget) are made in this process and
+    shared by every target whose transform gives the same bytes. Each
+    target keeps its own member order, hash manifest and inventory, so the
+    archives are byte-identical to separate build_package() runs. Payloads
+    are held only until every target that needs them has written them;
+    files of STREAM_THRESHOLD bytes or more are streamed in chunks with a
+    data descriptor and later targets copy them from the first archive.
+    With `jobs` > 1 workers deflate them into a spool directory beside the
+    first package, which the archives copy from.
+
+    `compression` names a policy from compression.POLICIES ("fast",
+    "balanced" or "max") that stores incompressible files and picks levels
+    per file; without one everything is deflated at `compresslevel`. When
+    neither is given, deterministic targets use the deterministic level
+    and the others zlib's default, as separate runs would; zlib's default
+    is level 6, the deterministic level, so their content is still shared.
+    Returns one BuildResult per target, in order.
+    """
+    source_dir = Path(source_dir)
+    policies = [_target_policy(target, compresslevel, compression) for target in targets]
+    # Payloads are made once for every target; see above for why one level serves all
+    policy = next((target_policy for target_policy, target in zip(policies, targets)
+                   if target.deterministic), policies[0] if policies else None)
+
+    if cache is True:
+        cache = BlobCache()
+    elif not cache:
+        cache = None
+    jobs = resolve_jobs(jobs)
+
+    builds = []
+    spool = None
+    try:
+        for target, target_policy in zip(targets, policies):
+            builds.append(_TargetBuild(source_dir, target, target_policy, incremental))
+
+        # Union of all members, each with the first target that can supply
+        # its old compressed bytes
+        resolved = {}
+        reuse = {}
+        users = {}
+        variants = {}
+        for build in builds:
+            for rel_path in build.names:
+                key = build.keys[rel_path]
+                users[key] = users.get(key, 0) + 1
+                if key not in resolved:
+                    resolved[key] = build.resolved[rel_path]
+                if key not in reuse:
+                    reusable = build.reusable(rel_path)
+                    if reusable is not None:
+                        reuse[key] = (reusable[0], build.old_fp, reusable[1])
+            variants.update(build.variants)
+        keys = [key for key in resolved if key not in variants]
+        paths = [resolved[key][0] for key in keys]
+        stats = [resolved[key][1] for key in keys]
+        expected = [reuse[key][0] if key in reuse else None for key in keys]
+
+        for build in builds:
+            build.open()
+        ready = {}
+
+        def add_ready(key, item):
+            mtime, mode, size, digest, crc, payload, origin, level = item
+            if origin == "reused":
+                _, old_fp, old_member = reuse[key]
+                if old_member.compressed_size >= STREAM_THRESHOLD:
+                    payload = raw_member_region(old_fp, old_member)
+                else:
+                    payload = read_raw_member(old_fp, old_member)
+                level = STORE if old_member.method == STORED else None
+            ready[key] = (mtime, mode, size, digest, crc, payload, origin, level)
+            for build in builds:
+                for written in build.flush(ready, cache):
+                    users[written] -= 1
+                    if not users[written]:
+                        del ready[written]
+
+        for key, data in variants.items():
+            fs_path, stat = resolved[key]
+            if stat is None:
+                st = os.stat(fs_path)
+                stat = (st.st_mtime, st.st_mode, st.st_size)
+            reusable_sha256 = reuse[key][0] if key in reuse else None
+            add_ready(key, stat[:2] + (len(data),) + compress_data(
+                data, reusable_sha256, policy, cache, key[0]))
+
+        if jobs > 1:
+            # Workers deflate large files here; beside the first package, so
+            # it is on the same disk and not in a RAM-backed /tmp
+            spool = tempfile.TemporaryDirectory(prefix=".packager-spool-",
+                                                dir=builds[0].package_path.parent)
+        processed = _process_files(paths, stats, expected, policy, cache, jobs,
+                                   spool.name if spool else None)
+        with trace.profiled("build loop"):
+            for key, item in zip(keys, processed):
+                add_ready(key, item)
+        for build in builds:
+            build.writer.close()
+    except BaseException:
+        for build in builds:
+            build.abort()
+        raise
+    finally:
+        if spool is not None:
+            spool.cleanup()
+
+    for build in builds:
+        build.close_files()
+    results = [build.finish() for build in builds]
+    if cache is not None:
+        cache.evict()
+    return results
+
+
+def build_package(source_dir, package_path, files=None, select=None,
+                  compresslevel=None, incremental=True, jobs=None,
+                  deterministic=False, cache=True, compression=None):
+    """Build a deflated ZIP of source_dir at package_path
+
+    `files` lists member paths relative to source_dir or FileEntry objects
+    from scan_tree(); when omitted the whole tree is scanned and filtered
+    through `select`. With `jobs` > 1
+    members are deflated in a process pool; the archive is assembled in
+    input order, so the output is byte-identical to a serial build.
+
+    `deterministic` sorts members, pins timestamps and permissions and
+    fixes the compression level, so identical inputs give identical bytes.
+
+    `cache` is a BlobCache, True for the shared default cache or False to
+    always deflate; content compressed by any earlier build is taken from it.
+    `compression` is a policy name as for build_packages().
+    """
+    target = PackageTarget(package_path, files, select, deterministic)
+    return build_packages(source_dir, [target], compresslevel, incremental,
+                          jobs, cache, compression)[0]
+
+
+def update_package(source_dir, package_path, changed=(), removed=(),
+                   compresslevel=None, cache=True, compact_ratio=0.5,
+                   compression=None, deterministic=False):
+    """Rewrite only the changed members of a package built by build_package()
+
+    `changed` holds FileEntry objects or relative paths to add or replace,
+    `removed` relative paths to drop. New payloads are appended to the
+    archive, followed by a new central directory; superseded members stay
+    behind as dead space. Once that exceeds `compact_ratio` of the file,
+    or the hash manifest does not describe the archive, the package is
+    rebuilt with build_package(), copying every unchanged member.
+    `compresslevel`, `compression` and `deterministic` must match the
+    package's build; with `deterministic` appended members get the pinned
+    timestamp and permissions too.
+    """
+    source_dir = Path(source_dir)
+    package_path = Path(package_path)
+    if deterministic and compression is None and compresslevel is None:
+        compresslevel = DETERMINISTIC_COMPRESSLEVEL
+    if cache is True:
+        cache = BlobCache()
+    elif not cache:
+        cache = None
+
+    policy = resolve_policy(compression, compresslevel)
+    entries = load_hash_manifest(package_path, policy.manifest_key)
+    resolved = _resolve_files(source_dir, changed)
+    result = BuildResult(package_path)
+    with open(package_path, "r+b") as fp:
+        writer = ZipWriter.append(fp)
+        names = [member.name for member in writer.members]
+        if set(names) != set(entries):
+            writer = None
+        else:
+            original_size = writer.size
+            try:
+                for rel_path in removed:
+                    writer.remove(rel_path)
+                    entries.pop(rel_path, None)
+                for rel_path, (fs_path, stat) in resolved.items():
+                    old_sha256 = entries.get(rel_path, {}).get("sha256")
+                    mtime, mode, size, digest, crc, payload, origin, level = _process_file(
+                        fs_path, stat, old_sha256, policy, cache,
+                    )
+                    if origin == "reused":
+                        # Touched but unchanged
+                        result.reused += 1
+                        continue
+
+                    writer.remove(rel_path)
+                    if deterministic:
+                        date_time = DETERMINISTIC_DATE_TIME
+                        external_attr = normalized_attr(mode)
+                    else:
+                        date_time = dos_date_time(mtime)
+                        external_attr = (mode & 0xFFFF) << 16
+                    member = ZipMember(
+                        name=rel_path,
+                        method=STORED if level == STORE else DEFLATED,
+                        crc=crc,
+                        compressed_size=0,
+                        file_size=size,
+                        date_time=date_time,
+                        external_attr=external_attr,
+                    )
+                    if origin == "stream":
+                        sha256 = hashlib.sha256()
+                        data_offset = writer.add_stream(
+                            member, _hashed(_read_chunks(fs_path), sha256), level,
+                        )
+                        size, digest, crc = member.file_size, sha256.hexdigest(), member.crc
+                        if cache is not None:
+                            fp.flush()
+                            cache.put(digest, level, FileRegion(
+                                str(package_path), data_offset, member.compressed_size,
+                            ))
+                        origin = "compressed"
+                    else:
+                        member.compressed_size = (
+                            payload.length if isinstance(payload, FileRegion) else len(payload)
+                        )
+                        writer.add_raw(member, payload, descriptor=(
+                            size >= STREAM_THRESHOLD and member.method == DEFLATED
+                        ))
+                    if origin == "cached":
+                        result.cached += 1
+                    elif origin == "stored":
+                        result.stored += 1
+                    else:
+                        result.compressed += 1
+                    entries[rel_path] = {
+                        "sha256": digest,
+                        "crc": crc,
+                        "size": size,
+                        "compressed_size": member.compressed_size,
+                    }
+                writer.close()
+            except BaseException:
+                fp.truncate(original_size)
+                raise
+
+    if writer is None or writer.size - writer.live_size() > compact_ratio * writer.size:
+        if writer is not None:
+            names = [member.name for member in writer.members]
+        removed = set(removed)
+        files = [name for name in names if name not in removed and name not in resolved]
+        result = build_package(source_dir, package_path, files=files + list(changed),
+                               compresslevel=compresslevel, cache=cache,
+                               compression=compression, deterministic=deterministic)
+        result.compacted = True
+        return result
+
+    save_hash_manifest(package_path, entries, policy.manifest_key)
+    result.members = writer.members
+    result.inventory = build_inventory(
+        package_path, writer.members,
+        {name: entry["sha256"] for name, entry in entries.items()},
+        # Appending leaves the old bytes unhashed, so this one reads the file
+        writer.size, file_sha256(package_path),
+    )
+    write_inventory(package_path, result.inventory)
+    return result
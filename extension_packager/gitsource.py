@@ -0,0 +1,342 @@
+"""
+Package a tag or commit straight from git object storage
+
+All objects, including every tree and blob for every ref, come from a
+single persistent `git cat-file --batch` process, so releasing a tag needs
+no checkout and ignores whatever state the working tree is in. Blobs are
+deflated into the archive as they are read, and a blob shared by several
+refs is deflated once. Hash manifests record each member's blob id, so an
+unchanged blob is copied from the previous package without being read.
+"""
+
+import hashlib
+import itertools
+import os
+import subprocess
+import zlib
+from dataclasses import dataclass
+from pathlib import Path
+from typing import NamedTuple
+
+from .blobcache import BlobCache
+from .compression import STORE, resolve_policy
+from .engine import (
+    STREAM_THRESHOLD,
+    BuildResult,
+    _hashed,
+    _open_previous,
+    _reusable,
+    compress_data,
+    load_hash_manifest,
+    save_hash_manifest,
+)
+from .inventory import build_inventory, write_inventory
+from .zipformat import (
+    CHUNK_SIZE,
+    DEFLATED,
+    DETERMINISTIC_COMPRESSLEVEL,
+    DETERMINISTIC_DATE_TIME,
+    STORED,
+    FileRegion,
+    ZipMember,
+    ZipWriter,
+    dos_date_time,
+    normalized_attr,
+    raw_member_region,
+    read_raw_member,
+)
+
+TREE_MODE = 0o040000
+SYMLINK_MODE = 0o120000
+GITLINK_MODE = 0o160000
+
+
+class GitEntry(NamedTuple):
+    """A blob found in a git tree"""
+
+    path: str
+    blob: str
+    mode: int
+
+
+@dataclass
+class GitTarget:
+    """One archive written by build_from_git()"""
+
+    ref: str
+    package_path: Path
+    select: object = None
+    deterministic: bool = False
+
+
+class GitObjectReader:
+    """Read objects through one long-running `git cat-file --batch`"""
+
+    def __init__(self, repo="."):
+        self._process = subprocess.Popen(
+            ["git", "cat-file", "--batch"], cwd=repo,
+            stdin=subprocess.PIPE, stdout=subprocess.PIPE,
+        )
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        if self._process.poll() is None:
+            self._process.stdin.close()
+            self._process.wait()
+        self._process.stdout.close()
+
+    def _request(self, name):
+        """Ask for an object; returns (object id, type, size)"""
+        self._process.stdin.write(name.encode() + b"\n")
+        self._process.stdin.flush()
+        header = self._process.stdout.readline().split()
+        if len(header) != 3:
+            raise KeyError(f"git object not found: {name}")
+        return header[0].decode(), header[1].decode(), int(header[2])
+
+    def read(self, name):
+        """Return (object id, type, content) of an object"""
+        object_id, kind, size = self._request(name)
+        data = self._process.stdout.read(size)
+        self._process.stdout.read(1)
+        return object_id, kind, data
+
+    def open_blob(self, name):
+        """Return (size, chunks) for a blob
+
+        The chunk iterator must be used up before the next request.
+        """
+        _, _, size = self._request(name)
+        return size, self._chunks(size)
+
+    def _chunks(self, size):
+        remaining = size
+        while remaining:
+            chunk = self._process.stdout.read(min(CHUNK_SIZE, remaining))
+            remaining -= len(chunk)
+            yield chunk
+        self._process.stdout.read(1)
+
+    def commit(self, ref):
+        """Return (tree id, commit time) for a tag, branch or commit"""
+        _, _, data = self.read(f"{ref}^{{commit}}")
+        tree = None
+        timestamp = 0
+        for line in data.split(b"\n"):
+            if not line:
+                break
+            if line.startswith(b"tree "):
+                tree = line[5:].decode()
+            elif line.startswith(b"committer "):
+                timestamp = int(line.rsplit(b" ", 2)[1])
+        return tree, timestamp
+
+    def walk(self, tree, select=None, prefix=""):
+        """Yield a GitEntry for every blob under a tree, in tree order
+
+        `select` filters paths like scan_tree() does; when it is a
+        PathMatcher, excluded subtrees are never read. Submodules and
+        symlinks are skipped.
+        """
+        prunes = getattr(select, "prunes", None)
+        _, _, data = self.read(tree)
+        position = 0
+        while position < len(data):
+            space = data.index(b" ", position)
+            nul = data.index(b"\0", space)
+            mode = int(data[position:space], 8)
+            name = data[space + 1:nul].decode("utf-8", "surrogateescape")
+            object_id = data[nul + 1:nul + 21].hex()
+            position = nul + 21
+
+            path = prefix + name
+            if mode == TREE_MODE:
+                if prunes is None or not prunes(path):
+                    yield from self.walk(object_id, select, path + "/")
+            elif mode in (SYMLINK_MODE, GITLINK_MODE):
+                continue
+            elif select is None or select(path):
+                yield GitEntry(path, object_id, mode)
+
+
+def build_from_git(repo, targets, compresslevel=None, incremental=True, cache=True,
+                   compression=None):
+    """Build one package per GitTarget from git object storage
+
+    Members are written like build_package() writes them, dated with the
+    commit time (or the fixed date in deterministic mode), so a
+    deterministic build of a ref matches one of a clean checkout. Returns
+    one BuildResult per target, in order.
+    """
+    if compression is None and compresslevel is None and any(
+        target.deterministic for target in targets
+    ):
+        compresslevel = DETERMINISTIC_COMPRESSLEVEL
+    policy = resolve_policy(compression, compresslevel)
+    if cache is True:
+        cache = BlobCache()
+    elif not cache:
+        cache = None
+
+    # blob id -> (sha256, crc, size, FileRegion) of a payload already written
+    written = {}
+    pending = []
+    try:
+        with GitObjectReader(repo) as reader:
+            for target in targets:
+                temp_path, result, entries = _build_ref(
+                    reader, target, policy, incremental, cache, written,
+                )
+                pending.append((temp_path, result, entries))
+    except BaseException:
+        for temp_path, _, _ in pending:
+            temp_path.unlink(missing_ok=True)
+        raise
+
+    results = []
+    for temp_path, result, entries in pending:
+        os.replace(temp_path, result.package_path)
+        save_hash_manifest(result.package_path, entries, policy.manifest_key)
+        write_inventory(result.package_path, result.inventory)
+        results.append(result)
+    if cache is not None:
+        cache.evict()
+    return results
+
+
+def _build_ref(reader, target, policy, incremental, cache, written):
+    """Write one ref's archive to a temporary file next to its package
+
+    Returns (temp path, BuildResult, hash manifest entries); the caller
+    publishes the archive once every ref has been written, since later
+    refs may copy payloads out of it.
+    """
+    package_path = Path(target.package_path)
+    tree, timestamp = reader.commit(target.ref)
+    blobs = list(reader.walk(tree, target.select))
+    if target.deterministic:
+        blobs.sort(key=lambda entry: entry.path)
+        date_time = DETERMINISTIC_DATE_TIME
+    else:
+        date_time = dos_date_time(timestamp)
+
+    previous = load_hash_manifest(package_path, policy.manifest_key) if incremental else {}
+    old_fp, old_members = _open_previous(package_path, previous)
+    result = BuildResult(package_path)
+    entries = {}
+    temp_path = package_path.with_name(package_path.name + ".tmp")
+    try:
+        with open(temp_path, "wb") as out:
+            writer = ZipWriter(out)
+            for entry in blobs:
+                mode = 0o100000 | (entry.mode & 0o777)
+                member = ZipMember(
+                    name=entry.path,
+                    method=DEFLATED,
+                    crc=0,
+                    compressed_size=0,
+                    file_size=0,
+                    date_time=date_time,
+                    external_attr=normalized_attr(mode) if target.deterministic else mode << 16,
+                )
+                old = previous.get(entry.path)
+                old_member = old_members.get(entry.path)
+                if entry.blob in written:
+                    digest, crc, size, payload, level = written[entry.blob]
+                    if payload.path == str(temp_path):
+                        out.flush()
+                    origin = "cached"
+                elif old and old.get("blob") == entry.blob and _reusable(old, old_member):
+                    digest, crc, size = old["sha256"], old["crc"], old["size"]
+                    if old_member.compressed_size >= STREAM_THRESHOLD:
+                        payload = raw_member_region(old_fp, old_member)
+                    else:
+                        payload = read_raw_member(old_fp, old_member)
+                    level = STORE if old_member.method == STORED else None
+                    origin = "reused"
+                else:
+                    size, chunks = reader.open_blob(entry.blob)
+                    if size >= STREAM_THRESHOLD:
+                        # The first chunk doubles as the policy's sample
+                        first = next(chunks)
+                        chunks = itertools.chain([first], chunks)
+                        level = policy.level_for(entry.path, size, first)
+                        payload = None
+                        member.file_size = size
+                        sha256 = hashlib.sha256()
+                        if level == STORE:
+                            # Stored members need their CRC up front: hash, then copy
+                            crc = 0
+                            for chunk in _hashed(chunks, sha256):
+                                crc = zlib.crc32(chunk, crc)
+                            digest = sha256.hexdigest()
+                            member.method = STORED
+                            member.crc = crc
+                            member.compressed_size = size
+                            data_offset = writer.add_raw(member, reader.open_blob(entry.blob)[1])
+                            origin = "stored"
+                        else:
+                            data_offset = writer.add_stream(member, _hashed(chunks, sha256), level)
+                            digest, crc = sha256.hexdigest(), member.crc
+                            if cache is not None:
+                                out.flush()
+                                cache.put(digest, level, FileRegion(
+                                    str(temp_path), data_offset, member.compressed_size,
+                                ))
+                            origin = "compressed"
+                    else:
+                        digest, crc, payload, origin, level = compress_data(
+                            b"".join(chunks), None, policy, cache, entry.path,
+                        )
+
+                if payload is not None:
+                    member.method = STORED if level == STORE else DEFLATED
+                    member.crc = crc
+                    member.file_size = size
+                    member.compressed_size = (
+                        payload.length if isinstance(payload, FileRegion) else len(payload)
+                    )
+                    data_offset = writer.add_raw(member, payload, descriptor=(
+                        size >= STREAM_THRESHOLD and member.method == DEFLATED
+                    ))
+                written.setdefault(entry.blob, (
+                    digest, crc, size,
+                    FileRegion(str(temp_path), data_offset, member.compressed_size),
+                    level,
+                ))
+
+                if origin == "reused":
+                    result.reused += 1
+                elif origin == "cached":
+                    result.cached += 1
+                elif origin == "stored":
+                    result.stored += 1
+                else:
+                    result.compressed += 1
+                entries[entry.path] = {
+                    "sha256": digest,
+                    "crc": crc,
+                    "size": size,
+                    "compressed_size": member.compressed_size,
+                    "blob": entry.blob,
+                }
+            writer.close()
+    except BaseException:
+        temp_path.unlink(missing_ok=True)
+        raise
+    finally:
+        if old_fp is not None:
+            old_fp.close()
+
+    result.members = writer.members
+    result.inventory = build_inventory(
+        package_path, writer.members,
+        {name: entry["sha256"] for name, entry in entries.items()},
+        writer.size, writer.sha256,
+    )
+    return temp_path, result, entries
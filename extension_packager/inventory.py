@@ -0,0 +1,179 @@
+"""
+Package inventory sidecar written while the archive is built
+
+<package>.inventory.json lists every member's path, raw and compressed
+size, CRC and sha256 plus per-directory totals, and the sha256 of the
+archive itself, hashed as it was written. Summaries, size checks, release
+notes and SHA256SUMS files never have to reopen the archive.
+"""
+
+import hashlib
+import json
+from pathlib import Path
+
+INVENTORY_VERSION = 1
+INVENTORY_SUFFIX = ".inventory.json"
+SHA256SUMS = "SHA256SUMS"
+
+# Files the summaries call out individually when present
+KEY_FILES = ["manifest.json", "background.js", "content_script.js", "popup.html", "popup.js"]
+
+
+def inventory_path(package_path):
+    """Location of the inventory kept for a package"""
+    package_path = Path(package_path)
+    return package_path.with_name(package_path.name + INVENTORY_SUFFIX)
+
+
+def build_inventory(package_path, members, digests, archive_size, archive_sha256=None):
+    """Assemble the inventory for members written to package_path
+
+    `digests` maps member names to their sha256. Directory totals are
+    recursive and keyed by POSIX path; the archive root is "".
+    """
+    entries = []
+    directories = {}
+    for member in members:
+        entries.append({
+            "path": member.name,
+            "size": member.file_size,
+            "compressed_size": member.compressed_size,
+            "crc": f"{member.crc:08x}",
+            "sha256": digests[member.name],
+        })
+        parts = member.name.split("/")[:-1]
+        for depth in range(len(parts) + 1):
+            totals = directories.setdefault(
+                "/".join(parts[:depth]),
+                {"files": 0, "size": 0, "compressed_size": 0},
+            )
+            totals["files"] += 1
+            totals["size"] += member.file_size
+            totals["compressed_size"] += member.compressed_size
+
+    return {
+        "version": INVENTORY_VERSION,
+        "package": Path(package_path).name,
+        "archive_size": archive_size,
+        "sha256": archive_sha256,
+        "members": entries,
+        "directories": dict(sorted(directories.items())),
+    }
+
+
+def write_inventory(package_path, inventory):
+    """Write the inventory sidecar next to the package"""
+    with open(inventory_path(package_path), "w") as f:
+        json.dump(inventory, f, indent=2)
+
+
+def load_inventory(package_path):
+    """Read the inventory sidecar of a package"""
+    with open(inventory_path(package_path), "r") as f:
+        return json.load(f)
+
+
+def archive_sha256(package_path):
+    """sha256 of a package, from its inventory when that still matches the file
+
+    The file is only read when the inventory is missing, predates archive
+    digests or describes a different size.
+    """
+    package_path = Path(package_path)
+    try:
+        inventory = load_inventory(package_path)
+        if inventory.get("sha256") and inventory["archive_size"] == package_path.stat().st_size:
+            return inventory["sha256"]
+    except (OSError, ValueError, KeyError):
+        pass
+    return file_sha256(package_path)
+
+
+def file_sha256(path):
+    """sha256 of a file read from disk, for archives nobody hashed while writing"""
+    sha256 = hashlib.sha256()
+    with open(path, "rb") as f:
+        while chunk := f.read(1 << 20):
+            sha256.update(chunk)
+    return sha256.hexdigest()
+
+
+def write_sha256sums(package_paths, sums_path=None):
+    """Record packages in a SHA256SUMS file that `sha256sum -c` accepts
+
+    Entries already in the file for other packages are kept. By default
+    the file sits next to the first package. Returns its path.
+    """
+    package_paths = [Path(path) for path in package_paths]
+    if sums_path is None:
+        sums_path = package_paths[0].with_name(SHA256SUMS)
+    sums = {}
+    try:
+        with open(sums_path, "r") as f:
+            for line in f:
+                digest, _, name = line.rstrip("\n").partition("  ")
+                if name:
+                    sums[name] = digest
+    except FileNotFoundError:
+        pass
+    for package_path in package_paths:
+        sums[package_path.name] = archive_sha256(package_path)
+    with open(sums_path, "w") as f:
+        for name in sorted(sums):
+            f.write(f"{sums[name]}  {name}\n")
+    return Path(sums_path)
+
+
+def top_level_directories(inventory):
+    """(name, totals) for each top-level directory, sorted by name"""
+    return [
+        (name, totals)
+        for name, totals in inventory["directories"].items()
+        if name and "/" not in name
+    ]
+
+
+def print_summary(inventory, limit=None):
+    """Print the usual package summary from the inventory"""
+    names = [entry["path"] for entry in inventory["members"]]
+    totals = inventory["directories"].get("", {"size": 0, "compressed_size": 0})
+    print(f"\n📋 Package contains {len(names)} files "
+          f"({totals['size']:,} bytes raw, {totals['compressed_size']:,} compressed):")
+
+    for key_file in KEY_FILES:
+        if key_file in names:
+            print(f"  📄 {key_file}")
+
+    for name, dir_totals in top_level_directories(inventory):
+        print(f"  📂 {name}/ ({dir_totals['files']} files, "
+              f"{dir_totals['compressed_size']:,} bytes)")
+
+    if limit is not None:
+        for name in sorted(names)[:limit]:
+            print(f"  • {name}")
+        if len(names) > limit:
+            print(f"  ... and {len(names) - limit} more files")
+
+
+def release_notes_section(inventory):
+    """Markdown 'Package Contents' section for release notes"""
+    root = inventory["directories"].get("", {"files": 0, "size": 0})
+    lines = [
+        "## 📦 Package Contents",
+        "",
+        f"- **Package**: `{inventory['package']}`",
+        f"- **Size**: {inventory['archive_size'] / 1024:.1f} KB "
+        f"({root['files']} files, {root['size'] / 1024:.1f} KB uncompressed)",
+    ]
+    if inventory.get("sha256"):
+        lines.append(f"- **SHA-256**: `{inventory['sha256']}`")
+    lines += [
+        "",
+        "| Directory | Files | Compressed |",
+        "|-----------|-------|------------|",
+    ]
+    for name, totals in top_level_directories(inventory):
+        lines.append(f"| `{name}/` | {totals['files']} | "
+                     f"{totals['compressed_size'] / 1024:.1f} KB |")
+    return "\n".join(lines) + "\n"
+
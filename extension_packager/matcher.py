@@ -0,0 +1,119 @@
+"""
+Gitignore-style include/exclude rules compiled into a single matcher
+
+All rules are folded into one regular expression per rule set, so matching a
+path is a single regex call instead of a loop over every pattern. Directory
+rules are also checked against directories, letting the walker prune
+node_modules/, .git/ and friends before descending into them.
+"""
+
+import re
+
+# Store-submission exclusions shared by the build/ packagers
+STORE_EXCLUDES = [
+    "*.map", "*.ts", "*.test.js", "*.spec.js",
+    "test/", "tests/", "spec/", "*.md", "README*",
+    "LICENSE*", "*.log", ".git*", "node_modules/",
+    ".env*", "*.config.js", "jest.config*", "tsconfig*",
+    ".eslint*", ".prettier*", "coverage/", "docs/",
+    "documentation/", ".DS_Store", "Thumbs.db",
+    "*.tmp", "*.temp",
+]
+
+
+def _translate_glob(glob):
+    """Translate the body of a gitignore pattern into a regex fragment"""
+    parts = []
+    i = 0
+    while i < len(glob):
+        if glob.startswith("**/", i):
+            parts.append("(?:.*/)?")
+            i += 3
+        elif glob.startswith("**", i):
+            parts.append(".*")
+            i += 2
+        elif glob[i] == "*":
+            parts.append("[^/]*")
+            i += 1
+        elif glob[i] == "?":
+            parts.append("[^/]")
+            i += 1
+        elif glob[i] == "[" and "]" in glob[i + 2:]:
+            end = glob.index("]", i + 2)
+            body = glob[i + 1:end]
+            if body.startswith("!"):
+                body = "^" + body[1:]
+            parts.append("[" + body.replace("\\", "\\\\") + "]")
+            i = end + 1
+        else:
+            parts.append(re.escape(glob[i]))
+            i += 1
+    return "".join(parts)
+
+
+def compile_rule(pattern):
+    """Compile one gitignore line into (regex fragment, negated)
+
+    The fragment matches a path (directories carry a trailing "/") when the
+    pattern matches it or one of its parent directories.
+    """
+    negated = pattern.startswith("!")
+    if negated:
+        pattern = pattern[1:]
+    dir_only = pattern.endswith("/")
+    pattern = pattern.rstrip("/")
+    anchored = "/" in pattern
+    pattern = pattern.lstrip("/")
+
+    body = _translate_glob(pattern)
+    prefix = "" if anchored else "(?:.*/)?"
+    suffix = "/.*" if dir_only else "(?:/.*)?"
+    return prefix + body + suffix, negated
+
+
+def _compile_rules(patterns, flags):
+    """Fold rules into one regex whose first matching group is the last rule"""
+    rules = [compile_rule(p) for p in patterns if p.strip() and not p.startswith("#")]
+    if not rules:
+        return None, []
+    rules.reverse()
+    alternatives = "|".join(f"({fragment})" for fragment, _ in rules)
+    regex = re.compile(f"^(?:{alternatives})$", flags | re.DOTALL)
+    return regex, [negated for _, negated in rules]
+
+
+class PathMatcher:
+    """Decide which relative POSIX paths go into a package"""
+
+    def __init__(self, exclude=(), include=None, ignore_case=False):
+        flags = re.IGNORECASE if ignore_case else 0
+        self._exclude, self._exclude_negated = _compile_rules(exclude, flags)
+        self._include = None
+        if include is not None:
+            self._include, self._include_negated = _compile_rules(include, flags)
+
+    @staticmethod
+    def _hit(regex, negated, path):
+        if regex is None:
+            return False
+        match = regex.match(path)
+        if match is None:
+            return False
+        # Groups are in reverse rule order, so this is the last matching rule
+        return not negated[match.lastindex - 1]
+
+    def excludes(self, rel_path):
+        """True when an exclude rule matches the file"""
+        return self._hit(self._exclude, self._exclude_negated, rel_path)
+
+    def prunes(self, rel_dir):
+        """True when a whole directory can be skipped without walking it"""
+        return self._hit(self._exclude, self._exclude_negated, rel_dir + "/")
+
+    def __call__(self, rel_path):
+        """True when the file should be packaged"""
+        if self.excludes(rel_path):
+            return False
+        if self._include is None:
+            return True
+        return self._hit(self._include, self._include_negated, rel_path)
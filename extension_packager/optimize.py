@@ -0,0 +1,377 @@
+"""
+Asset optimization stage run before packaging
+
+optimize_files() takes the member list a build would package and returns
+one whose JSON is minified, whose scripts and stylesheets have their
+sourceMappingURL comments stripped and whose PNGs are recompressed
+losslessly. The source maps themselves leave the package; they can be
+kept in a separate debug-symbols archive with write_debug_symbols().
+
+Every result is kept in a content-addressed cache, keyed by the sha256 of
+the original file and the optimizer's version, and handed to the engine as
+a FileEntry pointing into the cache. An unchanged asset costs one read and
+one hash on the next build. Member names, timestamps and modes are those
+of the original files, and files of other types are never read.
+"""
+
+import hashlib
+import json
+import os
+import re
+import struct
+import zlib
+from dataclasses import dataclass, field
+from pathlib import Path
+
+from . import trace
+from .blobcache import BlobCache
+from .walker import FileEntry
+
+OPTIMIZED_DIR_ENV = "EXTENSION_PACKAGER_OPTIMIZED"
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+
+SOURCE_MAP_SUFFIX = ".map"
+# .ts for declaration files, which point at their .d.ts.map
+_SCRIPT_SUFFIXES = (".js", ".mjs", ".cjs", ".ts")
+_JS_SOURCE_MAP = re.compile(rb"^[ \t]*//[#@] sourceMappingURL=[^\r\n]*(?:\r?\n|$)", re.M)
+_CSS_SOURCE_MAP = re.compile(rb"/\*[#@] sourceMappingURL=.*?\*/[ \t]*(?:\r?\n)?", re.S)
+
+PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+# Ancillary chunks that never change how an image is drawn
+_PNG_METADATA = frozenset({b"tEXt", b"zTXt", b"iTXt", b"tIME"})
+# Images with more raw pixel data than this are only re-deflated, not re-filtered
+REFILTER_LIMIT = 256 * 1024
+
+
+def default_optimized_dir():
+    """$EXTENSION_PACKAGER_OPTIMIZED, else ~/.cache/extension-packager/optimized"""
+    if os.environ.get(OPTIMIZED_DIR_ENV):
+        return Path(os.environ[OPTIMIZED_DIR_ENV])
+    base = os.environ.get("XDG_CACHE_HOME") or Path.home() / ".cache"
+    return Path(base) / "extension-packager" / "optimized"
+
+
+def strip_source_map_comments(data, suffix):
+    """Script or stylesheet without its sourceMappingURL comments"""
+    pattern = _CSS_SOURCE_MAP if suffix == ".css" else _JS_SOURCE_MAP
+    return pattern.sub(b"", data)
+
+
+def _no_duplicate_keys(pairs):
+    keys = [key for key, _ in pairs]
+    if len(set(keys)) != len(keys):
+        raise ValueError("duplicate key")
+    return dict(pairs)
+
+
+def minify_json(data):
+    """JSON without insignificant whitespace; raises ValueError for anything else
+
+    Files with comments or duplicate keys (which Chrome tolerates in a
+    manifest) are rejected rather than changed.
+    """
+    value = json.loads(data, object_pairs_hook=_no_duplicate_keys)
+    return json.dumps(value, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def _png_chunks(data):
+    """(type, body) of every chunk of a PNG; raises ValueError when malformed"""
+    if not data.startswith(PNG_SIGNATURE):
+        raise ValueError("not a PNG")
+    chunks = []
+    offset = len(PNG_SIGNATURE)
+    while offset < len(data):
+        if offset + 12 > len(data):
+            raise ValueError("truncated chunk")
+        length, kind = struct.unpack_from(">L4s", data, offset)
+        body = data[offset + 8:offset + 8 + length]
+        crc, = struct.unpack_from(">L", data, offset + 8 + length)
+        if len(body) != length or zlib.crc32(kind + body) != crc:
+            raise ValueError(f"bad {kind!r} chunk")
+        chunks.append((kind, body))
+        offset += 12 + length
+        if kind == b"IEND":
+            return chunks
+    raise ValueError("no IEND chunk")
+
+
+def _png_chunk(kind, body):
+    return struct.pack(">L4s", len(body), kind) + body + struct.pack(">L", zlib.crc32(kind + body))
+
+
+def _paeth(a, b, c):
+    p = a + b - c
+    pa, pb, pc = abs(p - a), abs(p - b), abs(p - c)
+    if pa <= pb and pa <= pc:
+        return a
+    return b if pb <= pc else c
+
+
+def _unfilter(raw, height, stride, bpp):
+    """Pixel rows of a non-interlaced image from its filtered scanlines"""
+    rows = []
+    previous = bytearray(stride)
+    for y in range(height):
+        start = y * (stride + 1)
+        kind = raw[start]
+        row = bytearray(raw[start + 1:start + 1 + stride])
+        if kind == 1:
+            for i in range(bpp, stride):
+                row[i] = (row[i] + row[i - bpp]) & 0xFF
+        elif kind == 2:
+            for i in range(stride):
+                row[i] = (row[i] + previous[i]) & 0xFF
+        elif kind == 3:
+            for i in range(stride):
+                left = row[i - bpp] if i >= bpp else 0
+                row[i] = (row[i] + ((left + previous[i]) >> 1)) & 0xFF
+        elif kind == 4:
+            for i in range(stride):
+                left = row[i - bpp] if i >= bpp else 0
+                upper_left = previous[i - bpp] if i >= bpp else 0
+                row[i] = (row[i] + _paeth(left, previous[i], upper_left)) & 0xFF
+        elif kind != 0:
+            raise ValueError(f"unknown filter type {kind}")
+        rows.append(row)
+        previous = row
+    return rows
+
+
+def _filter_row(kind, row, previous, bpp):
+    if kind == 0:
+        return bytes(row)
+    out = bytearray(len(row))
+    for i in range(len(row)):
+        left = row[i - bpp] if i >= bpp else 0
+        if kind == 1:
+            predicted = left
+        elif kind == 2:
+            predicted = previous[i]
+        elif kind == 3:
+            predicted = (left + previous[i]) >> 1
+        else:
+            predicted = _paeth(left, previous[i], previous[i - bpp] if i >= bpp else 0)
+        out[i] = (row[i] - predicted) & 0xFF
+    return bytes(out)
+
+
+def _refiltered(rows, stride, bpp):
+    """Scanlines with no filter, and with the per-row filter of least absolute sum"""
+    unfiltered = bytearray()
+    adaptive = bytearray()
+    previous = bytes(stride)
+    for row in rows:
+        unfiltered += b"\x00" + row
+        candidates = [_filter_row(kind, row, previous, bpp) for kind in range(5)]
+        scores = [sum(v if v < 128 else 256 - v for v in line) for line in candidates]
+        best = scores.index(min(scores))
+        adaptive += bytes([best]) + candidates[best]
+        previous = row
+    return [bytes(unfiltered), bytes(adaptive)]
+
+
+def _deflated(scanlines):
+    """Smallest zlib stream among a few strategies"""
+    results = []
+    for strategy in (zlib.Z_DEFAULT_STRATEGY, zlib.Z_FILTERED):
+        compressor = zlib.compressobj(9, zlib.DEFLATED, zlib.MAX_WBITS, 9, strategy)
+        results.append(compressor.compress(scanlines) + compressor.flush())
+    return min(results, key=len)
+
+
+def recompress_png(data):
+    """Losslessly smaller PNG; raises ValueError when it cannot be read
+
+    Drops text and timestamp chunks, merges the IDAT chunks and deflates
+    the pixel data again at level 9. Non-interlaced 8- and 16-bit images
+    under REFILTER_LIMIT also have their scanline filters chosen again.
+    Animated PNGs are returned unchanged.
+    """
+    chunks = _png_chunks(data)
+    if any(kind == b"acTL" for kind, _ in chunks):
+        return data
+    header = chunks[0][1]
+    if chunks[0][0] != b"IHDR" or len(header) != 13:
+        raise ValueError("no IHDR chunk")
+    width, height, bit_depth, color_type, _, _, interlace = struct.unpack(">LLBBBBB", header)
+    raw = zlib.decompress(b"".join(body for kind, body in chunks if kind == b"IDAT"))
+
+    candidates = [raw]
+    channels = {0: 1, 2: 3, 3: 1, 4: 2, 6: 4}.get(color_type)
+    stride = (width * (channels or 0) * bit_depth + 7) // 8
+    if (channels and not interlace and bit_depth >= 8 and len(raw) <= REFILTER_LIMIT
+            and len(raw) == height * (stride + 1)):
+        bpp = max(1, channels * bit_depth // 8)
+        candidates += _refiltered(_unfilter(raw, height, stride, bpp), stride, bpp)
+    pixels = min((_deflated(scanlines) for scanlines in candidates), key=len)
+
+    out = bytearray(PNG_SIGNATURE)
+    wrote_pixels = False
+    for kind, body in chunks:
+        if kind in _PNG_METADATA:
+            continue
+        if kind == b"IDAT":
+            if not wrote_pixels:
+                out += _png_chunk(kind, pixels)
+                wrote_pixels = True
+            continue
+        out += _png_chunk(kind, body)
+    return bytes(out)
+
+
+def _optimizer(suffix, options):
+    """(cache tag, function) that optimizes files with this suffix, or None"""
+    if suffix == ".json" and options.minify_json:
+        return "json.1", minify_json
+    if suffix in _SCRIPT_SUFFIXES + (".css",) and options.strip_source_maps:
+        return "sourcemap.1", lambda data: strip_source_map_comments(data, suffix)
+    if suffix == ".png" and options.recompress_png:
+        return "png.1", recompress_png
+    return None
+
+
+@dataclass(frozen=True)
+class OptimizeOptions:
+    """Which optimizations run; all of them by default"""
+
+    minify_json: bool = True
+    strip_source_maps: bool = True
+    recompress_png: bool = True
+
+
+@dataclass
+class AssetSavings:
+    """Files and bytes of one file type before and after optimization"""
+
+    files: int = 0
+    optimized: int = 0
+    size: int = 0
+    optimized_size: int = 0
+
+
+@dataclass
+class OptimizeReport:
+    """Outcome of optimize_files()"""
+
+    types: dict = field(default_factory=dict)
+    cached: int = 0
+    # FileEntry objects of the source maps left out of the package
+    source_maps: list = field(default_factory=list)
+    # (path, error) of files an optimizer could not read, packaged as they are
+    skipped: list = field(default_factory=list)
+
+    @property
+    def saved(self):
+        return sum(savings.size - savings.optimized_size for savings in self.types.values())
+
+
+def _entry(source_dir, item):
+    if isinstance(item, FileEntry):
+        return item
+    rel_path = Path(item).as_posix()
+    fs_path = str(Path(source_dir) / rel_path)
+    st = os.stat(fs_path)
+    return FileEntry(rel_path, fs_path, st.st_size, st.st_mtime, st.st_mode)
+
+
+def _optimized_entry(entry, tag, optimize, cache, report):
+    """FileEntry of the optimized file, or the original when nothing is gained"""
+    with open(entry.fs_path, "rb") as f:
+        data = f.read()
+    digest = hashlib.sha256(data).hexdigest()
+    region = cache.locate(digest, tag)
+    if region is not None:
+        report.cached += 1
+    elif cache.locate(digest, f"{tag}-same") is not None:
+        report.cached += 1
+        return entry
+    else:
+        try:
+            optimized = optimize(data)
+        except (ValueError, zlib.error) as e:
+            report.skipped.append((entry.path, str(e)))
+            optimized = data
+        if len(optimized) >= len(data):
+            # Remembered too, so the optimizer never runs on this content again
+            cache.put(digest, f"{tag}-same", b"")
+            return entry
+        cache.put(digest, tag, optimized)
+        region = cache.locate(digest, tag)
+        if region is None:
+            raise OSError(f"Cannot write optimized {entry.path} to {cache.root}")
+    return entry._replace(fs_path=region.path, size=region.length)
+
+
+def optimize_files(source_dir, files, options=None, cache=None):
+    """Optimized member list for a build, and an OptimizeReport
+
+    `files` holds relative paths or FileEntry objects, as for
+    build_package(); FileEntry objects come back in the same order.
+    `cache` is a BlobCache (default: the shared optimized-asset cache).
+    Source maps are dropped when their comments are stripped; they are
+    listed in the report for write_debug_symbols().
+    """
+    options = options or OptimizeOptions()
+    if cache is None:
+        cache = BlobCache(default_optimized_dir(), DEFAULT_MAX_BYTES)
+    # Evict first: everything this build uses is touched after it
+    cache.evict()
+    report = OptimizeReport()
+    optimized = []
+    with trace.span("optimize") as span:
+        for item in files:
+            entry = _entry(source_dir, item)
+            suffix = os.path.splitext(entry.path)[1].lower()
+            if suffix == SOURCE_MAP_SUFFIX and options.strip_source_maps:
+                report.source_maps.append(entry)
+                continue
+            optimizer = _optimizer(suffix, options)
+            if optimizer is None:
+                optimized.append(entry)
+                continue
+            new_entry = _optimized_entry(entry, *optimizer, cache, report)
+            savings = report.types.setdefault(suffix, AssetSavings())
+            savings.files += 1
+            savings.optimized += new_entry is not entry
+            savings.size += entry.size
+            savings.optimized_size += new_entry.size
+            span.bytes_in += entry.size
+            span.bytes_out += new_entry.size
+            optimized.append(new_entry)
+        span.args["cached"] = report.cached
+    return optimized, report
+
+
+def debug_symbols_path(package_path):
+    """Where a package's source maps go by default: <package>.debug-symbols.zip"""
+    package_path = Path(package_path)
+    return package_path.with_name(f"{package_path.stem}.debug-symbols.zip")
+
+
+def write_debug_symbols(source_dir, report, package_path, **build_args):
+    """Package the source maps optimize_files() left out; returns its BuildResult
+
+    The archive keeps the maps at their package paths, so a crash report's
+    stack can be mapped back with the release it came from. Returns None
+    when there are no source maps.
+    """
+    if not report.source_maps:
+        return None
+    from .engine import build_package
+
+    return build_package(source_dir, package_path, files=report.source_maps, **build_args)
+
+
+def print_optimize_report(report):
+    """Print what the optimization stage saved, by file type"""
+    total = sum(savings.size for savings in report.types.values())
+    print(f"🪄 Optimized assets: saved {report.saved:,} of {total:,} bytes "
+          f"({report.cached} from cache)")
+    for suffix, savings in sorted(report.types.items()):
+        print(f"  {suffix:<6} {savings.optimized:>4} of {savings.files:>4} files  "
+              f"{savings.size:>12,} → {savings.optimized_size:>12,} bytes")
+    if report.source_maps:
+        size = sum(entry.size for entry in report.source_maps)
+        print(f"  🗺️  {len(report.source_maps)} source maps ({size:,} bytes) left out of the package")
+    for path, error in report.skipped:
+        print(f"  ⚠️  {path} left as is: {error}")
@@ -0,0 +1,161 @@
+"""
+Release steps run as a dependency graph on asyncio
+
+Each step starts as soon as every step it requires has succeeded, so
+independent steps (pushing a tag and building the package, say) overlap.
+A step that fails only cancels the steps that depend on it, directly or
+through other steps; the rest of the graph runs to completion.
+"""
+
+import asyncio
+import inspect
+import time
+from dataclasses import dataclass, field
+
+OK = "ok"
+FAILED = "failed"
+SKIPPED = "skipped"
+
+
+@dataclass
+class Step:
+    """One node of a Pipeline"""
+
+    name: str
+    action: object
+    requires: tuple = ()
+
+
+@dataclass
+class StepResult:
+    """Outcome and wall time of one step"""
+
+    name: str
+    status: str
+    value: object = None
+    error: str = ""
+    started: float = 0.0
+    seconds: float = 0.0
+
+
+@dataclass
+class PipelineResult:
+    """Every step's result, in the order the steps were added"""
+
+    steps: dict = field(default_factory=dict)
+    seconds: float = 0.0
+
+    @property
+    def ok(self):
+        return all(step.status == OK for step in self.steps.values())
+
+
+async def run_shell(cmd, cwd=None):
+    """Run a shell command without blocking the loop; returns (returncode, stdout, stderr)"""
+    process = await asyncio.create_subprocess_shell(
+        cmd, cwd=cwd, stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.PIPE,
+    )
+    stdout, stderr = await process.communicate()
+    return process.returncode, stdout.decode(errors="replace"), stderr.decode(errors="replace")
+
+
+class Pipeline:
+    """A set of steps and the dependencies between them
+
+    Actions are called with no arguments. Coroutine functions are awaited on
+    the loop; anything else runs in a worker thread. A step fails when its
+    action raises or returns False; otherwise its return value is available
+    to later steps through value().
+    """
+
+    def __init__(self):
+        self.steps = {}
+        self._results = {}
+
+    def add(self, name, action, requires=()):
+        if name in self.steps:
+            raise ValueError(f"duplicate step: {name}")
+        self.steps[name] = Step(name, action, tuple(requires))
+
+    def value(self, name):
+        """Return value of a step that has finished"""
+        return self._results[name].value
+
+    def _order(self):
+        """Steps with every requirement before its dependents"""
+        order = []
+        state = {}
+
+        def visit(name, chain):
+            if state.get(name) == "done":
+                return
+            if state.get(name) == "visiting":
+                raise ValueError("dependency cycle: " + " → ".join(chain + [name]))
+            if name not in self.steps:
+                raise ValueError(f"{chain[-1]} requires unknown step {name}")
+            state[name] = "visiting"
+            for required in self.steps[name].requires:
+                visit(required, chain + [name])
+            state[name] = "done"
+            order.append(self.steps[name])
+
+        for name in self.steps:
+            visit(name, [])
+        return order
+
+    async def run_async(self):
+        """Run every step as early as its requirements allow"""
+        order = self._order()
+        start = time.perf_counter()
+        self._results = {}
+        tasks = {}
+
+        async def run_step(step):
+            required = await asyncio.gather(*(tasks[name] for name in step.requires))
+            blocked = [result.name for result in required if result.status != OK]
+            if blocked:
+                result = StepResult(step.name, SKIPPED, error=f"{', '.join(blocked)} did not succeed")
+            else:
+                began = time.perf_counter()
+                result = StepResult(step.name, OK, started=began - start)
+                try:
+                    if inspect.iscoroutinefunction(step.action):
+                        result.value = await step.action()
+                    else:
+                        result.value = await asyncio.to_thread(step.action)
+                    if result.value is False:
+                        result.status = FAILED
+                except Exception as e:
+                    result.status = FAILED
+                    result.error = f"{type(e).__name__}: {e}"
+                result.seconds = time.perf_counter() - began
+            self._results[step.name] = result
+            return result
+
+        for step in order:
+            tasks[step.name] = asyncio.create_task(run_step(step))
+        await asyncio.gather(*tasks.values())
+
+        return PipelineResult(
+            {name: self._results[name] for name in self.steps},
+            time.perf_counter() - start,
+        )
+
+    def run(self):
+        return asyncio.run(self.run_async())
+
+
+def print_timings(result):
+    """Print when each step ran and how long it took"""
+    busy = sum(step.seconds for step in result.steps.values())
+    print(f"\n⏱️  Pipeline: {result.seconds:.2f}s wall, {busy:.2f}s of step time")
+    width = max((len(name) for name in result.steps), default=0)
+    for step in result.steps.values():
+        if step.status == SKIPPED:
+            print(f"  ⏭️ {step.name:<{width}}  skipped: {step.error}")
+            continue
+        icon = "✅" if step.status == OK else "❌"
+        line = f"  {icon} {step.name:<{width}}  {step.seconds:6.2f}s  (from {step.started:.2f}s)"
+        if step.error:
+            line += f"  {step.error}"
+        print(line)
@@ -0,0 +1,316 @@
+"""
+TypeScript build check run before packaging
+
+Packages are built from dist/, so a package is only as current as the last
+compile. prebuild() keeps an index of the sources, the build configs and
+the outputs (size, mtime and sha256 of every file) in .build-index.json.
+When every source and config still has its indexed content and the
+outputs are still what the last compile wrote, the build is fresh and the
+compiler is not started at all. Otherwise it reports why and, unless
+asked only to check, cleans, compiles and indexes the result.
+
+Where the sources and outputs are comes from tsconfig.json's rootDir and
+outDir, and tsconfig.tsbuildinfo is only expected of incremental or
+composite projects. A bundled project lists its entry point outputs
+instead of expecting one output per source.
+
+Files whose size and mtime match the index are not read again, so a fresh
+check costs one stat per file. Without an index (a new checkout, say) a
+build is stale when an output is missing or older than its source.
+"""
+
+import hashlib
+import json
+import os
+import re
+import subprocess
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+
+from . import trace
+from .matcher import PathMatcher
+from .walker import scan_tree
+
+BUILD_INDEX_VERSION = 1
+BUILD_INDEX = ".build-index.json"
+TSCONFIG = "tsconfig.json"
+# Used when there is no tsconfig.json or it leaves them unset
+SOURCE_DIR = "src"
+OUTPUT_DIR = "dist"
+# Inputs besides the sources that change what the build emits
+CONFIG_FILES = ("package.json", "package-lock.json", "webpack.config.js")
+# package.json's build script is tsc; clean empties dist/ so that outputs
+# of deleted sources are not packaged
+TSC_COMMAND = ("npm", "run", "build")
+CLEAN_COMMAND = ("npm", "run", "clean")
+
+# Matches tsconfig.json's "exclude"
+_SOURCES = PathMatcher(["*.test.ts", "*.spec.ts"])
+# Strings are matched first so that comment markers inside them are kept
+_JSONC = re.compile(r'("(?:\\.|[^"\\])*")|//[^\n]*|/\*.*?\*/|,(\s*[}\]])', re.S)
+# Source suffix -> emitted suffix; JavaScript only with allowJs
+_EMITTED = {".ts": ".js", ".tsx": ".js", ".mts": ".mjs", ".cts": ".cjs"}
+_EMITTED_JS = {".js": ".js", ".jsx": ".js", ".mjs": ".mjs", ".cjs": ".cjs"}
+
+
+@dataclass
+class TscProject:
+    """Where a TypeScript project's sources and outputs are, from tsconfig.json
+
+    Paths are POSIX and relative to the project directory.
+    """
+
+    source_dir: str = SOURCE_DIR
+    output_dir: str = OUTPUT_DIR
+    # tsc's incremental state, None unless tsconfig sets incremental or composite
+    tsbuildinfo: str = None
+    allow_js: bool = False
+    # tsconfig.json and the configs it extends
+    configs: list = field(default_factory=list)
+    # Outputs expected instead of one per source, such as a bundler's entry points
+    outputs: list = None
+    # Further files or directories whose changes make dist/ stale
+    inputs: list = field(default_factory=list)
+
+    def expected_outputs(self, source):
+        """Outputs the build emits for a source"""
+        if self.outputs is not None:
+            return self.outputs
+        if not source.startswith(self.source_dir + "/") or source.endswith(".d.ts"):
+            return []
+        stem, suffix = os.path.splitext(source[len(self.source_dir) + 1:])
+        suffix = _EMITTED.get(suffix) or (self.allow_js and _EMITTED_JS.get(suffix))
+        return [f"{self.output_dir}/{stem}{suffix}"] if suffix else []
+
+
+def _read_jsonc(path):
+    """Parse a tsconfig, which may hold comments and trailing commas"""
+    text = Path(path).read_text(encoding="utf-8")
+    return json.loads(_JSONC.sub(lambda m: m.group(1) or m.group(2) or "", text))
+
+
+def _relative(project_dir, config_dir, value):
+    path = os.path.relpath(os.path.normpath(os.path.join(config_dir, value)), project_dir)
+    return Path(path).as_posix()
+
+
+def _compiler_options(project_dir, config_path, configs):
+    """compilerOptions of a config merged over those it extends
+
+    Path options are made relative to the project directory. Configs
+    extended by package name rather than path are not followed.
+    """
+    configs.append(Path(os.path.relpath(config_path, project_dir)).as_posix())
+    config = _read_jsonc(config_path)
+    extends = config.get("extends") or []
+    options = {}
+    for base in [extends] if isinstance(extends, str) else extends:
+        if not base.startswith("."):
+            continue
+        base_path = config_path.parent / base
+        if not base_path.is_file() and base_path.suffix != ".json":
+            base_path = base_path.with_name(base_path.name + ".json")
+        if base_path.is_file():
+            options.update(_compiler_options(project_dir, base_path, configs))
+    own = dict(config.get("compilerOptions") or {})
+    for key in ("rootDir", "outDir", "outFile", "tsBuildInfoFile"):
+        if key in own:
+            own[key] = _relative(project_dir, config_path.parent, own[key])
+    options.update(own)
+    return options
+
+
+def load_project(project_dir, tsconfig=TSCONFIG, outputs=None, inputs=()):
+    """TscProject for a project directory, read from its tsconfig
+
+    Without the tsconfig, sources are in src/, outputs in dist/ and the
+    build is not incremental.
+    """
+    project_dir = Path(project_dir)
+    config_path = project_dir / tsconfig
+    project = TscProject(outputs=list(outputs) if outputs is not None else None,
+                         inputs=list(inputs))
+    if not config_path.is_file():
+        return project
+    options = _compiler_options(project_dir, config_path, project.configs)
+    project.source_dir = options.get("rootDir", SOURCE_DIR)
+    project.output_dir = options.get("outDir", OUTPUT_DIR)
+    project.allow_js = bool(options.get("allowJs"))
+    if options.get("incremental") or options.get("composite"):
+        stem = config_path.stem
+        if "tsBuildInfoFile" in options:
+            project.tsbuildinfo = options["tsBuildInfoFile"]
+        # Otherwise tsc writes it beside outFile, or where the config would
+        # land in outDir, or beside the config
+        elif "outFile" in options:
+            project.tsbuildinfo = options["outFile"] + ".tsbuildinfo"
+        elif "outDir" in options:
+            config_dir = os.path.relpath(config_path.parent, project_dir / options.get("rootDir", "."))
+            project.tsbuildinfo = Path(os.path.normpath(
+                os.path.join(options["outDir"], config_dir, stem + ".tsbuildinfo"))).as_posix()
+        else:
+            project.tsbuildinfo = _relative(project_dir, config_path.parent, stem + ".tsbuildinfo")
+    return project
+
+
+@dataclass
+class PrebuildReport:
+    """Outcome of prebuild(); packaging may go ahead when `ok`"""
+
+    project_dir: Path
+    project: TscProject
+    # Why the build was stale, empty when it was fresh
+    stale: list = field(default_factory=list)
+    compiled: bool = False
+    seconds: float = 0.0
+    # Compiler failures, or outputs still missing after compiling
+    errors: list = field(default_factory=list)
+
+    @property
+    def ok(self):
+        return not self.errors and (self.compiled or not self.stale)
+
+
+def _file_state(fs_path, size, mtime, previous):
+    """[size, mtime, sha256], hashing only when size or mtime changed"""
+    if previous and previous[0] == size and previous[1] == mtime:
+        return previous
+    sha256 = hashlib.sha256()
+    with open(fs_path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            sha256.update(chunk)
+    return [size, mtime, sha256.hexdigest()]
+
+
+def scan_project(project_dir, project, index=None):
+    """{"sources": {...}, "outputs": {...}} of the project, as stored in the index"""
+    project_dir = Path(project_dir)
+    index = index or {}
+    state = {"sources": {}, "outputs": {}}
+    sources = scan_tree(project_dir, project.source_dir, select=_SOURCES)
+    for name in dict.fromkeys([*project.configs, *CONFIG_FILES, *project.inputs]):
+        path = project_dir / name
+        if path.is_dir():
+            sources += scan_tree(project_dir, name)
+        elif path.is_file():
+            st = path.stat()
+            sources.append((name, str(path), st.st_size, st.st_mtime))
+    for kind, entries in (("sources", sources), ("outputs", scan_tree(project_dir, project.output_dir))):
+        previous = index.get(kind, {})
+        for path, fs_path, size, mtime, *_ in entries:
+            state[kind][path] = _file_state(fs_path, size, mtime, previous.get(path))
+    return state
+
+
+def _missing_outputs(state, project):
+    expected = dict.fromkeys(output for source in state["sources"]
+                             for output in project.expected_outputs(source))
+    return [output for output in expected if output not in state["outputs"]]
+
+
+def _changes(old, new, what):
+    reasons = [f"{path} {what}" for path in new if path in old and old[path][2] != new[path][2]]
+    reasons += [f"{path} added" for path in new if path not in old]
+    reasons += [f"{path} removed" for path in old if path not in new]
+    return reasons
+
+
+def stale_reasons(project_dir, project, state, index=None):
+    """Why the outputs do not match the sources, or [] when they are current"""
+    project_dir = Path(project_dir)
+    missing = _missing_outputs(state, project)
+    reasons = [f"{output} is missing" for output in missing]
+    if project.tsbuildinfo and not (project_dir / project.tsbuildinfo).exists():
+        reasons.append(f"{project.tsbuildinfo} is missing")
+    if index is not None:
+        reasons += _changes(index["sources"], state["sources"], "changed")
+        outputs = {path: entry for path, entry in index["outputs"].items() if path not in missing}
+        reasons += _changes(outputs, state["outputs"], "changed since it was compiled")
+        return reasons
+    # No index yet: fall back to timestamps
+    for source, (_, mtime, _) in state["sources"].items():
+        for output in project.expected_outputs(source):
+            if output in state["outputs"] and state["outputs"][output][1] < mtime:
+                reasons.append(f"{source} is newer than {output}")
+    return reasons
+
+
+def load_build_index(project_dir):
+    """The saved index, or None when there is none or it cannot be trusted"""
+    try:
+        with open(Path(project_dir) / BUILD_INDEX, "r") as f:
+            index = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if index.get("version") != BUILD_INDEX_VERSION:
+        return None
+    return index
+
+
+def save_build_index(project_dir, state):
+    index_path = Path(project_dir) / BUILD_INDEX
+    temp_path = index_path.with_name(f"{BUILD_INDEX}.{os.getpid()}.tmp")
+    with open(temp_path, "w") as f:
+        json.dump({"version": BUILD_INDEX_VERSION, **state}, f, indent=1, sort_keys=True)
+    os.replace(temp_path, index_path)
+
+
+def prebuild(project_dir, compile=True, command=TSC_COMMAND, clean=CLEAN_COMMAND, project=None):
+    """Make sure the outputs were built from the current sources
+
+    Runs `clean` and then `command` in project_dir when the build is stale,
+    unless `compile` is False; `clean` may be None. `project` defaults to
+    what tsconfig.json says. The tsbuildinfo of an incremental project is
+    removed before a clean, or when dist/ was changed by hand, as tsc would
+    otherwise skip re-emitting files it believes are current.
+    """
+    project_dir = Path(project_dir)
+    project = project or load_project(project_dir)
+    report = PrebuildReport(project_dir, project)
+    start = time.perf_counter()
+    with trace.span("prebuild", project=project_dir.name) as span:
+        index = load_build_index(project_dir)
+        state = scan_project(project_dir, project, index)
+        report.stale = stale_reasons(project_dir, project, state, index)
+        span.args["stale"] = len(report.stale)
+        if report.stale and compile:
+            outputs_touched = index is not None and index["outputs"] != state["outputs"]
+            if project.tsbuildinfo and (clean or outputs_touched or _missing_outputs(state, project)):
+                (project_dir / project.tsbuildinfo).unlink(missing_ok=True)
+            report.compiled = True
+            for step in (clean, command):
+                if not step:
+                    continue
+                returncode = subprocess.run(list(step), cwd=project_dir).returncode
+                if returncode != 0:
+                    report.errors.append(f"{' '.join(step)} exited with status {returncode}")
+                    break
+            else:
+                state = scan_project(project_dir, project, state)
+                report.errors += [f"{output} was not emitted"
+                                  for output in _missing_outputs(state, project)]
+        if not report.errors and (report.compiled or not report.stale):
+            save_build_index(project_dir, state)
+    report.seconds = time.perf_counter() - start
+    return report
+
+
+def print_prebuild_report(report, limit=10):
+    """Print whether dist/ is current and what was done about it"""
+    output_dir, source_dir = report.project.output_dir, report.project.source_dir
+    if not report.stale:
+        print(f"✅ {output_dir}/ is current with {source_dir}/ "
+              f"(checked in {report.seconds * 1000:.0f}ms, build not run)")
+        return
+    print(f"⚠️  {output_dir}/ is stale:")
+    for reason in report.stale[:limit]:
+        print(f"  • {reason}")
+    if len(report.stale) > limit:
+        print(f"  ... and {len(report.stale) - limit} more")
+    for error in report.errors:
+        print(f"❌ {error}")
+    if report.compiled and report.ok:
+        print(f"✅ Compiled in {report.seconds:.1f}s")
+    elif not report.compiled:
+        print("❌ Compile before packaging: python -m extension_packager prebuild")
@@ -0,0 +1,238 @@
+"""
+Manifest-driven reachability of extension files
+
+Starting from manifest.json, follows the pages, scripts, icons and
+web-accessible resources it names, then the <script>/<link>/<img>
+references of every HTML page, the import/require/importScripts calls of
+every script and the url()/@import references of every stylesheet. Files
+nothing reaches (type declarations, source maps, stale bundles) can be left
+out of store packages.
+"""
+
+import json
+import posixpath
+import re
+from dataclasses import dataclass, field
+from html.parser import HTMLParser
+from pathlib import Path
+
+from . import trace
+from .matcher import PathMatcher
+from .walker import scan_tree
+
+MANIFEST = "manifest.json"
+
+# Never loaded by the browser, so web_accessible_resources globs skip them;
+# an explicit reference still includes them
+DEV_ONLY = ["*.d.ts", "*.map", "*.tsbuildinfo"]
+
+_JS_REFERENCE = re.compile(
+    r"""(?:\bimport\s*(?:[\w*{}\s,$]+\s*from\s*)?|\bexport\s*[\w*{}\s,$]*\s*from\s*|"""
+    r"""\bimport\s*\(\s*|\brequire\s*\(\s*)(["'])([^"'\n]+)\1"""
+)
+_IMPORT_SCRIPTS = re.compile(r"\bimportScripts\s*\(([^)]*)\)")
+_STRING = re.compile(r"""(["'])([^"'\n]+)\1""")
+_CSS_REFERENCE = re.compile(
+    r"""@import\s+(["'])([^"']+)\1|url\(\s*(["']?)([^"')]+)\3\s*\)"""
+)
+_PARSED_SUFFIXES = {".html", ".htm", ".js", ".mjs", ".cjs", ".css"}
+
+
+@dataclass
+class Reachability:
+    """Outcome of reachable_files()"""
+
+    reachable: set = field(default_factory=set)
+    # (referencing file, reference) pairs that resolve to no file
+    missing: list = field(default_factory=list)
+
+
+@dataclass
+class PruneReport:
+    """Files prune_unreachable() left out of a package"""
+
+    unreachable: list = field(default_factory=list)
+    unreachable_bytes: int = 0
+    missing: list = field(default_factory=list)
+
+
+class _PageReferences(HTMLParser):
+    """Collect script, stylesheet, icon and image URLs from an HTML page"""
+
+    def __init__(self):
+        super().__init__()
+        self.references = []
+
+    def handle_starttag(self, tag, attrs):
+        attrs = dict(attrs)
+        if tag in ("script", "img", "iframe", "source") and attrs.get("src"):
+            self.references.append(attrs["src"])
+        elif tag == "link" and attrs.get("href"):
+            self.references.append(attrs["href"])
+
+
+def _manifest_references(manifest):
+    """Paths and web_accessible_resources globs named by a manifest"""
+    paths = []
+    globs = []
+
+    def add(value):
+        if isinstance(value, str):
+            paths.append(value)
+        elif isinstance(value, dict):
+            paths.extend(v for v in value.values() if isinstance(v, str))
+        elif isinstance(value, list):
+            paths.extend(v for v in value if isinstance(v, str))
+
+    for key in ("action", "browser_action", "page_action"):
+        section = manifest.get(key) or {}
+        add(section.get("default_popup"))
+        add(section.get("default_icon"))
+    background = manifest.get("background") or {}
+    add(background.get("service_worker"))
+    add(background.get("page"))
+    add(background.get("scripts"))
+    for script in manifest.get("content_scripts") or []:
+        add(script.get("js"))
+        add(script.get("css"))
+    add(manifest.get("icons"))
+    add(manifest.get("options_page"))
+    add((manifest.get("options_ui") or {}).get("page"))
+    add(manifest.get("devtools_page"))
+    add((manifest.get("side_panel") or {}).get("default_path"))
+    add(manifest.get("chrome_url_overrides"))
+    add((manifest.get("sandbox") or {}).get("pages"))
+
+    for resource in manifest.get("web_accessible_resources") or []:
+        if isinstance(resource, str):
+            globs.append(resource)
+        else:
+            globs.extend(resource.get("resources") or [])
+    if manifest.get("default_locale"):
+        globs.append("_locales/")
+    return paths, globs
+
+
+def _file_references(rel_path, text):
+    """(references, module) for one HTML, script or stylesheet file
+
+    `module` is True for script specifiers, which follow module resolution.
+    """
+    suffix = posixpath.splitext(rel_path)[1].lower()
+    if suffix in (".html", ".htm"):
+        parser = _PageReferences()
+        parser.feed(text)
+        return parser.references, False
+    if suffix in (".js", ".mjs", ".cjs"):
+        references = [m.group(2) for m in _JS_REFERENCE.finditer(text)]
+        for call in _IMPORT_SCRIPTS.finditer(text):
+            references += [m.group(2) for m in _STRING.finditer(call.group(1))]
+        return references, True
+    if suffix == ".css":
+        return [m.group(2) or m.group(4) for m in _CSS_REFERENCE.finditer(text)], False
+    return [], False
+
+
+def _resolve(base_dir, reference, exists, module=False):
+    """Package path a reference points at, or None when nothing matches
+
+    Absolute URLs, and bare module names in scripts, are not package files
+    and resolve to "". Module specifiers are tried as written, then with
+    ".js" and "/index.js" added, as compiled CommonJS output leaves them off.
+    """
+    reference = reference.split("#", 1)[0].split("?", 1)[0].strip()
+    if not reference or re.match(r"^[a-z][a-z0-9+.-]*:", reference, re.I):
+        return ""
+    if module and not reference.startswith((".", "/")):
+        return ""
+    if reference.startswith("/"):
+        path = posixpath.normpath(reference.lstrip("/"))
+    else:
+        path = posixpath.normpath(posixpath.join(base_dir, reference))
+    candidates = (path, path + ".js", path + "/index.js") if module else (path,)
+    for candidate in candidates:
+        if exists(candidate):
+            return candidate
+    return None
+
+
+def reachable_files(source_dir, manifest=MANIFEST):
+    """Find every file reachable from the manifest under source_dir"""
+    source_dir = Path(source_dir)
+    result = Reachability()
+    with open(source_dir / manifest, "r") as f:
+        manifest_data = json.load(f)
+
+    def exists(rel_path):
+        return not rel_path.startswith("..") and (source_dir / rel_path).is_file()
+
+    paths, globs = _manifest_references(manifest_data)
+    pending = [manifest]
+    for reference in paths:
+        rel_path = _resolve("", reference, exists)
+        if rel_path is None:
+            result.missing.append((manifest, reference))
+        elif rel_path:
+            pending.append(rel_path)
+
+    if globs:
+        war = PathMatcher(DEV_ONLY, include=globs)
+        pending += [entry.path for entry in scan_tree(source_dir, select=war)]
+
+    while pending:
+        rel_path = pending.pop()
+        if rel_path in result.reachable:
+            continue
+        result.reachable.add(rel_path)
+        if posixpath.splitext(rel_path)[1].lower() not in _PARSED_SUFFIXES:
+            continue
+        try:
+            text = (source_dir / rel_path).read_text(errors="replace")
+        except OSError:
+            continue
+        base_dir = posixpath.dirname(rel_path)
+        references, module = _file_references(rel_path, text)
+        for reference in references:
+            target = _resolve(base_dir, reference, exists, module)
+            if target is None:
+                result.missing.append((rel_path, reference))
+            elif target and target not in result.reachable:
+                pending.append(target)
+    return result
+
+
+def prune_unreachable(source_dir, files, manifest=MANIFEST):
+    """Drop package members the manifest cannot reach
+
+    `files` holds relative paths or FileEntry objects. Returns the kept
+    items, in order, and a PruneReport of what was dropped.
+    """
+    source_dir = Path(source_dir)
+    with trace.span("filter", rule="reachability") as span:
+        reachability = reachable_files(source_dir, manifest)
+        kept = []
+        report = PruneReport(missing=reachability.missing)
+        for item in files:
+            rel_path = getattr(item, "path", None) or Path(item).as_posix()
+            if rel_path in reachability.reachable:
+                kept.append(item)
+                continue
+            size = getattr(item, "size", None)
+            if size is None:
+                size = (source_dir / rel_path).stat().st_size
+            report.unreachable.append((rel_path, size))
+            report.unreachable_bytes += size
+        span.args["pruned"] = len(report.unreachable)
+    return kept, report
+
+
+def print_prune_report(report, limit=10):
+    """Print the usual summary of pruned files"""
+    print(f"✂️  Pruned {len(report.unreachable)} unreachable files "
+          f"({report.unreachable_bytes:,} bytes)")
+    for rel_path, size in sorted(report.unreachable, key=lambda item: -item[1])[:limit]:
+        print(f"  • {rel_path} ({size:,} bytes)")
+    if len(report.unreachable) > limit:
+        print(f"  ... and {len(report.unreachable) - limit} more files")
+    for source, reference in report.missing:
+        print(f"⚠️  {source} references missing file: {reference}")
@@ -0,0 +1,151 @@
+"""
+Release package targets shared by the release scripts
+
+create_beta_package.py, release_complete_v1.0.0.py and
+create_final_package.py build the beta, stable and source-bundle archives
+from these member lists; create_release_packages.py builds all three in a
+single pass.
+"""
+
+from pathlib import Path
+
+from .engine import PackageTarget
+from .matcher import PathMatcher
+from .walker import scan_tree
+
+BETA_PACKAGE = "chatgpt-extension-v1.0.0-beta.zip"
+STABLE_PACKAGE = "chatgpt-extension-v1.0.0.zip"
+SOURCE_PACKAGE = "chatgpt-extension-v1.0.0-source.zip"
+
+# Files in the beta package
+BETA_FILES = [
+    # Core extension files
+    "manifest.json",
+    "popup.html",
+    "background.js",
+    "content_script.js",
+
+    # Source files
+    "src/index.ts",
+    "src/google-buddy-client.ts",
+
+    # Domain layer
+    "src/domain/index.ts",
+    "src/domain/entities/google-search.ts",
+    "src/domain/entities/search-result.ts",
+    "src/domain/value-objects/search-query.ts",
+    "src/domain/events/index.ts",
+    "src/domain/events/search-requested.event.ts",
+    "src/domain/events/search-completed.event.ts",
+    "src/domain/events/search-failed.event.ts",
+    "src/domain/events/result-clicked.event.ts",
+
+    # Application layer
+    "src/application/index.ts",
+    "src/application/google-application.ts",
+
+    # Infrastructure layer
+    "src/infrastructure/index.ts",
+    "src/infrastructure/adapters/google-search-adapter.ts",
+    "src/infrastructure/adapters/google-communication-adapter.ts",
+
+    # Configuration files
+    "package.json",
+    "tsconfig.json",
+
+    # Documentation
+    "README.org",
+    "TEST_PLAN_GOOGLE_IMAGES.md",
+    "TEST_REPORT_GOOGLE_IMAGES.md",
+]
+
+# Directories in the beta package
+BETA_DIRECTORIES = [
+    "dist",  # Compiled JavaScript files
+    "icons", # Extension icons
+]
+
+# Files and directories in the stable package
+STABLE_ITEMS = [
+    "manifest.json",
+    "package.json",
+    "src/",
+    "dist/",
+    "README.org",
+    "tsconfig.json",
+]
+
+
+def beta_files(source_dir):
+    """Members of the beta package that exist under source_dir"""
+    source_dir = Path(source_dir)
+    files = [name for name in BETA_FILES if (source_dir / name).exists()]
+    for dir_path in BETA_DIRECTORIES:
+        files += scan_tree(source_dir, dir_path)
+    return files
+
+
+def _stable_member(rel_path):
+    # Skip test files and Python scripts
+    name = rel_path.rsplit("/", 1)[-1]
+    return not any(skip in name for skip in [".test.", ".spec.", ".py"])
+
+
+def stable_matcher():
+    """stable_files() as a PathMatcher, for trees that are not on disk"""
+    include = ["/" + item for item in STABLE_ITEMS]
+    return PathMatcher(["*.test.*", "*.spec.*", "*.py*"], include=include)
+
+
+def stable_files(source_dir):
+    """Members of the stable package: the extension without tests or scripts"""
+    source_dir = Path(source_dir)
+    files = []
+    for item in STABLE_ITEMS:
+        item_path = source_dir / item
+        if item_path.is_file():
+            files.append(item)
+        elif item_path.is_dir():
+            files += scan_tree(source_dir, item, select=_stable_member)
+
+    # Add any additional TypeScript files from src (duplicates are skipped)
+    files += scan_tree(source_dir, "src", select=lambda f: (
+        f.endswith(".ts") and not any(skip in f for skip in [".test.", ".spec."])
+    ))
+    return files
+
+
+def source_files(source_dir):
+    """Members of the source bundle: configs, TypeScript sources, tests and docs"""
+    source_dir = Path(source_dir)
+    files = []
+
+    # Add manifest.json, package.json and tsconfig.json
+    for name in ["manifest.json", "package.json", "tsconfig.json"]:
+        if (source_dir / name).exists():
+            files.append(name)
+
+    # Add all TypeScript files from src/ and the test files
+    files += scan_tree(source_dir, "src", select=lambda f: f.endswith(".ts"))
+    files += scan_tree(source_dir, "tests", select=lambda f: f.endswith(".ts"))
+
+    # Add README and markdown files
+    for pattern in ["README*", "*.md"]:
+        for doc_file in source_dir.glob(pattern):
+            if doc_file.is_file():
+                files.append(doc_file.name)
+
+    # Add playwright config
+    if (source_dir / "playwright.config.ts").exists():
+        files.append("playwright.config.ts")
+    return files
+
+
+def release_targets(source_dir, output_dir=None):
+    """Beta, stable and source-bundle targets for one build_packages() run"""
+    output_dir = Path(source_dir if output_dir is None else output_dir)
+    return [
+        PackageTarget(output_dir / BETA_PACKAGE, beta_files(source_dir), deterministic=True),
+        PackageTarget(output_dir / STABLE_PACKAGE, stable_files(source_dir), deterministic=True),
+        PackageTarget(output_dir / SOURCE_PACKAGE, source_files(source_dir)),
+    ]
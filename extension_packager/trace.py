@@ -0,0 +1,331 @@
+"""
+Stage tracing for the packaging pipeline
+
+While a Tracer is active (see tracing()), the walker and the engine record a
+span for every stage they run: walk, filter, read, compress, write and
+finish. Each span records its wall time, bytes in and out, and the process's
+resident set size when it ended and how much it grew while the span ran;
+ru_maxrss only ever rises, so it cannot tell stages apart. Worker processes trace their own spans and hand them
+back with their results. Spans are written in Chrome's trace-event format,
+which chrome://tracing and Perfetto can open. With no tracer active, span()
+returns a shared no-op object, so untraced builds pay only a function call
+per stage.
+"""
+
+import io
+import json
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+_active = None
+
+
+def peak_rss():
+    """Peak resident set size of this process in bytes, or 0 when unknown"""
+    if resource is None:
+        return 0
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+def current_rss():
+    """Resident set size of this process right now in bytes, or 0 when unknown"""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        pass
+    try:
+        import psutil
+    except ImportError:
+        return 0
+    return psutil.Process().memory_info().rss
+
+
+class Span:
+    """A running stage; set bytes_in, bytes_out or args before it ends"""
+
+    traced = True
+
+    def __init__(self, tracer, name, args):
+        self.tracer = tracer
+        self.name = name
+        self.args = args
+        self.bytes_in = 0
+        self.bytes_out = 0
+
+    def __enter__(self):
+        self.rss_start = current_rss()
+        self.start = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.tracer.record(self.name, self.start, time.perf_counter_ns(),
+                           self.bytes_in, self.bytes_out, self.args, self.rss_start)
+
+
+class _NullSpan:
+    traced = False
+    bytes_in = 0
+    bytes_out = 0
+
+    @property
+    def args(self):
+        return {}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        pass
+
+    def __setattr__(self, name, value):
+        pass
+
+
+_NULL_SPAN = _NullSpan()
+
+
+@dataclass
+class StageStats:
+    """Totals for every span of one stage"""
+
+    name: str
+    count: int = 0
+    seconds: float = 0.0
+    bytes_in: int = 0
+    bytes_out: int = 0
+    # Largest growth of the process's RSS during one span of the stage
+    rss_growth: int = 0
+
+
+class Tracer:
+    """Collects spans as Chrome trace events
+
+    With `profile` set, profiled() sections also run under cProfile and
+    tracemalloc.
+    """
+
+    def __init__(self, profile=False):
+        self.events = []
+        self.profile = profile
+        self.profiles = {}
+        self.pid = os.getpid()
+
+    def span(self, name, **args):
+        return Span(self, name, args)
+
+    def record(self, name, start_ns, end_ns, bytes_in=0, bytes_out=0, args=None, rss_start=None):
+        """Add a finished span; times are time.perf_counter_ns() values
+
+        `rss_start` is current_rss() when the span began, if it was taken.
+        """
+        rss = current_rss()
+        event_args = dict(args or ())
+        event_args.update(bytes_in=bytes_in, bytes_out=bytes_out, rss=rss,
+                          rss_growth=0 if rss_start is None else max(0, rss - rss_start))
+        self.events.append({
+            "name": name,
+            "cat": "packaging",
+            "ph": "X",
+            "ts": start_ns / 1000,
+            "dur": (end_ns - start_ns) / 1000,
+            "pid": self.pid,
+            "tid": threading.get_native_id(),
+            "args": event_args,
+        })
+
+    def merge(self, events):
+        """Add spans traced in another process"""
+        self.events.extend(events)
+
+    def stages(self):
+        """StageStats per stage name, in order of first appearance"""
+        stages = {}
+        for event in self.events:
+            stats = stages.get(event["name"])
+            if stats is None:
+                stats = stages[event["name"]] = StageStats(event["name"])
+            args = event["args"]
+            stats.count += 1
+            stats.seconds += event["dur"] / 1e6
+            stats.bytes_in += args["bytes_in"]
+            stats.bytes_out += args["bytes_out"]
+            stats.rss_growth = max(stats.rss_growth, args["rss_growth"])
+        return stages
+
+    def wall_time(self):
+        if not self.events:
+            return 0.0
+        start = min(event["ts"] for event in self.events)
+        end = max(event["ts"] + event["dur"] for event in self.events)
+        return (end - start) / 1e6
+
+    def summary(self):
+        """One line with time, bytes and RSS growth per stage
+
+        A stage's growth is shown when one of its spans grew the process by
+        a megabyte or more; the line ends with the process's peak RSS.
+        """
+        parts = []
+        for stats in self.stages().values():
+            part = f"{stats.name} {stats.seconds * 1000:.0f}ms"
+            if stats.bytes_in and stats.bytes_out and stats.bytes_in != stats.bytes_out:
+                part += f" {_size(stats.bytes_in)}→{_size(stats.bytes_out)}"
+            elif stats.bytes_in or stats.bytes_out:
+                part += f" {_size(stats.bytes_in or stats.bytes_out)}"
+            if stats.rss_growth >= 1024 * 1024:
+                part += f" +{_size(stats.rss_growth)} RSS"
+            parts.append(part)
+        parts.append(f"wall {self.wall_time() * 1000:.0f}ms")
+        # Workers report their RSS with their spans; this process's peak is its own
+        peak = max([peak_rss()] + [event["args"]["rss"] for event in self.events])
+        if peak:
+            parts.append(f"process peak RSS {_size(peak)}")
+        return " | ".join(parts)
+
+    def write(self, path):
+        """Write the spans as a Chrome trace-event JSON file"""
+        events = list(self.events)
+        origin = min((event["ts"] for event in events), default=0)
+        for index, event in enumerate(events):
+            events[index] = dict(event, ts=event["ts"] - origin)
+        for pid in sorted({event["pid"] for event in events}):
+            events.append({
+                "name": "process_name", "ph": "M", "pid": pid,
+                "args": {"name": "packager" if pid == self.pid else f"worker {pid}"},
+            })
+        with open(path, "w") as f:
+            json.dump({
+                "traceEvents": events,
+                "displayTimeUnit": "ms",
+                "otherData": {"summary": self.summary()},
+            }, f)
+
+    def write_profiles(self, prefix, limit=15):
+        """Write each profiled() section's cProfile stats and allocation report
+
+        Files are <prefix>.<section>.prof (readable with pstats or
+        snakeviz) and <prefix>.<section>.alloc.txt. Returns the paths.
+        """
+        import pstats
+
+        paths = []
+        for section, (profiler, snapshot) in self.profiles.items():
+            base = f"{prefix}.{section.replace(' ', '-')}"
+            profiler.dump_stats(base + ".prof")
+            report = io.StringIO()
+            pstats.Stats(profiler, stream=report).sort_stats("cumulative").print_stats(limit)
+            report.write(f"\nTop {limit} allocation sites (tracemalloc)\n")
+            for stat in snapshot.statistics("lineno")[:limit]:
+                report.write(f"{stat}\n")
+            with open(base + ".alloc.txt", "w") as f:
+                f.write(report.getvalue())
+            paths += [base + ".prof", base + ".alloc.txt"]
+        return paths
+
+
+def save_trace(tracer, trace_path):
+    """Write the trace (and any profiles) next to trace_path and print the summary line"""
+    trace_path = str(trace_path)
+    tracer.write(trace_path)
+    print(f"\n⏱️  {tracer.summary()}")
+    print(f"🧭 Trace: {trace_path} (open in chrome://tracing or ui.perfetto.dev)")
+    prefix = trace_path[:-len(".trace.json")] if trace_path.endswith(".trace.json") else trace_path
+    for path in tracer.write_profiles(prefix):
+        print(f"🔬 Profile: {path}")
+
+
+def _size(n):
+    for unit in ("B", "KB", "MB"):
+        if n < 1024:
+            return f"{n:.0f}{unit}" if unit == "B" else f"{n:.1f}{unit}"
+        n /= 1024
+    return f"{n:.1f}GB"
+
+
+@contextmanager
+def tracing(tracer):
+    """Make tracer the active tracer for the duration of a block"""
+    global _active
+    previous = _active
+    _active = tracer
+    try:
+        yield tracer
+    finally:
+        _active = previous
+
+
+def active():
+    """The active Tracer, or None"""
+    return _active
+
+
+def span(name, **args):
+    """Span for a stage on the active tracer, or a no-op span"""
+    if _active is None:
+        return _NULL_SPAN
+    return Span(_active, name, args)
+
+
+@contextmanager
+def profiled(section):
+    """Run a block under cProfile and tracemalloc when the tracer profiles
+
+    Only this process is profiled; worker processes still report spans.
+    """
+    tracer = _active
+    if tracer is None or not tracer.profile:
+        yield
+        return
+    # Profiling is rare; untraced runs should not import the profilers
+    import cProfile
+    import tracemalloc
+
+    started_tracemalloc = not tracemalloc.is_tracing()
+    if started_tracemalloc:
+        tracemalloc.start()
+    profiler = cProfile.Profile()
+    profiler.enable()
+    try:
+        yield
+    finally:
+        profiler.disable()
+        snapshot = tracemalloc.take_snapshot()
+        if started_tracemalloc:
+            tracemalloc.stop()
+        tracer.profiles[section] = (profiler, snapshot)
+
+
+class TimedSelect:
+    """Wrap a scan_tree() select callable to total the time spent in it"""
+
+    def __init__(self, select):
+        self.select = select
+        self.elapsed_ns = 0
+        self.calls = 0
+        if hasattr(select, "prunes"):
+            self.prunes = self._timed(select.prunes)
+        self._call = self._timed(select)
+
+    def _timed(self, function):
+        def timed(rel_path):
+            start = time.perf_counter_ns()
+            try:
+                return function(rel_path)
+            finally:
+                self.elapsed_ns += time.perf_counter_ns() - start
+                self.calls += 1
+        return timed
+
+    def __call__(self, rel_path):
+        return self._call(rel_path)
@@ -0,0 +1,91 @@
+"""
+Browser variants of one extension, packaged in a single pass
+
+Chrome, Edge and Firefox take the same files but not quite the same
+manifest.json: Firefox runs background scripts instead of a service worker,
+needs a gecko id and rejects Chrome-only keys. variant_targets() gives one
+PackageTarget per browser whose only difference is a manifest transform,
+so build_packages() compresses every other member once and copies it into
+each archive. A transform that changes nothing leaves the manifest's bytes
+as they are, and browsers whose manifests come out identical share it too.
+"""
+
+import json
+from pathlib import Path
+
+from .engine import PackageTarget
+from .reachability import MANIFEST
+
+BROWSERS = ("chrome", "edge", "firefox")
+# Keys only the Chrome Web Store and Chrome's updater understand
+CHROME_ONLY_KEYS = ("update_url", "key", "minimum_chrome_version")
+
+
+def _chrome(manifest, options):
+    return manifest
+
+
+def _edge(manifest, options):
+    # Edge Add-ons hosts its own updates
+    manifest.pop("update_url", None)
+    return manifest
+
+
+def _firefox(manifest, options):
+    for key in CHROME_ONLY_KEYS:
+        manifest.pop(key, None)
+    background = manifest.get("background") or {}
+    if "service_worker" in background:
+        # Firefox runs extension background scripts on an event page
+        background = dict(background)
+        background["scripts"] = [background.pop("service_worker")]
+        manifest["background"] = background
+    gecko_id = options.get("gecko_id")
+    if gecko_id:
+        settings = manifest.setdefault("browser_specific_settings", {})
+        settings.setdefault("gecko", {})["id"] = gecko_id
+    return manifest
+
+
+_TRANSFORMS = {"chrome": _chrome, "edge": _edge, "firefox": _firefox}
+
+
+def transform_manifest(browser, data, **options):
+    """manifest.json bytes for one browser
+
+    Returns `data` itself when nothing changes; a minified manifest stays
+    minified. `gecko_id` sets the Firefox add-on id.
+    """
+    try:
+        transform = _TRANSFORMS[browser]
+    except KeyError:
+        raise ValueError(f"unknown browser: {browser} (choose from {', '.join(BROWSERS)})") from None
+    original = json.loads(data)
+    manifest = transform(json.loads(data), options)
+    if manifest == original:
+        return data
+    if b"\n" in data.strip():
+        return (json.dumps(manifest, indent=2, ensure_ascii=False) + "\n").encode("utf-8")
+    return json.dumps(manifest, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def variant_path(package_path, browser):
+    """<package>-<browser>.zip beside package_path"""
+    package_path = Path(package_path)
+    return package_path.with_name(f"{package_path.stem}-{browser}{package_path.suffix}")
+
+
+def variant_targets(package_path, browsers=BROWSERS, files=None, select=None,
+                    deterministic=False, **options):
+    """One PackageTarget per browser, differing only in manifest.json
+
+    `files` and `select` are as for build_package(); `options` are passed
+    to transform_manifest().
+    """
+    return [
+        PackageTarget(
+            variant_path(package_path, browser), files, select, deterministic,
+            transforms={MANIFEST: lambda data, browser=browser: transform_manifest(browser, data, **options)},
+        )
+        for browser in browsers
+    ]
@@ -0,0 +1,247 @@
+"""
+Package checks and diffs from the central directory alone
+
+verify_package() and diff_packages() read the end-of-central-directory
+record and the central directory, plus manifest.json when its references
+are checked. Member data is only read for the optional CRC check, which
+inflates members on a thread pool (zlib releases the GIL). An archive that
+is truncated or is not a ZIP at all fails before anything else is read.
+"""
+
+import json
+import os
+import posixpath
+import zlib
+from dataclasses import dataclass, field
+from pathlib import Path
+
+from . import trace
+from .matcher import PathMatcher
+from .reachability import MANIFEST, _manifest_references
+from .zipformat import (
+    CHUNK_SIZE,
+    DEFLATED,
+    STORED,
+    iter_region,
+    raw_member_region,
+    read_central_directory,
+    read_raw_member,
+)
+
+
+@dataclass
+class VerifyReport:
+    """Outcome of verify_package(); the package is fine when `errors` is empty"""
+
+    package_path: Path
+    size: int = 0
+    members: list = field(default_factory=list)
+    errors: list = field(default_factory=list)
+    # Manifest references that name no member
+    missing: list = field(default_factory=list)
+    crc_checked: int = 0
+
+    @property
+    def ok(self):
+        return not self.errors and not self.missing
+
+
+@dataclass
+class MemberChange:
+    """A member present in both packages whose CRC or size differs"""
+
+    name: str
+    old_crc: int
+    new_crc: int
+    old_size: int
+    new_size: int
+
+
+@dataclass
+class PackageDiff:
+    """Outcome of diff_packages()"""
+
+    added: list = field(default_factory=list)
+    removed: list = field(default_factory=list)
+    changed: list = field(default_factory=list)
+    unchanged: int = 0
+    old_size: int = 0
+    new_size: int = 0
+
+    @property
+    def identical(self):
+        return not (self.added or self.removed or self.changed)
+
+
+def read_members(package_path):
+    """(members, archive size) from the central directory of a package
+
+    Raises ValueError naming the package when it is not a readable ZIP.
+    """
+    package_path = Path(package_path)
+    with open(package_path, "rb") as fp:
+        size = os.fstat(fp.fileno()).st_size
+        try:
+            return read_central_directory(fp), size
+        except (ValueError, OSError) as e:
+            raise ValueError(f"{package_path.name} ({size:,} bytes) is not a valid package: {e}") from None
+
+
+def _layout_errors(members, size):
+    """Problems visible in the central directory itself"""
+    errors = []
+    seen = set()
+    for member in members:
+        if member.name in seen:
+            errors.append(f"{member.name}: duplicate member")
+        seen.add(member.name)
+        if member.method not in (STORED, DEFLATED):
+            errors.append(f"{member.name}: unsupported compression method {member.method}")
+        if member.method == STORED and member.compressed_size != member.file_size:
+            errors.append(f"{member.name}: stored member with mismatched sizes")
+        if member.header_offset + member.compressed_size > size:
+            errors.append(f"{member.name}: data runs past the end of the archive")
+    return errors
+
+
+def _missing_references(package_path, members):
+    """Files manifest.json references that are not in the package"""
+    names = {member.name for member in members}
+    manifest = next(member for member in members if member.name == MANIFEST)
+    with open(package_path, "rb") as fp:
+        payload = read_raw_member(fp, manifest)
+    data = payload if manifest.method == STORED else zlib.decompress(payload, -15)
+    paths, globs = _manifest_references(json.loads(data))
+
+    missing = []
+    for reference in paths:
+        reference = reference.split("#", 1)[0].split("?", 1)[0]
+        path = posixpath.normpath(reference.lstrip("/"))
+        if path not in names:
+            missing.append(reference)
+    for glob in globs:
+        matcher = PathMatcher(include=[glob])
+        if not any(matcher(name) for name in names):
+            missing.append(glob)
+    return missing
+
+
+def _check_crc(package_path, member):
+    """Inflate one member and compare its CRC and size; returns an error or None"""
+    try:
+        with open(package_path, "rb") as fp:
+            region = raw_member_region(fp, member)
+        crc = 0
+        size = 0
+        inflater = zlib.decompressobj(-15) if member.method == DEFLATED else None
+        for chunk in iter_region(region, CHUNK_SIZE):
+            if inflater is not None:
+                chunk = inflater.decompress(chunk)
+            crc = zlib.crc32(chunk, crc)
+            size += len(chunk)
+        if inflater is not None:
+            tail = inflater.flush()
+            crc = zlib.crc32(tail, crc)
+            size += len(tail)
+    except (ValueError, OSError, zlib.error) as e:
+        return f"{member.name}: {e}"
+    if size != member.file_size:
+        return f"{member.name}: inflates to {size:,} bytes, expected {member.file_size:,}"
+    if crc != member.crc:
+        return f"{member.name}: CRC {crc:08x}, expected {member.crc:08x}"
+    return None
+
+
+def verify_package(package_path, check_crc=False, jobs=None, references=True):
+    """Check a package from its central directory
+
+    With `references`, every file manifest.json names must be a member.
+    With `check_crc`, every member is inflated on `jobs` threads (default:
+    one per core) and its CRC and size compared with the central directory.
+    """
+    package_path = Path(package_path)
+    report = VerifyReport(package_path)
+    with trace.span("verify", package=package_path.name) as span:
+        try:
+            report.members, report.size = read_members(package_path)
+        except ValueError as e:
+            report.errors.append(str(e))
+            return report
+        span.bytes_in = report.size
+        report.errors += _layout_errors(report.members, report.size)
+
+        if references:
+            if any(member.name == MANIFEST for member in report.members):
+                try:
+                    report.missing = _missing_references(package_path, report.members)
+                except (ValueError, OSError, zlib.error) as e:
+                    report.errors.append(f"{MANIFEST}: {e}")
+            else:
+                report.errors.append(f"{MANIFEST} is not in the package")
+
+        if check_crc and report.members:
+            from concurrent.futures import ThreadPoolExecutor
+
+            workers = jobs or os.cpu_count() or 1
+            with ThreadPoolExecutor(max_workers=min(workers, len(report.members))) as pool:
+                for error in pool.map(lambda member: _check_crc(package_path, member),
+                                      report.members):
+                    if error:
+                        report.errors.append(error)
+            report.crc_checked = len(report.members)
+            span.args["crc_checked"] = report.crc_checked
+    return report
+
+
+def diff_packages(old_path, new_path):
+    """Members added, removed and changed (by CRC and size) between two packages"""
+    with trace.span("diff", old=Path(old_path).name, new=Path(new_path).name):
+        old_members, old_size = read_members(old_path)
+        new_members, new_size = read_members(new_path)
+    old = {member.name: member for member in old_members}
+    new = {member.name: member for member in new_members}
+
+    diff = PackageDiff(old_size=old_size, new_size=new_size)
+    for name, member in new.items():
+        previous = old.get(name)
+        if previous is None:
+            diff.added.append(member)
+        elif previous.crc != member.crc or previous.file_size != member.file_size:
+            diff.changed.append(MemberChange(
+                name, previous.crc, member.crc, previous.file_size, member.file_size,
+            ))
+        else:
+            diff.unchanged += 1
+    diff.removed = [member for name, member in old.items() if name not in new]
+    return diff
+
+
+def print_verify_report(report):
+    """Print the usual verification summary"""
+    name = report.package_path.name
+    if report.members:
+        crc = f", {report.crc_checked} CRCs checked" if report.crc_checked else ""
+        print(f"🔍 {name}: {len(report.members)} members, {report.size:,} bytes{crc}")
+    for error in report.errors:
+        print(f"  ❌ {error}")
+    for reference in report.missing:
+        print(f"  ⚠️  {MANIFEST} references missing file: {reference}")
+    if report.ok:
+        print(f"  ✅ {name} is valid")
+
+
+def print_diff(diff, limit=None):
+    """Print added, removed and changed members"""
+    print(f"  ✅ Unchanged: {diff.unchanged} files")
+    print(f"  ✏️  Changed: {len(diff.changed)} files")
+    for change in diff.changed[:limit]:
+        delta = change.new_size - change.old_size
+        print(f"     • {change.name} ({change.old_size:,} → {change.new_size:,} bytes, {delta:+,})")
+    print(f"  ➕ Added: {len(diff.added)} files")
+    for member in diff.added[:limit]:
+        print(f"     • {member.name} ({member.file_size:,} bytes)")
+    print(f"  ➖ Removed: {len(diff.removed)} files")
+    for member in diff.removed[:limit]:
+        print(f"     • {member.name} ({member.file_size:,} bytes)")
+    print(f"\n📏 Archive: {diff.old_size:,} → {diff.new_size:,} bytes "
+          f"({diff.new_size - diff.old_size:+,})")
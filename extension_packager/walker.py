@@ -0,0 +1,78 @@
+"""
+Single-pass tree walker shared by all packagers
+
+Built on os.scandir: every directory is read once, the entry type comes
+from the directory listing, and the one stat() per selected file is kept
+on the returned FileEntry so nothing downstream has to stat it again.
+"""
+
+import os
+from typing import NamedTuple
+
+from . import trace
+
+
+class FileEntry(NamedTuple):
+    """A regular file found by scan_tree()"""
+
+    path: str
+    fs_path: str
+    size: int
+    mtime: float
+    mode: int
+
+
+def scan_tree(source_dir, subdir="", select=None):
+    """List files under source_dir/subdir with their size, mtime and mode
+
+    Paths are POSIX and relative to source_dir, in os.walk() order. `select`
+    filters relative paths before they are stat()ed; when it is a
+    PathMatcher, excluded directories are pruned before they are read.
+    """
+    with trace.span("walk", subdir=os.fspath(subdir)) as span:
+        if not span.traced or select is None:
+            entries = _scan(source_dir, subdir, select)
+        else:
+            # Time spent deciding what to keep is reported as its own stage
+            timed = trace.TimedSelect(select)
+            entries = _scan(source_dir, subdir, timed)
+            span.tracer.record("filter", span.start, span.start + timed.elapsed_ns,
+                               args={"calls": timed.calls})
+        span.args["files"] = len(entries)
+    return entries
+
+
+def _scan(source_dir, subdir, select):
+    root = os.fspath(source_dir)
+    prunes = getattr(select, "prunes", None)
+    entries = []
+    stack = [os.fspath(subdir).strip("/")]
+    while stack:
+        rel_dir = stack.pop()
+        prefix = rel_dir + "/" if rel_dir else ""
+        try:
+            iterator = os.scandir(os.path.join(root, rel_dir))
+        except (FileNotFoundError, NotADirectoryError):
+            continue
+
+        subdirs = []
+        with iterator:
+            for entry in iterator:
+                rel_path = prefix + entry.name
+                if entry.is_dir(follow_symlinks=False):
+                    if prunes is None or not prunes(rel_path):
+                        subdirs.append(rel_path)
+                elif entry.is_file():
+                    if select is None or select(rel_path):
+                        st = entry.stat()
+                        entries.append(FileEntry(
+                            rel_path, entry.path, st.st_size,
+                            st.st_mtime, st.st_mode,
+                        ))
+        stack.extend(reversed(subdirs))
+    return entries
+
+
+def walk_files(source_dir, subdir="", select=None):
+    """List files under source_dir/subdir as POSIX paths relative to source_dir"""
+    return [entry.path for entry in scan_tree(source_dir, subdir, select)]
@@ -0,0 +1,105 @@
+"""
+Watch mode that keeps a package current while its files change
+
+The tree is polled with scan_tree(), which costs a few milliseconds for a
+build directory, so no file-notification dependency is needed. Changes are
+debounced until the tree has been quiet for a moment, then only the changed
+members are appended to the archive with update_package().
+"""
+
+import time
+from pathlib import Path
+
+from .engine import build_package, update_package
+from .walker import scan_tree
+
+DEFAULT_DEBOUNCE = 0.2
+DEFAULT_INTERVAL = 0.1
+
+
+def _snapshot(source_dir, select):
+    return {entry.path: entry for entry in scan_tree(source_dir, select=select)}
+
+
+def _changes(before, after):
+    """(changed FileEntry objects, removed paths) between two snapshots"""
+    changed = []
+    for rel_path, entry in after.items():
+        old = before.get(rel_path)
+        if old is None or (old.size, old.mtime) != (entry.size, entry.mtime):
+            changed.append(entry)
+    removed = [rel_path for rel_path in before if rel_path not in after]
+    return changed, removed
+
+
+def _is_source(source_dir, path):
+    """True when path is a file under source_dir"""
+    if path is None:
+        return False
+    return Path(path).resolve().is_relative_to(Path(source_dir).resolve())
+
+
+def watch_package(source_dir, package_path, select=None, debounce=DEFAULT_DEBOUNCE,
+                  interval=DEFAULT_INTERVAL, compresslevel=None, cache=True,
+                  on_update=None, stop=None, compression=None, deterministic=False):
+    """Keep package_path up to date with source_dir until interrupted
+
+    The package is first brought up to date with build_package(). After
+    that, every `interval` seconds the tree is rescanned; once nothing has
+    changed for `debounce` seconds the pending changes are applied and
+    on_update(result, changed, removed, seconds) is called. `stop` is an
+    optional callable checked on every poll. `deterministic` is as for
+    build_package(). A source deleted mid-update is picked up by the next
+    scan; a deleted package is rebuilt in full.
+    """
+    snapshot = _snapshot(source_dir, select)
+    result = build_package(source_dir, package_path, files=list(snapshot.values()),
+                           compresslevel=compresslevel, cache=cache,
+                           compression=compression, deterministic=deterministic)
+    if on_update is not None:
+        on_update(result, list(snapshot), [], None)
+
+    pending = {}
+    pending_removed = set()
+    last_change = None
+    while stop is None or not stop():
+        time.sleep(interval)
+        current = _snapshot(source_dir, select)
+        changed, removed = _changes(snapshot, current)
+        snapshot = current
+        if changed or removed:
+            for entry in changed:
+                pending[entry.path] = entry
+                pending_removed.discard(entry.path)
+            for rel_path in removed:
+                pending.pop(rel_path, None)
+                pending_removed.add(rel_path)
+            last_change = time.monotonic()
+            continue
+        if last_change is None or time.monotonic() - last_change < debounce:
+            continue
+
+        start = time.perf_counter()
+        try:
+            result = update_package(source_dir, package_path, list(pending.values()),
+                                    pending_removed, compresslevel=compresslevel,
+                                    cache=cache, compression=compression,
+                                    deterministic=deterministic)
+        except FileNotFoundError as e:
+            if Path(package_path).exists():
+                if not _is_source(source_dir, e.filename):
+                    raise
+                # Deleted while updating; the next scan reports the removal
+                last_change = time.monotonic()
+                continue
+            # The package itself is gone: build it again, which raises when
+            # its directory went with it
+            result = build_package(source_dir, package_path, files=list(snapshot.values()),
+                                   compresslevel=compresslevel, cache=cache,
+                                   compression=compression, deterministic=deterministic)
+        elapsed = time.perf_counter() - start
+        if on_update is not None:
+            on_update(result, sorted(pending), sorted(pending_removed), elapsed)
+        pending = {}
+        pending_removed = set()
+        last_change = None
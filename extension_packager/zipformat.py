@@ -0,0 +1,440 @@
+"""
+Low-level ZIP container reading and writing
+
+Members are written from already-compressed bytes so the engine can reuse
+compressed data from a previous archive instead of deflating it again, or
+streamed through the compressor in fixed-size chunks with a trailing data
+descriptor. Zip64 records are added automatically once sizes, offsets or
+the member count outgrow the classic format.
+"""
+
+import hashlib
+import struct
+import time
+import zlib
+from dataclasses import dataclass
+from typing import NamedTuple
+
+STORED = 0
+DEFLATED = 8
+
+# Same layouts as the private structs in the standard zipfile module
+LOCAL_HEADER = struct.Struct("<4s2B4HL2L2H")
+CENTRAL_HEADER = struct.Struct("<4s4B4HL2L5H2L")
+END_RECORD = struct.Struct("<4s4H2LH")
+ZIP64_END_RECORD = struct.Struct("<4sQ2H2L4Q")
+ZIP64_LOCATOR = struct.Struct("<4sLQL")
+DATA_DESCRIPTOR = struct.Struct("<4sLLL")
+ZIP64_DATA_DESCRIPTOR = struct.Struct("<4sLQQ")
+
+LOCAL_SIGNATURE = b"PK\x03\x04"
+CENTRAL_SIGNATURE = b"PK\x01\x02"
+END_SIGNATURE = b"PK\x05\x06"
+ZIP64_END_SIGNATURE = b"PK\x06\x06"
+ZIP64_LOCATOR_SIGNATURE = b"PK\x06\x07"
+DESCRIPTOR_SIGNATURE = b"PK\x07\x08"
+
+VERSION = 20
+ZIP64_VERSION = 45
+UNIX_SYSTEM = 3
+UTF8_FLAG = 0x800
+DESCRIPTOR_FLAG = 0x08
+ZIP64_EXTRA = 0x0001
+
+# Same thresholds as zipfile: beyond these, Zip64 records are written
+ZIP64_LIMIT = (1 << 31) - 1
+ZIP_FILECOUNT_LIMIT = (1 << 16) - 1
+
+# Read and copy granularity for streamed members
+CHUNK_SIZE = 1 << 20
+
+# Timestamp and default level used for reproducible archives
+DETERMINISTIC_DATE_TIME = (1980, 1, 1, 0, 0, 0)
+DETERMINISTIC_COMPRESSLEVEL = 6
+
+
+@dataclass
+class ZipMember:
+    """A single archive member as described by its central directory record"""
+
+    name: str
+    method: int
+    crc: int
+    compressed_size: int
+    file_size: int
+    date_time: tuple
+    external_attr: int = 0o100644 << 16
+    header_offset: int = 0
+    flag_bits: int = 0
+
+
+class FileRegion(NamedTuple):
+    """A byte range of a file holding a compressed payload"""
+
+    path: str
+    offset: int
+    length: int
+
+
+def iter_region(region, chunk_size=CHUNK_SIZE):
+    """Yield the bytes of a FileRegion in chunks"""
+    with open(region.path, "rb") as f:
+        f.seek(region.offset)
+        remaining = region.length
+        while remaining:
+            chunk = f.read(min(chunk_size, remaining))
+            if not chunk:
+                raise ValueError(f"Truncated data in {region.path}")
+            remaining -= len(chunk)
+            yield chunk
+
+
+def dos_date_time(mtime):
+    """Convert a POSIX timestamp into a ZIP (DOS) date_time tuple"""
+    date_time = time.localtime(mtime)[:6]
+    if date_time[0] < 1980:
+        return (1980, 1, 1, 0, 0, 0)
+    if date_time[0] > 2107:
+        return (2107, 12, 31, 23, 59, 59)
+    return date_time
+
+
+def normalized_attr(mode):
+    """External attributes for a regular file with only the exec bit kept"""
+    permissions = 0o755 if mode & 0o111 else 0o644
+    return (0o100000 | permissions) << 16
+
+
+def _pack_date_time(date_time):
+    year, month, day, hour, minute, second = date_time
+    dos_date = (year - 1980) << 9 | month << 5 | day
+    dos_time = hour << 11 | minute << 5 | (second // 2)
+    return dos_date, dos_time
+
+
+def _unpack_date_time(dos_date, dos_time):
+    return (
+        (dos_date >> 9) + 1980,
+        (dos_date >> 5) & 0xF,
+        dos_date & 0x1F,
+        dos_time >> 11,
+        (dos_time >> 5) & 0x3F,
+        (dos_time & 0x1F) * 2,
+    )
+
+
+def _encode_name(name):
+    try:
+        return name.encode("ascii"), 0
+    except UnicodeEncodeError:
+        return name.encode("utf-8"), UTF8_FLAG
+
+
+def compress_bytes(data, compresslevel=None):
+    """Raw-deflate data exactly the way zipfile does for ZIP_DEFLATED"""
+    level = -1 if compresslevel is None else compresslevel
+    compressor = zlib.compressobj(level, zlib.DEFLATED, -15)
+    return compressor.compress(data) + compressor.flush()
+
+
+class ZipWriter:
+    """Append members to a binary file object
+
+    Payloads are either already compressed (add_raw) or deflated while they
+    are written (add_stream). Memory use does not depend on member sizes.
+    Every byte is hashed as it is written, so the archive's sha256 is known
+    the moment it is closed.
+    """
+
+    def __init__(self, fileobj):
+        self._fp = fileobj
+        self._offset = 0
+        self._sha256 = hashlib.sha256()
+        self.members = []
+
+    @property
+    def size(self):
+        """Bytes written so far; the archive size once closed"""
+        return self._offset
+
+    @property
+    def sha256(self):
+        """Hex sha256 of the bytes written, or None for an appended archive"""
+        return None if self._sha256 is None else self._sha256.hexdigest()
+
+    @classmethod
+    def append(cls, fileobj):
+        """Reopen an archive so members can be appended to it
+
+        New members and a new central directory go after the current end
+        of the file; close() then makes them the live archive. Replaced
+        members and the old central directory stay behind as dead space.
+        """
+        writer = cls(fileobj)
+        writer.members = read_central_directory(fileobj)
+        writer._offset = fileobj.seek(0, 2)
+        # The existing bytes were never seen, so there is no digest to extend
+        writer._sha256 = None
+        return writer
+
+    def remove(self, name):
+        """Drop a member from the central directory written by close()"""
+        self.members = [member for member in self.members if member.name != name]
+
+    def live_size(self):
+        """Approximate bytes reachable from the central directory"""
+        size = END_RECORD.size
+        for member in self.members:
+            name, _ = _encode_name(member.name)
+            size += LOCAL_HEADER.size + CENTRAL_HEADER.size + 2 * len(name)
+            size += member.compressed_size
+            if member.flag_bits & DESCRIPTOR_FLAG:
+                size += DATA_DESCRIPTOR.size
+        return size
+
+    def _write(self, data):
+        self._fp.write(data)
+        if self._sha256 is not None:
+            self._sha256.update(data)
+        self._offset += len(data)
+
+    def _write_local_header(self, member, zip64, sizes):
+        name, flags = _encode_name(member.name)
+        member.flag_bits |= flags
+        member.header_offset = self._offset
+        dos_date, dos_time = _pack_date_time(member.date_time)
+        crc, compressed_size, file_size = sizes
+        extra = b""
+        if zip64:
+            extra = struct.pack("<2H2Q", ZIP64_EXTRA, 16, file_size, compressed_size)
+            compressed_size = file_size = 0xFFFFFFFF
+        header = LOCAL_HEADER.pack(
+            LOCAL_SIGNATURE, ZIP64_VERSION if zip64 else VERSION, 0,
+            member.flag_bits, member.method, dos_time, dos_date, crc,
+            compressed_size, file_size, len(name), len(extra),
+        )
+        self._write(header)
+        self._write(name)
+        self._write(extra)
+        return self._offset
+
+    def _begin(self, member, descriptor):
+        """Write the local header; returns (payload offset, zip64)"""
+        if descriptor:
+            member.flag_bits = DESCRIPTOR_FLAG
+            zip64 = member.file_size * 1.05 > ZIP64_LIMIT
+            sizes = (0, 0, 0)
+        else:
+            member.flag_bits = 0
+            zip64 = member.file_size > ZIP64_LIMIT or member.compressed_size > ZIP64_LIMIT
+            sizes = (member.crc, member.compressed_size, member.file_size)
+        return self._write_local_header(member, zip64, sizes), zip64
+
+    def _end(self, member, zip64):
+        """Write the data descriptor of a member and record it"""
+        descriptor = ZIP64_DATA_DESCRIPTOR if zip64 else DATA_DESCRIPTOR
+        self._write(descriptor.pack(
+            DESCRIPTOR_SIGNATURE, member.crc, member.compressed_size, member.file_size,
+        ))
+
+    def add_raw(self, member, payload, descriptor=False):
+        """Write one member whose payload is already compressed
+
+        `payload` is bytes, a FileRegion, which is copied in chunks, or an
+        iterable of chunks adding up to member.compressed_size. With
+        `descriptor` the member is laid out exactly as add_stream() would
+        write it. Returns the archive offset of the payload.
+        """
+        data_offset, zip64 = self._begin(member, descriptor)
+        if isinstance(payload, (bytes, bytearray, memoryview)):
+            self._write(payload)
+        else:
+            chunks = iter_region(payload) if isinstance(payload, FileRegion) else payload
+            for chunk in chunks:
+                self._write(chunk)
+            if self._offset - data_offset != member.compressed_size:
+                raise ValueError(f"{member.name}: payload size does not match its header")
+        if descriptor:
+            self._end(member, zip64)
+        self.members.append(member)
+        return data_offset
+
+    def add_stream(self, member, chunks, compresslevel=None):
+        """Deflate an iterable of chunks into a member with a data descriptor
+
+        member.file_size is the expected size, used to decide up front
+        whether Zip64 sizes are needed; the CRC and real sizes are filled in
+        once the stream ends. Returns the archive offset of the payload.
+        """
+        member.method = DEFLATED
+        data_offset, zip64 = self._begin(member, True)
+
+        level = -1 if compresslevel is None else compresslevel
+        compressor = zlib.compressobj(level, zlib.DEFLATED, -15)
+        crc = 0
+        file_size = 0
+        for chunk in chunks:
+            crc = zlib.crc32(chunk, crc)
+            file_size += len(chunk)
+            self._write(compressor.compress(chunk))
+        self._write(compressor.flush())
+        compressed_size = self._offset - data_offset
+
+        if not zip64 and (file_size > ZIP64_LIMIT or compressed_size > ZIP64_LIMIT):
+            raise ValueError(f"{member.name} outgrew its expected size; Zip64 was not enabled")
+        member.crc = crc
+        member.file_size = file_size
+        member.compressed_size = compressed_size
+        self._end(member, zip64)
+        self.members.append(member)
+        return data_offset
+
+    def close(self):
+        """Write the central directory and end records"""
+        start = self._offset
+        for member in self.members:
+            name, _ = _encode_name(member.name)
+            dos_date, dos_time = _pack_date_time(member.date_time)
+            file_size = member.file_size
+            compressed_size = member.compressed_size
+            header_offset = member.header_offset
+            extra_fields = []
+            if file_size > ZIP64_LIMIT:
+                extra_fields.append(file_size)
+                file_size = 0xFFFFFFFF
+            if compressed_size > ZIP64_LIMIT:
+                extra_fields.append(compressed_size)
+                compressed_size = 0xFFFFFFFF
+            if header_offset > ZIP64_LIMIT:
+                extra_fields.append(header_offset)
+                header_offset = 0xFFFFFFFF
+            extra = b""
+            version = VERSION
+            if extra_fields:
+                extra = struct.pack(f"<2H{len(extra_fields)}Q", ZIP64_EXTRA,
+                                    8 * len(extra_fields), *extra_fields)
+                version = ZIP64_VERSION
+            record = CENTRAL_HEADER.pack(
+                CENTRAL_SIGNATURE, version, UNIX_SYSTEM, version, 0,
+                member.flag_bits, member.method, dos_time, dos_date,
+                member.crc, compressed_size, file_size,
+                len(name), len(extra), 0, 0, 0, member.external_attr,
+                header_offset,
+            )
+            self._write(record)
+            self._write(name)
+            self._write(extra)
+
+        count = len(self.members)
+        cd_size = self._offset - start
+        if count > ZIP_FILECOUNT_LIMIT or start > ZIP64_LIMIT or cd_size > ZIP64_LIMIT:
+            zip64_end = self._offset
+            self._write(ZIP64_END_RECORD.pack(
+                ZIP64_END_SIGNATURE, ZIP64_END_RECORD.size - 12,
+                ZIP64_VERSION, ZIP64_VERSION, 0, 0, count, count, cd_size, start,
+            ))
+            self._write(ZIP64_LOCATOR.pack(ZIP64_LOCATOR_SIGNATURE, 0, zip64_end, 1))
+        self._write(END_RECORD.pack(
+            END_SIGNATURE, 0, 0, min(count, 0xFFFF), min(count, 0xFFFF),
+            min(cd_size, 0xFFFFFFFF), min(start, 0xFFFFFFFF), 0,
+        ))
+
+
+def _zip64_values(extra, wanted):
+    """Read `wanted` 8-byte values from a Zip64 extended information field"""
+    offset = 0
+    while offset + 4 <= len(extra):
+        header_id, length = struct.unpack_from("<2H", extra, offset)
+        if header_id == ZIP64_EXTRA:
+            if length < 8 * wanted:
+                raise ValueError("Zip64 extra field is too short")
+            return struct.unpack_from(f"<{wanted}Q", extra, offset + 4)
+        offset += 4 + length
+    raise ValueError("Zip64 extra field not found")
+
+
+def read_end_record(fp):
+    """(member count, central directory size, central directory offset)"""
+    fp.seek(0, 2)
+    file_size = fp.tell()
+    tail_size = min(file_size, END_RECORD.size + 0xFFFF)
+    fp.seek(file_size - tail_size)
+    tail = fp.read(tail_size)
+
+    position = tail.rfind(END_SIGNATURE)
+    if position < 0 or position + END_RECORD.size > len(tail):
+        raise ValueError("End of central directory record not found")
+    (_, _, _, _, count, cd_size, cd_offset, _) = END_RECORD.unpack_from(tail, position)
+
+    locator = position - ZIP64_LOCATOR.size
+    if locator >= 0 and tail[locator:locator + 4] == ZIP64_LOCATOR_SIGNATURE:
+        zip64_end = ZIP64_LOCATOR.unpack_from(tail, locator)[2]
+        fp.seek(zip64_end)
+        record = fp.read(ZIP64_END_RECORD.size)
+        if len(record) != ZIP64_END_RECORD.size or record[:4] != ZIP64_END_SIGNATURE:
+            raise ValueError("Bad Zip64 end of central directory record")
+        count, cd_size, cd_offset = ZIP64_END_RECORD.unpack(record)[7:10]
+    return count, cd_size, cd_offset
+
+
+def read_central_directory(fp):
+    """Return the members of an archive without touching member data"""
+    count, cd_size, cd_offset = read_end_record(fp)
+    fp.seek(cd_offset)
+    directory = fp.read(cd_size)
+    if len(directory) != cd_size:
+        raise ValueError("Central directory is truncated")
+
+    members = []
+    offset = 0
+    for _ in range(count):
+        if offset + CENTRAL_HEADER.size > len(directory):
+            raise ValueError("Central directory is truncated")
+        fields = CENTRAL_HEADER.unpack_from(directory, offset)
+        if fields[0] != CENTRAL_SIGNATURE:
+            raise ValueError("Bad central directory record")
+        (flags, method, dos_time, dos_date, crc, compressed_size, file_size,
+         name_length, extra_length, comment_length) = fields[5:15]
+        external_attr, header_offset = fields[17], fields[18]
+        offset += CENTRAL_HEADER.size
+        raw_name = directory[offset:offset + name_length]
+        name = raw_name.decode("utf-8" if flags & UTF8_FLAG else "cp437")
+        extra = directory[offset + name_length:offset + name_length + extra_length]
+        offset += name_length + extra_length + comment_length
+
+        wide = [file_size, compressed_size, header_offset]
+        wanted = sum(1 for value in wide if value == 0xFFFFFFFF)
+        if wanted:
+            values = iter(_zip64_values(extra, wanted))
+            wide = [next(values) if value == 0xFFFFFFFF else value for value in wide]
+        file_size, compressed_size, header_offset = wide
+
+        members.append(ZipMember(
+            name=name, method=method, crc=crc,
+            compressed_size=compressed_size, file_size=file_size,
+            date_time=_unpack_date_time(dos_date, dos_time),
+            external_attr=external_attr, header_offset=header_offset,
+            flag_bits=flags,
+        ))
+    return members
+
+
+def raw_member_region(fp, member):
+    """FileRegion of a member's still-compressed payload in an open archive"""
+    fp.seek(member.header_offset)
+    header = fp.read(LOCAL_HEADER.size)
+    if len(header) != LOCAL_HEADER.size or header[:4] != LOCAL_SIGNATURE:
+        raise ValueError(f"Bad local header for {member.name}")
+    name_length, extra_length = LOCAL_HEADER.unpack(header)[10:12]
+    data_offset = member.header_offset + LOCAL_HEADER.size + name_length + extra_length
+    return FileRegion(fp.name, data_offset, member.compressed_size)
+
+
+def read_raw_member(fp, member):
+    """Return the still-compressed payload of a member"""
+    region = raw_member_region(fp, member)
+    fp.seek(region.offset)
+    payload = fp.read(region.length)
+    if len(payload) != region.length:
+        raise ValueError(f"Truncated data for {member.name}")
+    return payload
@@ -1,10 +1,10 @@
 #!/usr/bin/env python3
 
 # Inline execution of ZIP creation
-import zipfile
-import os
 from pathlib import Path
 
+from extension_packager import PathMatcher, build_package, print_summary, scan_tree
+
 print("🚀 Creating ChatGPT Extension v2.0.0 package...")
 
 # Define paths
@@ -22,44 +22,22 @@ if not build_dir.exists():
     
 print("✅ Build directory confirmed")
 
-# Remove existing package
-if package_path.exists():
-    package_path.unlink()
-    print("🧹 Removed existing package")
-
 # Files to exclude (simplified list)
-exclude_patterns = ['.test.js', '.spec.js', '.md', 'README']
-
-file_count = 0
+matcher = PathMatcher(['*.test.js', '*.spec.js', '*.md', 'README*'], ignore_case=True)
 
-# Create ZIP package
+# Create ZIP package (unchanged files are copied from the previous build)
 print("📦 Creating ZIP archive...")
-with zipfile.ZipFile(package_path, 'w', zipfile.ZIP_DEFLATED) as zipf:
-    for root, dirs, files in os.walk(build_dir):
-        for file in files:
-            file_path = Path(root) / file
-            
-            # Skip excluded files
-            skip_file = False
-            for pattern in exclude_patterns:
-                if pattern in str(file_path).lower():
-                    skip_file = True
-                    break
-                    
-            if skip_file:
-                continue
-                
-            # Add to ZIP
-            rel_path = file_path.relative_to(build_dir)
-            zipf.write(file_path, rel_path)
-            file_count += 1
-            print(f"  ✅ {rel_path}")
+result = build_package(build_dir, package_path, files=scan_tree(build_dir, select=matcher))
+for rel_path in result.names:
+    print(f"  ✅ {rel_path}")
+file_count = len(result.members)
 
 print(f"📦 Added {file_count} files")
+print(f"♻️  Reused {result.reused} unchanged files, {result.cached} from cache, compressed {result.compressed}")
 
 # Verify package
 if package_path.exists():
-    size_bytes = package_path.stat().st_size
+    size_bytes = result.size
     size_mb = size_bytes / (1024 * 1024)
     
     print(f"\n✅ Package created successfully!")
@@ -72,14 +50,8 @@ if package_path.exists():
     else:
         print("⚠️ Exceeds 100MB limit!")
         
-    # Show contents
-    with zipfile.ZipFile(package_path, 'r') as zipf:
-        files = zipf.namelist()
-        print(f"\n📋 Contains {len(files)} files:")
-        for f in sorted(files[:10]):
-            print(f"  📄 {f}")
-        if len(files) > 10:
-            print(f"  ... +{len(files)-10} more")
+    # Package contents come from the inventory written with the package
+    print_summary(result.inventory, limit=10)
     
     print(f"\n🎉 PACKAGE READY FOR CHROME WEB STORE!")
     print(f"📍 EXACT LOCATION: {package_path}")
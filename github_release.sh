@@ -14,6 +14,12 @@ if [ ! -f "chatgpt-extension-v1.0.0.zip" ]; then
     exit 1
 fi
 
+# Catch truncated or incomplete packages before anything is tagged
+if ! python3 -m extension_packager verify chatgpt-extension-v1.0.0.zip; then
+    echo "Error: chatgpt-extension-v1.0.0.zip failed verification"
+    exit 1
+fi
+
 echo "✅ ZIP file verified: chatgpt-extension-v1.0.0.zip"
 
 # Check git status
@@ -121,6 +127,15 @@ This project is part of the Semantest framework ecosystem. For contributions and
 **License**: Apache-2.0
 EOF
 
+# Append package contents from the inventory written alongside the package
+if [ -f "chatgpt-extension-v1.0.0.zip.inventory.json" ]; then
+    python3 -c "from extension_packager.inventory import load_inventory, release_notes_section; print(release_notes_section(load_inventory('chatgpt-extension-v1.0.0.zip')))" >> release_notes.md
+fi
+
+# Checksums come from the digest taken while the package was written
+echo "🔐 Writing SHA256SUMS..."
+python3 -c "from extension_packager import write_sha256sums; write_sha256sums(['chatgpt-extension-v1.0.0.zip'])"
+
 # Create GitHub release
 echo "🚀 Creating GitHub release v1.0.0..."
 gh release create v1.0.0 \
@@ -128,9 +143,9 @@ gh release create v1.0.0 \
     --notes-file release_notes.md \
     --latest
 
-# Upload the ZIP file as an asset
+# Upload the ZIP file and its checksums as assets
 echo "📎 Uploading extension package as release asset..."
-gh release upload v1.0.0 chatgpt-extension-v1.0.0.zip
+gh release upload v1.0.0 chatgpt-extension-v1.0.0.zip SHA256SUMS
 
 echo "✅ GitHub release v1.0.0 created successfully!"
 echo "🔗 Release URL: $(gh release view v1.0.0 --web)"
\ No newline at end of file
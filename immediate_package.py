@@ -1,78 +1,44 @@
-import zipfile
-import os
 from pathlib import Path
 
+from extension_packager import build_package, scan_tree
+
 # Immediate execution
 source_dir = Path("/home/chous/work/semantest/google.com")
 zip_path = source_dir / "chatgpt-extension-v1.0.0.zip"
 
 print("🚀 Creating package immediately...")
 
-# Remove existing zip if present
-if zip_path.exists():
-    os.remove(zip_path)
+# Collect package members
+files = []
+for name in ["manifest.json", "package.json", "tsconfig.json"]:
+    if (source_dir / name).exists():
+        files.append(name)
 
-# Create new zip
-with zipfile.ZipFile(zip_path, 'w', zipfile.ZIP_DEFLATED) as z:
-    # Add manifest
-    manifest = source_dir / "manifest.json"
-    if manifest.exists():
-        z.write(manifest, "manifest.json")
-        print("Added manifest.json")
-    
-    # Add package.json
-    package = source_dir / "package.json"
-    if package.exists():
-        z.write(package, "package.json")
-        print("Added package.json")
-    
-    # Add TypeScript config
-    tsconfig = source_dir / "tsconfig.json"
-    if tsconfig.exists():
-        z.write(tsconfig, "tsconfig.json")
-        print("Added tsconfig.json")
-    
-    # Add source files
-    src = source_dir / "src"
-    if src.exists():
-        for file_path in src.rglob("*"):
-            if file_path.is_file() and file_path.suffix == ".ts":
-                arc_path = file_path.relative_to(source_dir)
-                z.write(file_path, arc_path)
-                print(f"Added {arc_path}")
-    
-    # Add test files
-    tests = source_dir / "tests"
-    if tests.exists():
-        for file_path in tests.rglob("*"):
-            if file_path.is_file() and file_path.suffix == ".ts":
-                arc_path = file_path.relative_to(source_dir)
-                z.write(file_path, arc_path)
-                print(f"Added {arc_path}")
-    
-    # Add README files
-    readme_org = source_dir / "README.org"
-    if readme_org.exists():
-        z.write(readme_org, "README.org")
-        print("Added README.org")
-    
-    readme_images = source_dir / "README-IMAGES.md"
-    if readme_images.exists():
-        z.write(readme_images, "README-IMAGES.md")
-        print("Added README-IMAGES.md")
+# Add source and test files
+files += scan_tree(source_dir, "src", select=lambda f: f.endswith(".ts"))
+files += scan_tree(source_dir, "tests", select=lambda f: f.endswith(".ts"))
+
+# Add README files
+for name in ["README.org", "README-IMAGES.md"]:
+    if (source_dir / name).exists():
+        files.append(name)
+
+# Create new zip (unchanged files are copied from the previous build)
+result = build_package(source_dir, zip_path, files=files)
+for rel_path in result.names:
+    print(f"Added {rel_path}")
 
 # Check final result
 if zip_path.exists():
-    size = zip_path.stat().st_size / 1024 / 1024
+    size = result.size / 1024 / 1024
     print(f"\n✅ Package created successfully!")
     print(f"📦 Location: {zip_path}")
     print(f"📏 Size: {size:.2f} MB")
     
-    # List contents
-    with zipfile.ZipFile(zip_path, 'r') as z:
-        files = z.namelist()
-        print(f"📋 Contains {len(files)} files")
-        for f in sorted(files):
-            print(f"  • {f}")
+    # List contents (from the inventory written with the package)
+    files = [entry["path"] for entry in result.inventory["members"]]
+    print(f"📋 Contains {len(files)} files")
+    for f in sorted(files):
+        print(f"  • {f}")
 
 print("\n🎉 Package creation completed!")
\ No newline at end of file
@@ -4,9 +4,10 @@
 print("🚀 Starting inline packaging process...")
 
 # Execute the packaging logic immediately
-import zipfile
 from pathlib import Path
 
+from extension_packager import build_package, print_summary, scan_tree
+
 # Setup
 build_dir = Path("/home/chous/work/semantest/extension.chrome/build")
 package_path = Path("/home/chous/work/semantest/extension.chrome/chatgpt-extension-v2.0.0.zip")
@@ -14,43 +15,30 @@ package_path = Path("/home/chous/work/semantest/extension.chrome/chatgpt-extensi
 print(f"📁 Build: {build_dir}")
 print(f"📦 Target: {package_path}")
 
-# Cleanup
-if package_path.exists():
-    package_path.unlink()
-    print("🧹 Removed old package")
-
-# Create package
+# Create package (unchanged files are copied from the previous build)
 print("📦 Creating ZIP...")
-with zipfile.ZipFile(package_path, 'w', zipfile.ZIP_DEFLATED) as zipf:
-    file_count = 0
-    for file_path in build_dir.rglob('*'):
-        if file_path.is_file():
-            # Skip test files
-            if '.test.' in file_path.name or '.spec.' in file_path.name:
-                continue
-            
-            rel_path = file_path.relative_to(build_dir)
-            zipf.write(file_path, rel_path)
-            file_count += 1
-            print(f"  ✅ {rel_path}")
+def is_packaged(rel_path):
+    # Skip test files
+    name = rel_path.rsplit('/', 1)[-1]
+    return '.test.' not in name and '.spec.' not in name
+
+files = scan_tree(build_dir, select=is_packaged)
+result = build_package(build_dir, package_path, files=files)
+for rel_path in result.names:
+    print(f"  ✅ {rel_path}")
+file_count = len(result.members)
 
 print(f"📦 Added {file_count} files")
+print(f"♻️  Reused {result.reused} unchanged files, {result.cached} from cache, compressed {result.compressed}")
 
 # Verify
 if package_path.exists():
-    size_mb = package_path.stat().st_size / (1024 * 1024)
+    size_mb = result.size / (1024 * 1024)
     print(f"✅ SUCCESS: {package_path}")
     print(f"📏 Size: {size_mb:.2f}MB")
     
-    # Show some contents
-    with zipfile.ZipFile(package_path, 'r') as zipf:
-        files = zipf.namelist()
-        print(f"📋 Contains {len(files)} files")
-        print("📄 Key files:")
-        for f in sorted(files)[:10]:
-            print(f"  - {f}")
-        if len(files) > 10:
-            print(f"  ... and {len(files)-10} more")
+    # Package contents come from the inventory written with the package
+    print_summary(result.inventory, limit=10)
     
     print(f"\n🎉 PACKAGE READY!")
     print(f"📍 EXACT LOCATION: {package_path}")
@@ -0,0 +1,53 @@
+#!/usr/bin/env python3
+
+"""
+Create or apply a binary delta between two released extension packages
+"""
+
+import argparse
+import sys
+
+from extension_packager.delta import apply_delta, create_delta
+
+def create(args):
+    """Write the delta from args.old to args.new"""
+    print(f"🔍 Comparing {args.old} → {args.new}")
+    result = create_delta(args.old, args.new, args.output)
+
+    print(f"  ✅ Unchanged: {result.unchanged} files")
+    print(f"  ✏️  Changed: {result.changed} files")
+    print(f"  ➕ Added: {result.added} files")
+    print(f"  ➖ Removed: {result.removed} files")
+
+    ratio = result.delta_size / result.new_size * 100 if result.new_size else 0
+    print(f"\n📦 Delta: {result.delta_path}")
+    print(f"📏 Size: {result.delta_size:,} bytes ({ratio:.1f}% of {result.new_size:,} bytes)")
+
+def apply(args):
+    """Rebuild the new package from args.old and args.delta"""
+    print(f"🔧 Applying {args.delta} to {args.old}")
+    package_path = apply_delta(args.old, args.delta, args.output)
+    print(f"✅ Rebuilt {package_path} (sha256 verified)")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Binary deltas between extension packages")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    create_parser = subparsers.add_parser("create", help="create a delta from OLD to NEW")
+    create_parser.add_argument("old", help="previously released package")
+    create_parser.add_argument("new", help="new package")
+    create_parser.add_argument("--output", "-o", help="delta file (default: OLD--NEW.delta)")
+    create_parser.set_defaults(func=create)
+
+    apply_parser = subparsers.add_parser("apply", help="rebuild NEW from OLD and a delta")
+    apply_parser.add_argument("old", help="package the delta was created from")
+    apply_parser.add_argument("delta", help="delta file")
+    apply_parser.add_argument("--output", "-o", help="rebuilt package (default: name recorded in the delta)")
+    apply_parser.set_defaults(func=apply)
+
+    args = parser.parse_args()
+    try:
+        args.func(args)
+    except (OSError, ValueError) as e:
+        print(f"❌ {e}")
+        sys.exit(1)
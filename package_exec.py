@@ -1,27 +1,19 @@
-import zipfile
-import os
 from pathlib import Path
 
+from extension_packager import build_package, scan_tree
+
 # Direct execution - no functions, just immediate code
 print("🚀 Creating ChatGPT Extension v2.0.0 Package")
 
 build_dir = Path("/home/chous/work/semantest/extension.chrome/build")
 package_path = Path("/home/chous/work/semantest/extension.chrome/chatgpt-extension-v2.0.0.zip")
 
-# Remove old package
-if package_path.exists():
-    package_path.unlink()
-
-# Create new package
-file_count = 0
-with zipfile.ZipFile(package_path, 'w', zipfile.ZIP_DEFLATED) as zipf:
-    for root, dirs, files in os.walk(build_dir):
-        for file in files:
-            if '.test.js' not in file and '.spec.js' not in file:
-                file_path = Path(root) / file
-                rel_path = file_path.relative_to(build_dir)
-                zipf.write(file_path, rel_path)
-                file_count += 1
+# Create new package (unchanged files are copied from the previous build)
+files = [
+    entry for entry in scan_tree(build_dir)
+    if '.test.js' not in entry.path and '.spec.js' not in entry.path
+]
+file_count = len(build_package(build_dir, package_path, files=files).members)
 
 # Check result
 if package_path.exists():
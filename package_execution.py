@@ -1,10 +1,10 @@
 #!/usr/bin/env python3
 
 # Import the necessary modules for packaging
-import zipfile
-import os
 from pathlib import Path
 
+from extension_packager import STORE_EXCLUDES, PathMatcher, build_package, print_summary, scan_tree
+
 # Execute packaging logic directly
 print("🚀 Starting Chrome Extension packaging process...")
 
@@ -23,56 +23,24 @@ if not build_dir.exists():
 
 print("✅ Build directory found")
 
-# Check if old package exists and remove it
-if package_path.exists():
-    package_path.unlink()
-    print(f"🧹 Removed existing {package_name}")
-
-# Define exclusion patterns
-exclude_patterns = {
-    '.map', '.ts', '.test.js', '.spec.js', 
-    'test/', 'tests/', 'spec/', '.md', 'README',
-    'LICENSE', '.log', '.git', 'node_modules/',
-    '.env', '.config.js', 'jest.config', 'tsconfig',
-    '.eslint', '.prettier', 'coverage/', 'docs/',
-    'documentation/', '.DS_Store', 'Thumbs.db',
-    '.tmp', '.temp'
-}
-
-def should_exclude(file_path):
-    """Check if file should be excluded from package"""
-    path_str = str(file_path).lower()
-    for pattern in exclude_patterns:
-        if pattern in path_str:
-            return True
-    return False
+# Files to exclude (gitignore-style rules compiled once; excluded
+# directories such as node_modules/ are never walked)
+matcher = PathMatcher(STORE_EXCLUDES, ignore_case=True)
 
 # Create the ZIP package
 print("📦 Creating ZIP package...")
-file_count = 0
 
 try:
-    with zipfile.ZipFile(package_path, 'w', zipfile.ZIP_DEFLATED) as zipf:
-        # Walk through all files in build directory
-        for root, dirs, files in os.walk(build_dir):
-            for file in files:
-                file_path = Path(root) / file
-                
-                # Skip excluded files
-                if should_exclude(file_path):
-                    rel_path = file_path.relative_to(build_dir)
-                    print(f"  ⏭️  Skipped: {rel_path}")
-                    continue
-                
-                # Calculate relative path
-                rel_path = file_path.relative_to(build_dir)
-                
-                # Add to ZIP
-                zipf.write(file_path, rel_path)
-                file_count += 1
-                print(f"  ✅ Added: {rel_path}")
+    files = scan_tree(build_dir, select=matcher)
+    
+    # Unchanged files are copied from the previous build without recompressing
+    result = build_package(build_dir, package_path, files=files)
+    for rel_path in result.names:
+        print(f"  ✅ Added: {rel_path}")
+    file_count = len(result.members)
     
     print(f"📦 Successfully added {file_count} files to package")
+    print(f"♻️  Reused {result.reused} unchanged files, {result.cached} from cache, compressed {result.compressed}")
     
 except Exception as e:
     print(f"❌ Error creating ZIP: {e}")
@@ -80,7 +48,7 @@ except Exception as e:
 
 # Verify the package was created
 if package_path.exists():
-    size_bytes = package_path.stat().st_size
+    size_bytes = result.size
     size_mb = size_bytes / (1024 * 1024)
     
     print(f"\n✅ Package created successfully!")
@@ -94,21 +62,8 @@ if package_path.exists():
     else:
         print("✅ Package size is within Chrome Web Store limits")
     
-    # List package contents
-    try:
-        with zipfile.ZipFile(package_path, 'r') as zipf:
-            files = zipf.namelist()
-            print(f"\n📋 Package contains {len(files)} files:")
-            
-            # Show first 15 files
-            for file in sorted(files[:15]):
-                print(f"  📄 {file}")
-            
-            if len(files) > 15:
-                print(f"  ... and {len(files) - 15} more files")
-                
-    except Exception as e:
-        print(f"⚠️ Could not list package contents: {e}")
+    # Package contents come from the inventory written with the package
+    print_summary(result.inventory, limit=15)
     
     print(f"\n🎉 Chrome extension package is ready!")
     print(f"🏪 Ready for Chrome Web Store submission")
@@ -0,0 +1,44 @@
+#!/usr/bin/env python3
+
+"""
+Package one or more tags or commits straight from git, without a checkout
+"""
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+from extension_packager import GitTarget, build_from_git
+from extension_packager.targets import stable_matcher
+
+def package_name(ref):
+    """chatgpt-extension-<ref>.zip, with path separators made safe"""
+    return f"chatgpt-extension-{ref.replace('/', '-')}.zip"
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build stable packages from git refs")
+    parser.add_argument("refs", nargs="+", metavar="REF", help="tag, branch or commit to package")
+    parser.add_argument("--repo", default=".", help="git repository (default: current directory)")
+    parser.add_argument("--output-dir", "-o", default=".", help="where the packages are written")
+    args = parser.parse_args()
+
+    output_dir = Path(args.output_dir)
+    targets = [
+        GitTarget(ref, output_dir / package_name(ref), select=stable_matcher(), deterministic=True)
+        for ref in args.refs
+    ]
+
+    start = time.perf_counter()
+    try:
+        results = build_from_git(args.repo, targets)
+    except (OSError, KeyError) as e:
+        print(f"❌ {e}")
+        sys.exit(1)
+    elapsed = time.perf_counter() - start
+
+    for target, result in zip(targets, results):
+        print(f"📦 {target.ref} → {result.package_path}")
+        print(f"   {len(result.members)} files, {result.size:,} bytes "
+              f"(reused {result.reused}, cached {result.cached}, compressed {result.compressed})")
+    print(f"\n⏱️  Packaged {len(results)} refs in {elapsed:.2f}s")
@@ -0,0 +1,14 @@
+#!/usr/bin/env python3
+
+"""
+Verify extension packages or diff two builds without unzipping them
+
+Same as python -m extension_packager verify|diff ...
+"""
+
+import sys
+
+from extension_packager.cli import main
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -40,9 +40,19 @@ EOF
 echo ""
 echo "3️⃣ Building v1.0.1 release package..."
 cd extension.chrome
-npm run clean
-npm run build
-npm run package
+# webpack only runs (after npm run clean) when src/, public/ or the configs
+# changed since dist/ was built; it bundles src/ into these entry points
+PYTHONPATH=.. python3 -m extension_packager prebuild . \
+    --output dist/background.js --output dist/content-script.js \
+    --output dist/popup.js --output dist/options.js \
+    --output dist/manifest.json --input public || exit 1
+# dist/ is built by now; zip it without building again
+npm run package:zip
+
+# Delta from the previous release for the internal mirror
+if [ -f chatgpt-extension-v1.0.0.zip ]; then
+    python3 ../package_delta.py create chatgpt-extension-v1.0.0.zip chatgpt-extension-v$VERSION.zip
+fi
 
 # Step 4: Create release notes
 echo ""
@@ -8,53 +8,62 @@ Handles git operations, version updates, and packaging
 import os
 import sys
 import json
-import zipfile
-import subprocess
+import argparse
 from pathlib import Path
 
-def run_command(cmd, description=""):
+from extension_packager import build_package, write_sha256sums
+from extension_packager.gitsource import GitTarget, build_from_git
+from extension_packager.pipeline import Pipeline, print_timings, run_shell
+from extension_packager.targets import stable_files, stable_matcher
+
+SOURCE_DIR = "/home/chous/work/semantest/google.com"
+
+async def run_command(cmd, description=""):
     """Execute shell command and return result"""
     print(f"🔧 {description}")
     print(f"💻 Running: {cmd}")
     
     try:
-        result = subprocess.run(cmd, shell=True, capture_output=True, text=True, cwd="/home/chous/work/semantest/google.com")
+        returncode, stdout, stderr = await run_shell(cmd, cwd=SOURCE_DIR)
         
-        if result.stdout:
-            print(f"✅ Output: {result.stdout.strip()}")
+        if stdout:
+            print(f"✅ Output: {stdout.strip()}")
         
-        if result.stderr and result.returncode != 0:
-            print(f"❌ Error: {result.stderr.strip()}")
-            return False, result.stderr
+        if stderr and returncode != 0:
+            print(f"❌ Error: {stderr.strip()}")
+            return False, stderr
         
-        return True, result.stdout
+        return True, stdout
     
     except Exception as e:
         print(f"❌ Exception: {e}")
         return False, str(e)
 
-def check_git_status():
+async def check_git_status():
     """Check git status"""
     print("\n=== STEP 1: Git Status Check ===")
-    success, output = run_command("git status", "Checking git status")
+    success, output = await run_command("git status", "Checking git status")
     if success:
         print("Git status check completed")
     return success
 
-def create_and_push_tag():
-    """Create and push v1.0.0 tag"""
-    print("\n=== STEP 2: Create and Push Git Tag v1.0.0 ===")
+async def create_tag():
+    """Create v1.0.0 tag"""
+    print("\n=== STEP 2: Create Git Tag v1.0.0 ===")
     
-    # Create tag
-    success, output = run_command("git tag v1.0.0", "Creating git tag v1.0.0")
+    success, output = await run_command("git tag v1.0.0", "Creating git tag v1.0.0")
     if not success:
         if "already exists" in output:
             print("ℹ️ Tag v1.0.0 already exists")
         else:
             return False
+    return True
+
+async def push_tag():
+    """Push v1.0.0 tag"""
+    print("\n=== STEP 2b: Push Git Tag v1.0.0 ===")
     
-    # Push tag
-    success, output = run_command("git push origin v1.0.0", "Pushing tag to remote")
+    success, output = await run_command("git push origin v1.0.0", "Pushing tag to remote")
     if not success:
         if "already up to date" in output.lower() or "everything up-to-date" in output.lower():
             print("ℹ️ Tag already pushed to remote")
@@ -121,8 +130,8 @@ def update_manifest_version():
     
     return manifest_path
 
-def create_extension_package():
-    """Create chatgpt-extension-v1.0.0.zip package"""
+def create_extension_package(from_ref=None):
+    """Create chatgpt-extension-v1.0.0.zip package, from git when from_ref is set"""
     print("\n=== STEP 4: Create Extension Package ===")
     
     # Define source and target paths
@@ -130,74 +139,37 @@ def create_extension_package():
     package_name = "chatgpt-extension-v1.0.0.zip"
     package_path = source_dir / package_name
     
-    print(f"📁 Source: {source_dir}")
+    print(f"📁 Source: {source_dir}" + (f" @ {from_ref}" if from_ref else ""))
     print(f"📦 Target: {package_path}")
     
-    # Remove existing package
-    if package_path.exists():
-        package_path.unlink()
-        print("🧹 Removed existing package")
-    
-    # Files to include in the extension package
-    essential_files = [
-        "manifest.json",
-        "package.json",
-        "src/",
-        "dist/",
-        "README.org",
-        "tsconfig.json"
-    ]
-    
-    # Create ZIP package
-    file_count = 0
-    excluded_count = 0
+    if from_ref:
+        # Package the tagged tree from git objects; the working tree is not read
+        target = GitTarget(from_ref, package_path, select=stable_matcher(), deterministic=True)
+        result, = build_from_git(source_dir, [target])
+    else:
+        # Extension files without tests or Python scripts
+        files = stable_files(source_dir)
     
-    with zipfile.ZipFile(package_path, 'w', zipfile.ZIP_DEFLATED) as zipf:
-        # Add specific files and directories
-        for item in essential_files:
-            item_path = source_dir / item
-            
-            if item_path.exists():
-                if item_path.is_file():
-                    zipf.write(item_path, item)
-                    file_count += 1
-                    print(f"  ✅ {item}")
-                
-                elif item_path.is_dir():
-                    for root, dirs, files in os.walk(item_path):
-                        for file in files:
-                            file_path = Path(root) / file
-                            rel_path = file_path.relative_to(source_dir)
-                            
-                            # Skip test files and Python scripts
-                            if any(skip in file for skip in ['.test.', '.spec.', '.py']):
-                                excluded_count += 1
-                                continue
-                            
-                            zipf.write(file_path, rel_path)
-                            file_count += 1
-                            print(f"  ✅ {rel_path}")
-        
-        # Add any additional TypeScript files from src
-        for ts_file in source_dir.glob("src/**/*.ts"):
-            if not any(skip in str(ts_file) for skip in ['.test.', '.spec.']):
-                rel_path = ts_file.relative_to(source_dir)
-                if str(rel_path) not in zipf.namelist():
-                    zipf.write(ts_file, rel_path)
-                    file_count += 1
-                    print(f"  ✅ {rel_path}")
+        # Create a reproducible ZIP package (unchanged files are copied from the
+        # previous build); identical trees always give byte-identical packages
+        result = build_package(source_dir, package_path, files=files, deterministic=True)
+    for rel_path in result.names:
+        print(f"  ✅ {rel_path}")
     
-    print(f"📦 Added {file_count} files (excluded {excluded_count} files)")
+    print(f"📦 Added {len(result.members)} files")
+    print(f"♻️  Reused {result.reused} unchanged files, {result.cached} from cache, compressed {result.compressed}")
     
     # Verify package
     if package_path.exists():
-        size_bytes = package_path.stat().st_size
+        size_bytes = result.size
         size_mb = size_bytes / (1024 * 1024)
         
         print(f"\n✅ Package created successfully!")
         print(f"📦 Name: {package_name}")
         print(f"📏 Size: {size_mb:.2f}MB ({size_bytes:,} bytes)")
         print(f"📍 Location: {package_path}")
+        print(f"🔐 SHA-256: {result.sha256}")
+        write_sha256sums([package_path])
         
         return str(package_path), size_mb
     
@@ -229,39 +201,44 @@ def generate_final_report(manifest_path, package_path, package_size):
     
     print("\n✅ All release tasks completed successfully!")
 
-def main():
+def release_pipeline(from_ref=None):
+    """Release steps and their dependencies
+
+    The status check and the manifest update run side by side, and the tag
+    push overlaps with packaging. A package built from a ref waits for the
+    tag instead of the manifest update.
+    """
+    pipeline = Pipeline()
+    pipeline.add("git status", check_git_status)
+    pipeline.add("create tag", create_tag, requires=["git status"])
+    pipeline.add("push tag", push_tag, requires=["create tag"])
+    pipeline.add("manifest", update_manifest_version)
+    pipeline.add("package", lambda: create_extension_package(from_ref),
+                 requires=["create tag"] if from_ref else ["manifest"])
+    pipeline.add("report", lambda: generate_final_report(
+        pipeline.value("manifest"), *pipeline.value("package")
+    ), requires=["manifest", "package", "push tag"])
+    return pipeline
+
+def main(from_ref=None):
     """Main release process"""
     print("🚀 Starting Complete Release Process for v1.0.0")
     print("="*60)
     
-    try:
-        # Step 1: Check git status
-        if not check_git_status():
-            print("❌ Git status check failed")
-            return False
-        
-        # Step 2: Create and push tag
-        if not create_and_push_tag():
-            print("❌ Git tag creation/push failed")
-            return False
-        
-        # Step 3: Update manifest version
-        manifest_path = update_manifest_version()
-        
-        # Step 4: Create extension package
-        package_path, package_size = create_extension_package()
-        
-        # Step 5: Generate final report
-        generate_final_report(manifest_path, package_path, package_size)
-        
-        return True
-        
-    except Exception as e:
-        print(f"\n❌ RELEASE FAILED: {e}")
-        import traceback
-        traceback.print_exc()
+    result = release_pipeline(from_ref).run()
+    print_timings(result)
+    
+    if not result.ok:
+        failed = [step.name for step in result.steps.values() if step.status != "ok"]
+        print(f"\n❌ RELEASE FAILED: {', '.join(failed)}")
         return False
+    return True
 
 if __name__ == "__main__":
-    success = main()
+    parser = argparse.ArgumentParser(description="Complete v1.0.0 release")
+    parser.add_argument("--from-ref", metavar="REF",
+                        help="package REF (e.g. v1.0.0) from git instead of the working tree")
+    args = parser.parse_args()
+
+    success = main(args.from_ref)
     sys.exit(0 if success else 1)
\ No newline at end of file
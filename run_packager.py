@@ -1,12 +1,19 @@
 #!/usr/bin/env python3
 
-# Execute the packaging code directly
-print("Starting Chrome Extension packaging process...")
+"""
+Package the extension.chrome build with the store exclusions (as package_creator.py does)
+
+Runs the packaging CLI in this interpreter; same as
+python -m extension_packager build BUILD_DIR -o PACKAGE --store-excludes --ignore-case --summary
+"""
+
+import sys
 
-try:
-    exec(open('/home/chous/work/semantest/google.com/package_creator.py').read())
-    print("✅ Packaging completed successfully!")
-except Exception as e:
-    print(f"❌ Error during packaging: {e}")
-    import traceback
-    traceback.print_exc()
\ No newline at end of file
+from extension_packager.cli import main
+
+BUILD_DIR = "/home/chous/work/semantest/extension.chrome/build"
+PACKAGE_PATH = "/home/chous/work/semantest/extension.chrome/chatgpt-extension-v2.0.0.zip"
+
+print("Starting Chrome Extension packaging process...")
+sys.exit(main(["build", BUILD_DIR, "-o", PACKAGE_PATH,
+               "--store-excludes", "--ignore-case", "--summary"] + sys.argv[1:]))
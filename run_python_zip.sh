@@ -5,26 +5,19 @@ echo "🚀 Running Python ZIP creation..."
 
 cd /home/chous/work/semantest/extension.chrome
 
-python3 -c "
-import zipfile
+PYTHONPATH=/home/chous/work/semantest/google.com python3 -c "
 from pathlib import Path
+from extension_packager import build_package
 
-# Simple ZIP creation
+# Simple ZIP creation (unchanged files are copied from the previous build)
 build_dir = Path('build')
 package_path = Path('chatgpt-extension-v2.0.0.zip')
 
 print('📦 Creating package...')
 
-if package_path.exists():
-    package_path.unlink()
-
-file_count = 0
-with zipfile.ZipFile(package_path, 'w', zipfile.ZIP_DEFLATED) as zipf:
-    for file_path in build_dir.rglob('*'):
-        if file_path.is_file() and '.test.' not in file_path.name:
-            rel_path = file_path.relative_to(build_dir)
-            zipf.write(file_path, rel_path)
-            file_count += 1
+result = build_package(build_dir, package_path,
+                       select=lambda rel_path: '.test.' not in rel_path.rsplit('/', 1)[-1])
+file_count = len(result.members)
 
 if package_path.exists():
     size_mb = package_path.stat().st_size / (1024 * 1024)
@@ -1,20 +1,13 @@
-import zipfile
 from pathlib import Path
 
+from extension_packager import build_package
+
 # Minimal ZIP creation
 build = Path("/home/chous/work/semantest/extension.chrome/build")
 package = Path("/home/chous/work/semantest/extension.chrome/chatgpt-extension-v2.0.0.zip")
 
-# Remove old package
-if package.exists():
-    package.unlink()
-
-# Create ZIP
-with zipfile.ZipFile(package, 'w') as z:
-    # Add all files except test files
-    for f in build.rglob('*'):
-        if f.is_file() and '.test.' not in f.name:
-            z.write(f, f.relative_to(build))
+# Create ZIP with all files except test files
+build_package(build, package, select=lambda rel_path: '.test.' not in rel_path.rsplit('/', 1)[-1])
 
 # Check result
 size = package.stat().st_size / 1024 / 1024
@@ -0,0 +1,65 @@
+"""
+Parallel builds of large members: python -m unittest tests.test_engine
+"""
+
+import os
+import random
+import tempfile
+import unittest
+from pathlib import Path
+
+from extension_packager import trace
+from extension_packager.blobcache import BlobCache
+from extension_packager.engine import STREAM_THRESHOLD, build_package
+
+
+class ParallelLargeMembersTest(unittest.TestCase):
+    def setUp(self):
+        self.work_dir = Path(self.enterContext(tempfile.TemporaryDirectory()))
+        self.source_dir = self.work_dir / "src"
+        self.source_dir.mkdir()
+        rng = random.Random(1)
+        words = [b"function ", b"return ", b"chrome.runtime", b"(x);", b"{}", b"\n"]
+        self.large = []
+        for index in range(3):
+            name = f"bundle{index}.js"
+            data = b"".join(rng.choice(words) for _ in range(STREAM_THRESHOLD // 4))
+            (self.source_dir / name).write_bytes(data[:STREAM_THRESHOLD + index])
+            self.large.append(name)
+        (self.source_dir / "manifest.json").write_bytes(b'{"manifest_version": 3}')
+
+    def build(self, name, jobs, cache=False):
+        with trace.tracing(trace.Tracer()) as tracer:
+            result = build_package(self.source_dir, self.work_dir / name, jobs=jobs,
+                                   incremental=False, deterministic=True, cache=cache)
+        return result, tracer
+
+    def assert_deflated_in_workers(self, tracer):
+        spans = {}
+        for event in tracer.events:
+            if event["name"] == "compress" and "path" in event["args"]:
+                spans[os.path.basename(event["args"]["path"])] = event["pid"]
+        for name in self.large:
+            self.assertIn(name, spans)
+            self.assertNotEqual(spans[name], os.getpid(), f"{name} was deflated in the parent")
+
+    def test_large_members_deflated_in_workers(self):
+        serial, _ = self.build("serial.zip", jobs=1)
+        parallel, tracer = self.build("parallel.zip", jobs=2)
+        self.assert_deflated_in_workers(tracer)
+        self.assertEqual(parallel.sha256, serial.sha256)
+        self.assertEqual(parallel.compressed, len(self.large) + 1)
+        self.assertEqual([p.name for p in self.work_dir.iterdir() if p.name.startswith(".")], [])
+
+    def test_cache_misses_deflated_in_workers(self):
+        cache = BlobCache(self.work_dir / "cache")
+        serial, _ = self.build("serial.zip", jobs=1, cache=False)
+        parallel, tracer = self.build("parallel.zip", jobs=2, cache=cache)
+        self.assert_deflated_in_workers(tracer)
+        self.assertEqual(parallel.sha256, serial.sha256)
+        cached, _ = self.build("cached.zip", jobs=2, cache=cache)
+        self.assertEqual((cached.cached, cached.sha256), (len(self.large) + 1, serial.sha256))
+
+
+if __name__ == "__main__":
+    unittest.main()
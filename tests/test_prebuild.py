@@ -0,0 +1,77 @@
+"""
+prebuild against tsconfig.json: python -m unittest tests.test_prebuild
+"""
+
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+
+from extension_packager.prebuild import load_project, prebuild
+
+# Stands in for tsc: lib/<name>.ts -> build/<name>.js
+COMPILE = (sys.executable, "-c", """
+from pathlib import Path
+for source in Path("lib").rglob("*.ts"):
+    output = Path("build", source.relative_to("lib")).with_suffix(".js")
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text("// " + source.read_text())
+""")
+CLEAN = (sys.executable, "-c", "import shutil; shutil.rmtree('build', ignore_errors=True)")
+
+
+class NonIncrementalProjectTest(unittest.TestCase):
+    def setUp(self):
+        self.project_dir = Path(self.enterContext(tempfile.TemporaryDirectory()))
+        (self.project_dir / "tsconfig.json").write_text("""{
+  // neither incremental nor composite, so tsc writes no tsbuildinfo
+  "compilerOptions": {"rootDir": "./lib", "outDir": "./build",},
+}""")
+        (self.project_dir / "lib").mkdir()
+        (self.project_dir / "lib" / "index.ts").write_text("export const a = 1;\n")
+
+    def run_prebuild(self, **options):
+        return prebuild(self.project_dir, command=COMPILE, clean=CLEAN, **options)
+
+    def test_reads_tsconfig(self):
+        project = load_project(self.project_dir)
+        self.assertEqual((project.source_dir, project.output_dir), ("lib", "build"))
+        self.assertIsNone(project.tsbuildinfo)
+
+    def test_fresh_without_tsbuildinfo(self):
+        report = self.run_prebuild()
+        self.assertTrue(report.compiled and report.ok, report.errors)
+        self.assertTrue((self.project_dir / "build" / "index.js").is_file())
+        report = self.run_prebuild()
+        self.assertEqual(report.stale, [])
+        self.assertFalse(report.compiled)
+
+    def test_clean_removes_outputs_of_deleted_sources(self):
+        self.run_prebuild()
+        (self.project_dir / "lib" / "index.ts").unlink()
+        (self.project_dir / "lib" / "main.ts").write_text("export const b = 2;\n")
+        report = self.run_prebuild()
+        self.assertTrue(report.compiled and report.ok, report.errors)
+        self.assertEqual(sorted(p.name for p in (self.project_dir / "build").iterdir()), ["main.js"])
+
+    def test_missing_listed_output(self):
+        self.run_prebuild()
+        report = prebuild(self.project_dir, compile=False,
+                          project=load_project(self.project_dir, outputs=["build/bundle.js"]))
+        self.assertEqual(report.stale, ["build/bundle.js is missing"])
+        self.assertFalse(report.ok)
+
+
+class IncrementalProjectTest(unittest.TestCase):
+    def test_tsbuildinfo_location(self):
+        with tempfile.TemporaryDirectory() as project_dir:
+            (Path(project_dir) / "base.json").write_text('{"compilerOptions": {"composite": true}}')
+            (Path(project_dir) / "tsconfig.json").write_text(
+                '{"extends": "./base", "compilerOptions": {"rootDir": "src", "outDir": "dist"}}')
+            project = load_project(project_dir)
+        self.assertEqual(project.tsbuildinfo, "tsconfig.tsbuildinfo")
+        self.assertEqual(project.configs, ["tsconfig.json", "base.json"])
+
+
+if __name__ == "__main__":
+    unittest.main()
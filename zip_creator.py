@@ -1,20 +1,13 @@
-import zipfile
 from pathlib import Path
 
+from extension_packager import build_package
+
 # Simple ZIP creation
 build = Path("/home/chous/work/semantest/extension.chrome/build")
 zip_file = Path("/home/chous/work/semantest/extension.chrome/chatgpt-extension-v2.0.0.zip")
 
-# Remove old ZIP if exists
-if zip_file.exists():
-    zip_file.unlink()
-
-# Create new ZIP
-with zipfile.ZipFile(zip_file, 'w', zipfile.ZIP_DEFLATED) as z:
-    for file_path in build.rglob('*'):
-        if file_path.is_file() and '.test.js' not in str(file_path):
-            rel_path = file_path.relative_to(build)
-            z.write(file_path, rel_path)
+# Create new ZIP (unchanged files are copied from the previous build)
+build_package(build, zip_file, select=lambda rel_path: '.test.js' not in rel_path)
 
 # Print result
 print(f"Created: {zip_file}")